@@ -33,7 +33,7 @@ class StatsPackage():
 stats = StatsPackage()
 del StatsPackage
 
-from despy.session import Session, Config  # @UnusedImport
+from despy.session import Session, Config, Verbosity  # @UnusedImport
 
 class OutputPackage():
     def __init__(self):
@@ -54,6 +54,24 @@ class OutputPackage():
         import despy.output.trace
         self.Trace = despy.output.trace.Trace
         self.TraceRecord = despy.output.trace.TraceRecord
+        self.TraceFilter = despy.output.trace.TraceFilter
+        self.merge_traces = despy.output.trace.merge_traces
+        
+        import despy.output.sink
+        self.TraceSink = despy.output.sink.TraceSink
+        self.SinkFormat = despy.output.sink.SinkFormat
+        self.ShardedTraceSink = despy.output.sink.ShardedTraceSink
+        
+        import despy.output.tracefile
+        self.TraceFile = despy.output.tracefile.TraceFile
+        self.TraceFileWriter = despy.output.tracefile.TraceFileWriter
+        
+        import despy.output.journey
+        self.JourneyLog = despy.output.journey.JourneyLog
+        self.Stage = despy.output.journey.Stage
+        
+        import despy.output.digest
+        self.TraceDigest = despy.output.digest.TraceDigest
         
         import despy.output.plot
         self.plot = despy.output.plot
@@ -72,6 +90,7 @@ class ModelPackage():
         import despy.model.trigger
         self.AbstractTrigger = despy.model.trigger.AbstractTrigger
         self.TimeTrigger = despy.model.trigger.TimeTrigger
+        self.TraceDumpTrigger = despy.model.trigger.TraceDumpTrigger
         
         import despy.model.component
         self.Component = despy.model.component.Component
@@ -83,14 +102,32 @@ class ModelPackage():
         
         import despy.model.queue
         self.Queue = despy.model.queue.Queue
+        self.FifoDiscipline = despy.model.queue.FifoDiscipline
+        self.LifoDiscipline = despy.model.queue.LifoDiscipline
+        self.PriorityDiscipline = despy.model.queue.PriorityDiscipline
+        self.SptDiscipline = despy.model.queue.SptDiscipline
+        self.RandomDiscipline = despy.model.queue.RandomDiscipline
+        
+        import despy.model.waitable
+        self.AbstractWaitable = despy.model.waitable.AbstractWaitable
+        self.Signal = despy.model.waitable.Signal
         
         import despy.model.entity
         self.Entity = despy.model.entity.Entity
+        self.LightEntity = despy.model.entity.LightEntity
+        self.EntityTable = despy.model.entity.EntityTable
         
         import despy.model.resource
         self.Resource = despy.model.resource.Resource
         self.ResourceQueue = despy.model.resource.ResourceQueue
+        self.CountingResource = despy.model.resource.CountingResource
+        self.PreemptiveResource = despy.model.resource.PreemptiveResource
+        self.PreemptiveResourceQueue = (
+                            despy.model.resource.PreemptiveResourceQueue)
         self.ResourceFinishEvent = despy.model.resource.ResourceFinishServiceEvent
+        self.ServiceRequest = despy.model.resource.ServiceRequest
+        self.Selection = despy.model.resource.Selection
+        self.FreeIndex = despy.model.resource.FreeIndex
         
         import despy.model.timer
         self.RandomTimer = despy.model.timer.RandomTimer
@@ -103,6 +140,8 @@ class FelPackage():
     def __init__(self):
         import despy.fel.event
         self.Event = despy.fel.event.Event
+        self.LightEvent = despy.fel.event.LightEvent
+        self.EventPool = despy.fel.event.EventPool
         
 fel = FelPackage()
 del FelPackage
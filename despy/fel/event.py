@@ -10,11 +10,14 @@ despy.model.event
 ..  autosummary::
 
     Event
+    LightEvent
+    EventPool
     
     
 ..  todo
 
-    Refactor event so it no longer inherits from Component.
+    Refactor event so it no longer inherits from Component. Until
+    then, use LightEvent for events that are created in large numbers.
     
     Add remove_trace_field method.
     
@@ -26,6 +29,7 @@ despy.model.event
 import types
 from collections import OrderedDict
 
+from despy.session import Session
 from despy.model.component import Component
 from despy.output.trace import TraceRecord
 
@@ -179,7 +183,11 @@ class Event(Component):
         """
         self.trace_fields[key] = value
         
-    def add_message(self, message, fields):
+    def add_message(self, message, fields, component = None):
+        trace = self.sim.results.trace
+        if not trace.active or \
+                not trace.dp_accept("Msg", message, component = component):
+            return
         msg_record = TraceRecord(self.sim.rep, self.sim.now,
                                  self.sim.pri, "Msg", message)
         
@@ -198,10 +206,17 @@ class Event(Component):
         *Returns:* ``True`` if a callback method is executed. ``None`` if
         there are no callbacks attached to the event.
         """
-        # Event record will precede any messages created in do_event().
-        evt_record = TraceRecord(self.sim.rep, self.sim.now,
-                                 self.sim.pri, "Event", self.name)
-        self.trace_records.append(evt_record)
+        # Records are only built while the trace is recording, and only
+        # if the trace filters keep them, or for the optional digest.
+        results = self.sim.results
+        trace, digest = results.trace, results.digest
+        traced = trace.active and trace.dp_accept("Event", self.name, self)
+        if traced or digest is not None:
+            # Event record will precede any messages created in do_event().
+            evt_record = TraceRecord(self.sim.rep, self.sim.now,
+                                     self.sim.pri, "Event", self.name)
+        if traced:
+            self.trace_records.append(evt_record)
         
         self.do_event()
         for callback in self._callbacks:
@@ -210,12 +225,18 @@ class Event(Component):
             if isinstance(callback, types.MethodType):
                 callback()
             
-        # Modify record with info generated during event.
-        self.trace_records[0] = self.dp_update_trace_record(evt_record)
-        self.sim.results.trace.add(self.trace_records)
+        if traced or digest is not None:
+            # Modify record with info generated during event.
+            evt_record = self.dp_update_trace_record(evt_record)
+            if traced:
+                self.trace_records[0] = evt_record
+            if digest is not None:
+                digest.update(evt_record)
+        if self.trace_records:
+            trace.add(self.trace_records)
         
-        # Clean up in case event is re-used.
-        self.trace_records.clear()  
+            # Clean up in case event is re-used.
+            self.trace_records.clear()  
 
     def do_event(self):
         pass
@@ -281,4 +302,193 @@ class Event(Component):
         """
         return self.id > y.id
 
-        
\ No newline at end of file
+        
+    
+    
+class LightEvent(object):
+    """A slotted event that does not inherit from Component.
+    
+    An Event object carries a Results object, a components dictionary,
+    a trace field dictionary and a list of trace records. A LightEvent
+    holds only a name, a callback and its arguments, so it is much
+    cheaper to create. Use LightEvent for events that are created in
+    large numbers, and an :class:`EventPool` to recycle them.
+    
+    The event's trace record is added to the trace before the callback
+    runs. Custom trace fields are built only while the trace is
+    recording.
+    
+    **Members**
+    
+    ..  autosummary::
+    
+        name
+        callback
+        args
+        trace_fields
+        trace_function
+        pool
+        owner
+        add_message
+        dp_do_event
+    """
+    __slots__ = ('name', 'callback', 'args', 'trace_fields',
+                 'trace_function', 'pool', 'owner')
+    
+    def __init__(self, name, callback = None, args = (),
+                 trace_fields = None, trace_function = None, pool = None,
+                 owner = None):
+        """Create a LightEvent object.
+        
+        *Arguments*
+            ``name`` (String)
+                A short string describing the event. The name will be
+                printed in the event trace report. Unlike Component
+                names, the name is not validated.
+            ``callback`` (Python function object)
+                Optional. Called with ``*args`` when the event occurs.
+            ``args`` (Tuple)
+                Optional. Arguments for ``callback`` and
+                ``trace_function``.
+            ``trace_fields`` (Python dictionary)
+                Optional. Fields added to the event's trace record.
+            ``trace_function`` (Python function object)
+                Optional. Called with ``*args`` while the trace is
+                recording. Returns a dictionary of fields that will be
+                added to the event's trace record.
+            ``pool`` (:class:`EventPool`)
+                Optional. The event is returned to this pool after it
+                occurs.
+            ``owner`` (:class:`despy.model.component.Component`)
+                Optional. The component that scheduled the event. Trace
+                filters match the event's records by this component.
+        """
+        self.name = name
+        self.callback = callback
+        self.args = args
+        self.trace_fields = trace_fields
+        self.trace_function = trace_function
+        self.pool = pool
+        self.owner = owner
+        
+    def __str__(self):
+        return self.name
+        
+    def add_message(self, message, fields, component = None):
+        """Adds a message to the trace, after the event's record.
+        """
+        Session().sim.results.trace.add_message(message, fields, component)
+        
+    def dp_do_event(self):
+        """Records the event on the trace and calls the callback.
+        
+        Internal Method. Called by the ``Simulation`` class's
+        ``step()`` method. If the event belongs to an
+        :class:`EventPool`, it is released to the pool before the
+        callback is called.
+        """
+        sim = Session().sim
+        trace, digest = sim.results.trace, sim.results.digest
+        traced = trace.active and trace.dp_accept("Event", self.name, self)
+        if traced or digest is not None:
+            record = TraceRecord(sim.rep, sim.now, sim.pri, "Event",
+                                 self.name)
+            if self.trace_function is not None:
+                record.add_fields(self.trace_function(*self.args))
+            if self.trace_fields is not None:
+                record.add_fields(self.trace_fields)
+            if digest is not None:
+                digest.update(record)
+            if traced:
+                trace.add(record)
+            
+        # Release before calling back, so the callback can reuse the
+        # event for the next step.
+        callback, args = self.callback, self.args
+        if self.pool is not None:
+            self.pool.release(self)
+        if callback is not None:
+            callback(*args)
+            
+            
+class EventPool(object):
+    """A free list of :class:`LightEvent` objects.
+    
+    Pooled events are released back to the pool when they occur, and
+    :meth:`acquire` reuses them instead of creating new events. Events
+    that are cancelled, or never scheduled, are not released; they are
+    garbage collected like any other object.
+    
+    **Members**
+    
+    ..  autosummary::
+    
+        max_size
+        owner
+        free
+        created
+        acquire
+        release
+    """
+    
+    def __init__(self, max_size = 1024, owner = None):
+        """Create an EventPool object.
+        
+        *Arguments*
+            ``max_size`` (Integer)
+                Optional, defaults to 1024. The largest number of
+                unused events that the pool keeps.
+            ``owner`` (:class:`despy.model.component.Component`)
+                Optional. The owner of every event the pool creates.
+        """
+        self.max_size = max_size
+        self.owner = owner
+        self._free = []
+        self._created = 0
+        
+    @property
+    def free(self):
+        """The number of unused events held by the pool.
+        
+        *Type:* Integer, read-only.
+        """
+        return len(self._free)
+    
+    @property
+    def created(self):
+        """The number of events the pool has created.
+        
+        *Type:* Integer, read-only.
+        """
+        return self._created
+        
+    def acquire(self, name, callback = None, args = (),
+                trace_fields = None, trace_function = None):
+        """Returns a LightEvent, reusing a released event if possible.
+        
+        The arguments are the same as those of :class:`LightEvent`.
+        """
+        if self._free:
+            event = self._free.pop()
+            event.name = name
+            event.callback = callback
+            event.args = args
+            event.trace_fields = trace_fields
+            event.trace_function = trace_function
+            return event
+        self._created += 1
+        return LightEvent(name, callback, args, trace_fields,
+                          trace_function, self, self.owner)
+    
+    def release(self, event):
+        """Returns an event to the pool.
+        
+        Drops the event's references to its callback and arguments so
+        that released events do not keep entities alive.
+        """
+        if len(self._free) < self.max_size:
+            event.callback = None
+            event.args = ()
+            event.trace_fields = None
+            event.trace_function = None
+            self._free.append(event)
@@ -23,6 +23,7 @@ despy.model.component
     
 """
 
+from functools import partial
 from itertools import count
 import types
 
@@ -85,11 +86,13 @@ class Component(AbstractModel):
     ..  autosummary::
     
         _get_next_number
-        _call_phase
+        _get_phase
+        dp_compile_phases
         dp_initialize
         dp_setup
         dp_teardown
         dp_finalize
+        dp_record_journey
         
     **Superclass**
         * :class:`despy.model.entity.Entity`
@@ -120,10 +123,11 @@ class Component(AbstractModel):
         self._number = self._get_next_number()
 
         self._components = {}
-        self._results = Results(self)
+        self._results = None
 
         self._owner = None
         self._session = Session()
+        self._phase_plan = None
 
     @property
     def name(self):
@@ -200,7 +204,7 @@ class Component(AbstractModel):
         """
         cpt = self
         while cpt.owner is not None:
-            cpt = self.owner
+            cpt = cpt.owner
         return cpt
 
     @property
@@ -236,8 +240,15 @@ class Component(AbstractModel):
     def results(self):
         """Results object containing simulation results.
         
+        The Results object is created the first time this property is
+        read, so events and entities that never record a result do not
+        allocate one.
+        
         *Type:* {:class:`despy.output.results.Results`}
         """
+        if self._results is None:
+            self._results = Results(self)
+            self._invalidate_plan()
         return self._results
     
     @property
@@ -259,6 +270,7 @@ class Component(AbstractModel):
             self._components[item.name] = item
             item.owner = self
             setattr(self, item.name, item)
+            self._invalidate_plan()
         else:
             raise ValueError("Invalid key. Key must be a valid "
                              "Python identifier and cannot be the "
@@ -312,12 +324,104 @@ class Component(AbstractModel):
         """
         return next(cls._count)
                 
+    def _invalidate_plan(self):
+        """Discards the phase plans of this component and its owners.
+        """
+        cpt = self
+        while cpt is not None:
+            cpt._phase_plan = None
+            cpt = cpt.owner
+            
+    def _call_stats(self, name, *args):
+        """Calls a phase method of each of the component's statistics.
+        """
+        for stat in self._results.stats.values():
+            getattr(stat, name)(*args)
+                
+    def _get_phase(self, name):
+        """Returns a callable for a phase, or None if it is not overridden.
+        
+        A phase is overridden if it was assigned to the instance, or if
+        the component's class overrides the Component method.
+        """
+        phase = self.__dict__.get(name)
+        if phase is not None:
+            if isinstance(phase, types.FunctionType):
+                return partial(phase, self)
+            return phase
+        if getattr(type(self), name) is getattr(Component, name):
+            return None
+        return getattr(self, name)
+    
+    def dp_compile_phases(self):
+        """Builds a flat list of the phase calls for the component tree.
+        
+        Internal despy method. Walks the component tree once and keeps
+        only the components with statistics and the overridden
+        ``initialize``, ``setup``, ``teardown`` and ``finalize`` phases,
+        in the order in which they are called. Statistics are looked up
+        when the phase runs, so statistics added later are included.
+        The plan is rebuilt when a component is added anywhere in the
+        tree, when a component's results are first created, or when
+        :meth:`dp_initialize` runs.
+        
+        Phases assigned to a component after the plan is compiled are
+        not called until the plan is rebuilt.
+        
+        *Returns:* Dictionary that maps each phase name to a list of
+        ``(callable, takes_time)`` tuples.
+        """
+        plan = {'initialize': [], 'setup': [], 'teardown': [],
+                'finalize': []}
+        for cpt in self:
+            has_stats = cpt._results is not None
+            initialize = cpt._get_phase('initialize')
+            if initialize is not None:
+                plan['initialize'].append((initialize, False))
+                
+            if has_stats:
+                plan['setup'].append((partial(cpt._call_stats, 'setup'),
+                                      False))
+            setup = cpt._get_phase('setup')
+            if setup is not None:
+                plan['setup'].append((setup, False))
+                
+            if has_stats:
+                plan['teardown'].append((partial(cpt._call_stats,
+                                                 'teardown'), True))
+            teardown = cpt._get_phase('teardown')
+            if teardown is not None:
+                plan['teardown'].append((teardown, False))
+                
+            finalize = cpt._get_phase('finalize')
+            if finalize is not None:
+                plan['finalize'].append((finalize, False))
+            if has_stats:
+                plan['finalize'].append((partial(cpt._call_stats,
+                                                 'finalize'), False))
+        self._phase_plan = plan
+        return plan
+    
+    def _run_phase(self, name, time = None):
+        """Calls every step of a phase in the compiled phase plan.
+        """
+        plan = self._phase_plan
+        if plan is None:
+            plan = self.dp_compile_phases()
+        for call, takes_time in plan[name]:
+            if takes_time:
+                call(time)
+            else:
+                call()
+        return len(plan[name])
+    
     def dp_initialize(self):
         """Internal despy method for initializing the model. Do not override.
         """
-        for cpt in self:
-            cpt._call_phase(cpt.initialize)
-            console.display_message("Initialized {}".format(cpt.name))
+        self.dp_compile_phases()
+        steps = self._run_phase('initialize')
+        console.display_message("Initialized {} ({} phase calls)",
+                                self.name, steps)
     
     def initialize(self):
         """Initialization code that runs once, prior to replications.
@@ -327,11 +431,7 @@ class Component(AbstractModel):
     def dp_setup(self):
         """Internal despy method that sets up each replication. Do not override.
         """
-        for cpt in self:
-            for _, stat in cpt.results.stats.items():
-                stat.setup()
-            cpt._call_phase(cpt.setup)
-            console.display_message("Setup {}".format(cpt.name))
+        self._run_phase('setup')
             
     def setup(self):
         """Runs prior to every replication to set up initial conditions.
@@ -341,11 +441,7 @@ class Component(AbstractModel):
     def dp_teardown(self, time):
         """Internal despy method that runs after every rep. Do not override.
         """
-        for cpt in self:
-            for _, stat in cpt.results.stats.items():
-                stat.teardown(time)
-            cpt._call_phase(cpt.teardown)
-            console.display_message("Teardown {}".format(cpt.name))
+        self._run_phase('teardown', time)
     
     def teardown(self):
         """Runs after every replication to clean up.
@@ -355,23 +451,28 @@ class Component(AbstractModel):
     def dp_finalize(self):
         """Internal depsy method for finalizing the model. Do not override.
         """
-        for cpt in self:
-            cpt._call_phase(cpt.finalize)
-            for _, stat in cpt.results.stats.items():
-                stat.finalize()
-            console.display_message("Finalized {}".format(cpt.name))
+        steps = self._run_phase('finalize')
+        console.display_message("Finalized {} ({} phase calls)",
+                                self.name, steps)
         
     def finalize(self):
         """Runs once, after all reps are complete, to finalize component.
         """
         pass
     
-    def _call_phase(self, phase):
-        """Allows using either method or function type objects as despy phases.
+    def dp_record_journey(self, stage, entity):
+        """Records a step of an entity's journey, if recording is on.
+        
+        Internal Method. Called by queues and resources.
+        
+        *Arguments*
+            ``stage`` (:class:`despy.output.journey.Stage`)
+                The step of the journey.
+            ``entity``
+                The entity.
         """
-        if isinstance(phase, types.FunctionType):
-            phase(self)
-        else:
-            phase()
+        journey = self._session.sim.results.journey
+        if journey.active:
+            journey.record(self.name, stage, entity)
     
 
@@ -10,15 +10,23 @@ despy.model.entity
 ..  autosummary::
 
     Entity
+    LightEntity
+    EntityTable
     
 ..  todo
 
     Add data fields to track and report number of entities created.
     
-    Add a dictionary object so designers can add custom data fields
-    without sub-classing.
+    Add a dictionary object to Entity so designers can add custom data
+    fields without sub-classing.
 """
 
+from collections import OrderedDict
+from itertools import count
+
+import numpy as np
+
+from despy.session import Session
 from despy.model.component import Component
 
 class Entity(Component):
@@ -42,4 +50,287 @@ class Entity(Component):
                 A descriptive paragraph. Optional.
         """
         
-        super().__init__(name, description)
\ No newline at end of file
+        super().__init__(name, description)
+        
+        
+class LightEntity(object):
+    """A compact entity for models with very large numbers of entities.
+    
+    An :class:`Entity` is a full Component, with its own Results object
+    and components dictionary. A LightEntity stores only a name, a
+    number, its creation time and an optional dictionary of custom
+    attributes, which is not created until the first attribute is set.
+    Queues, resources and the trace accept a LightEntity anywhere they
+    accept an Entity.
+    
+    Like Component, subclasses share one number sequence unless
+    :meth:`set_counter` is called on the subclass.
+    
+    **Members**
+    
+    ..  autosummary::
+    
+        name
+        number
+        created
+        id
+        set_counter
+        get
+        __getitem__
+        __setitem__
+        __contains__
+        __str__
+    """
+    __slots__ = ('name', 'number', 'created', '_attributes')
+    
+    _count = count(1)
+    
+    def __init__(self, name = "Entity", created = None):
+        """Create a LightEntity object.
+        
+        *Arguments*
+            ``name`` (String)
+                Optional, defaults to "Entity". A short name that will
+                appear in the trace. The name is not validated.
+            ``created`` (Integer)
+                Optional. The simulation time at which the entity was
+                created. Defaults to the current simulation time, or
+                ``None`` if no simulation has been assigned.
+        """
+        self.name = name
+        self.number = next(self._count)
+        if created is None:
+            sim = Session().sim
+            if sim is not None:
+                created = sim.now
+        self.created = created
+        self._attributes = None
+        
+    @classmethod
+    def set_counter(cls):
+        """Restarts the class's number sequence at 1.
+        """
+        cls._count = count(1)
+        
+    @property
+    def id(self):
+        """String that uniquely identifies the entity. Read-only.
+        
+        Contains "<name>.<number>", matching :attr:`Component.id`.
+        """
+        return "{0}.{1}".format(self.name, self.number)
+    
+    def get(self, key, default = None):
+        """Returns a custom attribute, or ``default`` if it is not set.
+        """
+        if self._attributes is None:
+            return default
+        return self._attributes.get(key, default)
+    
+    def __getitem__(self, key):
+        """Returns a custom attribute.
+        
+        *Raises:* ``KeyError`` if the attribute is not set.
+        """
+        if self._attributes is None:
+            raise KeyError(key)
+        return self._attributes[key]
+    
+    def __setitem__(self, key, value):
+        """Sets a custom attribute.
+        """
+        if self._attributes is None:
+            self._attributes = {}
+        self._attributes[key] = value
+        
+    def __contains__(self, key):
+        return self._attributes is not None and key in self._attributes
+        
+    def __str__(self):
+        """Returns "<name>:<number>", matching Component.__str__.
+        """
+        return "{0}:{1}".format(self.name, self.number)
+    
+    def __repr__(self):
+        return "<LightEntity {}>".format(self)
+    
+    
+class EntityTable(Component):
+    """Stores entity attributes in typed numpy columns.
+    
+    For population-style models, an EntityTable replaces per-object
+    entity attributes with one numpy array per attribute. The table
+    issues integer entity ids, which are row numbers, and queues and
+    resources can carry the ids in place of entity objects. Columns
+    double in size when full.
+    
+    Every row also records the replication in which it was created, in
+    the read-only ``rep`` column. Ids are never reused, so rows from
+    all reps are available for analysis after the simulation.
+    
+    Cells that have not been set contain ``NaN`` in floating point
+    columns and zero in other columns.
+    
+    **Inherited Classes**
+      * :class:`despy.model.component.Component`
+      
+    **Members**
+    
+    ..  autosummary::
+    
+        columns
+        __len__
+        __getitem__
+        new
+        get
+        set
+        durations
+        group_by
+        finalize
+    """
+    
+    def __init__(self, name, columns, description = None,
+                 capacity = 1024):
+        """Create an EntityTable object.
+        
+        *Arguments*
+            ``name`` (String)
+                A short descriptive name for the table.
+            ``columns``
+                A sequence of ``(column_name, dtype)`` tuples, or an
+                OrderedDict that maps column names to numpy dtypes, for
+                example ``[('arrival', 'f8'), ('cls', 'u2')]``.
+            ``description`` (String)
+                Optional. Default is None.
+            ``capacity`` (Integer)
+                Optional, defaults to 1024. Number of rows allocated
+                initially.
+                
+        *Raises:* ``ValueError`` if a column is named ``rep``.
+        """
+        super().__init__(name, description = description)
+        self._dtypes = OrderedDict((column, np.dtype(dtype))
+                                   for column, dtype in
+                                   OrderedDict(columns).items())
+        if 'rep' in self._dtypes:
+            raise ValueError("EntityTable column name 'rep' is reserved.")
+        self._dtypes['rep'] = np.dtype('u4')
+        self._length = 0
+        self._columns = OrderedDict((column, self._allocate(dtype,
+                                                            capacity))
+                                    for column, dtype in
+                                    self._dtypes.items())
+        
+    @staticmethod
+    def _allocate(dtype, size):
+        """Returns a column filled with the empty-cell value.
+        """
+        if dtype.kind in 'fc':
+            return np.full(size, np.nan, dtype = dtype)
+        return np.zeros(size, dtype = dtype)
+        
+    def _grow(self):
+        """Doubles the number of allocated rows.
+        """
+        for column, data in self._columns.items():
+            grown = self._allocate(data.dtype, max(2 * len(data), 16))
+            grown[:self._length] = data[:self._length]
+            self._columns[column] = grown
+        
+    @property
+    def columns(self):
+        """Names of the table's columns, including ``rep``.
+        
+        *Type:* List of strings, read-only.
+        """
+        return list(self._columns)
+    
+    def __len__(self):
+        """Built-in len() function returns the number of entities.
+        """
+        return self._length
+    
+    def __getitem__(self, column):
+        """Returns a view of a column, one element per entity id.
+        
+        *Arguments*
+            ``column`` (String)
+                The column name.
+        """
+        return self._columns[column][:self._length]
+    
+    def new(self, **values):
+        """Adds an entity and returns its integer id.
+        
+        *Arguments*
+            ``values``
+                Optional initial values, as ``column_name = value``
+                keyword arguments.
+                
+        *Returns:* Integer. Ids start at zero and increase by one.
+        """
+        entity_id = self._length
+        if entity_id == len(self._columns['rep']):
+            self._grow()
+        self._length = entity_id + 1
+        columns = self._columns
+        for column, value in values.items():
+            columns[column][entity_id] = value
+        sim = self.sim
+        if sim is not None:
+            columns['rep'][entity_id] = sim.rep
+        return entity_id
+    
+    def get(self, entity_id, column):
+        """Returns one attribute of an entity.
+        """
+        return self._columns[column][entity_id]
+    
+    def set(self, entity_id, column, value):
+        """Sets one attribute of an entity.
+        
+        *Raises:* ``IndexError`` if ``entity_id`` was not issued by the
+        table.
+        """
+        if not 0 <= entity_id < self._length:
+            raise IndexError("Entity id {} is not in EntityTable {}."
+                             "".format(entity_id, self.name))
+        self._columns[column][entity_id] = value
+        
+    def durations(self, start_column, end_column):
+        """Returns ``end_column - start_column`` for every entity.
+        
+        For example, ``durations('arrival', 'departure')`` returns
+        cycle times. Entities that have not reached the end have
+        ``NaN`` durations if the columns are floating point.
+        
+        *Returns:* Numpy array.
+        """
+        return self[end_column] - self[start_column]
+    
+    def group_by(self, values, key_column):
+        """Splits an array of per-entity values by a key column.
+        
+        *Arguments*
+            ``values`` (Numpy array)
+                One value per entity, such as a column or the result of
+                :meth:`durations`.
+            ``key_column`` (String)
+                Entities are grouped by the value in this column, such
+                as an entity class or ``rep``.
+                
+        *Returns:* An OrderedDict that maps each key, in ascending
+        order, to a numpy array of the values for that key. Values
+        keep their entity id order within each group.
+        """
+        keys = self[key_column]
+        order = np.argsort(keys, kind = 'mergesort')
+        unique_keys, starts = np.unique(keys[order], return_index = True)
+        groups = np.split(np.asarray(values)[order], starts[1:])
+        return OrderedDict(zip(unique_keys.tolist(), groups))
+    
+    def finalize(self):
+        """Releases unused rows.
+        """
+        for column, data in self._columns.items():
+            self._columns[column] = data[:self._length].copy()
@@ -10,12 +10,12 @@ despy.model.process
 ..  autosummary::
 
     Process
+    ProcessTimeOutEvent
     
     
 ..  todo::
 
-    Refactor processTuple. Make attribute names consistent with felItem
-    class. Make a class attribute.
+    Make processTuple attribute names consistent with felItem class.
 
     Determine if check for function of method type on generator function
     is necessary. Will need to do test with independent generator
@@ -29,10 +29,12 @@ despy.model.process
 """
 
 from collections import namedtuple
+import numbers
 import types
 
 from despy.model.component import Component
-from despy.fel.event import Event, Priority
+from despy.fel.event import Event, LightEvent, EventPool, Priority
+from despy.model.waitable import AbstractWaitable
 
 class Process(Component):
     """Portion of a real-world system, including events and parameters.
@@ -44,6 +46,17 @@ class Process(Component):
     events. Designers can use processes to simulate the entire lifetime
     of an entity or portion of the system.
     
+    The generator can yield the result of :meth:`schedule_timeout`,
+    or, more cheaply, a plain delay (``yield 5``) or a delay and
+    priority (``yield 5, dp.LATE``). Plain delays reuse a single
+    resumption event that belongs to the process, so a process does
+    not allocate a new event object at each step. Yielding an
+    :class:`despy.model.waitable.AbstractWaitable`, such as a
+    :class:`despy.model.waitable.Signal`, a
+    :class:`despy.model.queue.Queue` or the result of
+    :meth:`despy.model.resource.Resource.serve`, suspends the process
+    without scheduling any events until the condition is satisfied.
+    
     **Inherited Classes**
       * :class:`despy.base.named_object2.NamedObject`
       * :class:`despy.model.component.Component`
@@ -52,10 +65,13 @@ class Process(Component):
     
     .. autosummary::
     
+        processTuple
         awake
         generator
         start
         call
+        dp_resume
+        resume_event
         schedule_timeout
         sleep
         wake
@@ -85,18 +101,36 @@ class Process(Component):
         """
         super().__init__(name)
         
-        self.processTuple = namedtuple('processTuple', ['event_',
-                                                        'delay_',
-                                                        'priority_'])
         self._awake = False
+        self._resume_event = None
+        self._resume_value = None
+        self._event_pool = EventPool(owner = self)
         
         if generator_function != None:
             self._generator = generator_function
             
+        self._iterator = self._create_iterator()
+        
+    processTuple = namedtuple('processTuple', ['event_', 'delay_',
+                                               'priority_'])
+    """(Class) A named tuple returned by :meth:`schedule_timeout`.
+    
+    *Attributes*
+        ``event_``
+            The :class:`ProcessTimeOutEvent` that resumes the process.
+        ``delay_``
+            Time until the process resumes.
+        ``priority_``
+            Priority of the event that resumes the process.
+    """
+            
+    def _create_iterator(self):
+        """Calls the generator function and returns the iterator.
+        """
         if isinstance(self.generator, types.FunctionType):
-            self._iterator = self.generator(self)
+            return self.generator(self)
         elif isinstance(self.generator, types.MethodType):
-            self._iterator = self.generator()
+            return self.generator()
         else:
             raise TypeError(\
                 "generator_method must be a function or class method")
@@ -146,18 +180,76 @@ class Process(Component):
 
     def call(self):
         """Calls the iterator and schedules resulting event on FEL.
+        
+        The iterator can yield a :attr:`processTuple`, a delay, a
+        ``(delay, priority)`` tuple, a waitable object, or ``None``.
+        The process goes to sleep when the generator returns.
+        
+        *Raises:* ``TypeError`` if the iterator yields any other type
+        of object.
+        """
+        value, self._resume_value = self._resume_value, None
+        try:
+            yielded = self._iterator.send(value)
+        except StopIteration:
+            self._awake = False
+            return
+        if yielded is None:
+            return
+        if isinstance(yielded, AbstractWaitable):
+            yielded.dp_wait(self)
+            return
+        if isinstance(yielded, Process.processTuple):
+            event, delay, priority = yielded
+        elif isinstance(yielded, tuple):
+            event = self.resume_event
+            delay, priority = yielded
+        elif isinstance(yielded, numbers.Real):
+            event, delay, priority = self.resume_event, yielded, \
+                                     Priority.STANDARD
+        else:
+            raise TypeError("Process {} yielded {}. Processes must yield "
+                            "a delay, a (delay, priority) tuple, None, or "
+                            "the result of schedule_timeout()."
+                            "".format(self.name, type(yielded)))
+        if self.awake:
+            self.sim.schedule(event, delay, priority)
+            
+    def dp_resume(self, value = None, priority = Priority.STANDARD):
+        """Resumes a process that is waiting on a waitable object.
+        
+        Internal Method. Schedules the process's :attr:`resume_event`
+        at the current time.
+        
+        *Arguments*
+            ``value``
+                Optional. Becomes the result of the generator's
+                ``yield`` expression.
+            ``priority``
+                Priority of the resumption event. Defaults to
+                Priority.STANDARD.
+        """
+        self._resume_value = value
+        self.sim.schedule(self.resume_event, 0, priority)
+            
+    @property
+    def resume_event(self):
+        """The event that resumes the process after a plain delay.
+        
+        The event is created the first time it is needed and reused
+        for every later delay.
+        
+        *Type:* :class:`despy.fel.event.LightEvent`, read-only.
         """
-        scheduled_event = next(self._iterator)
-        if scheduled_event != None:
-            if self.awake:
-                self.sim.schedule(scheduled_event.event_,
-                                    scheduled_event.delay_,
-                                    scheduled_event.priority_)
+        if self._resume_event is None:
+            self._resume_event = LightEvent(self.name, self.call,
+                                            owner = self)
+        return self._resume_event
         
     def schedule_timeout(self, name, delay = 0,
                          priority = Priority.STANDARD,
                          trace_fields = None):
-        """Returns a ProcessTimeOutEvent.
+        """Returns a processTuple for a pooled timeout event.
         
         Designers can use this method with the yield statement in the
         generator function to pause the process and resume at a
@@ -174,9 +266,12 @@ class Process(Component):
                 Data in trace_fields dictionary will be added to the
                 event's record in the trace report.
                 
-        *Returns:* Process.processTuple namedtuple.
+        *Returns:* Process.processTuple namedtuple. The event is a
+        pooled :class:`despy.fel.event.LightEvent` that is recycled
+        after it occurs.
         """
-        event = ProcessTimeOutEvent(self, name, trace_fields)
+        event = self._event_pool.acquire(name, self.call,
+                                         trace_fields = trace_fields)
         return self.processTuple(event_ = event,
                                  delay_ = delay,
                                  priority_ = priority)
@@ -206,7 +301,7 @@ class Process(Component):
     def reset_process(self):
         """Returns process to initial conditions by replacing iterator.
         """
-        self._iterator = self.generator
+        self._iterator = self._create_iterator()
         
 class ProcessTimeOutEvent(Event):
     """Restarts a process after a specified time interval has elapsed.
@@ -10,6 +10,13 @@ despy.model.queue
 ..  autosummary::
 
     Queue
+    QueueRenegeEvent
+    AbstractDiscipline
+    FifoDiscipline
+    LifoDiscipline
+    PriorityDiscipline
+    SptDiscipline
+    RandomDiscipline
     
 ..  todo
    
@@ -23,28 +30,286 @@ despy.model.queue
     
     Remove reference to histogram folder from get_data method.
     
-    Refactor time in queue to use Statistic class.
-    
     Change getData so it doesn't need folder from session.
 """
 
-from collections import deque, namedtuple, OrderedDict
+import abc
+from collections import deque, OrderedDict
+from heapq import heappush, heappop, heapify
+from itertools import count
 
 import numpy as np
 
 from despy.model.component import Component
+from despy.fel.event import Event
+from despy.model.waitable import AbstractWaitable
+from despy.output.counter import Counter
+from despy.output.journey import Stage
 from despy.output.report import Datatype
 import despy.output.plot as plot
 from despy.output.statistic import DiscreteStatistic
 from despy.output.statistic import TimeWeightedStatistic
 
-class Queue(Component):
+class AbstractDiscipline(metaclass = abc.ABCMeta):
+    """Determines the order in which items leave a :class:`Queue`.
+    
+    A discipline stores the queue's :attr:`Queue.Item` tuples. Each
+    Queue object needs its own discipline instance.
+    
+    **Members**
+    
+    ..  autosummary::
+    
+        __len__
+        push
+        pop
+        clear
+        compact
+    """
+    
+    @abc.abstractmethod
+    def __len__(self):
+        """Built-in len() function returns the number of items.
+        """
+        pass
+    
+    @abc.abstractmethod
+    def push(self, item):
+        """Adds a :attr:`Queue.Item` to the discipline.
+        """
+        pass
+    
+    @abc.abstractmethod
+    def pop(self):
+        """Removes and returns the next :attr:`Queue.Item`.
+        
+        *Raises:* ``IndexError`` if the discipline is empty.
+        """
+        pass
+    
+    @abc.abstractmethod
+    def clear(self):
+        """Removes all items.
+        """
+        pass
+    
+    @abc.abstractmethod
+    def compact(self):
+        """Discards items whose ``active`` attribute is False.
+        """
+        pass
+    
+    
+class FifoDiscipline(AbstractDiscipline):
+    """First in, first out. The default discipline. O(1) add and remove.
+    """
+    def __init__(self):
+        self._items = deque()
+        
+    def __len__(self):
+        return len(self._items)
+    
+    def push(self, item):
+        self._items.append(item)
+        
+    def pop(self):
+        return self._items.popleft()
+    
+    def clear(self):
+        self._items.clear()
+        
+    def compact(self):
+        self._items = deque(item for item in self._items if item.active)
+        
+        
+class LifoDiscipline(AbstractDiscipline):
+    """Last in, first out. O(1) add and remove.
+    """
+    def __init__(self):
+        self._items = []
+        
+    def __len__(self):
+        return len(self._items)
+    
+    def push(self, item):
+        self._items.append(item)
+        
+    def pop(self):
+        return self._items.pop()
+    
+    def clear(self):
+        del self._items[:]
+        
+    def compact(self):
+        self._items = [item for item in self._items if item.active]
+        
+        
+class PriorityDiscipline(AbstractDiscipline):
+    """Items with the smallest key leave first. O(log n) add and remove.
+    
+    Items are stored in a heap. Items with equal keys leave in the
+    order in which they arrived. The key is the ``key`` argument of
+    :meth:`Queue.add`, or if that is ``None``, the result of calling the
+    discipline's key function on the added object.
+    """
+    def __init__(self, key = None):
+        """Create a PriorityDiscipline object.
+        
+        *Arguments*
+            ``key`` (Python function object)
+                Optional. A function that accepts the object added to
+                the queue and returns its sort key. If ``None``, items
+                added without a key have key 0.
+        """
+        self._key = key
+        self._heap = []
+        self._arrivals = count()
+        
+    def __len__(self):
+        return len(self._heap)
+    
+    def get_key(self, item):
+        """Returns the sort key of a :attr:`Queue.Item`.
+        """
+        if item.key_fld is not None:
+            return item.key_fld
+        elif self._key is not None:
+            return self._key(item.item_fld)
+        else:
+            return 0
+    
+    def push(self, item):
+        heappush(self._heap, (self.get_key(item), next(self._arrivals),
+                              item))
+        
+    def pop(self):
+        return heappop(self._heap)[2]
+    
+    def clear(self):
+        del self._heap[:]
+        
+    def compact(self):
+        self._heap = [entry for entry in self._heap if entry[2].active]
+        heapify(self._heap)
+        
+        
+class SptDiscipline(PriorityDiscipline):
+    """Shortest processing time first. O(log n) add and remove.
+    
+    The key is the item's processing time, which is passed as the
+    ``key`` argument of :meth:`Queue.add` or computed by the key
+    function.
+    """
+    def __init__(self, key = None):
+        """Create a SptDiscipline object.
+        
+        *Arguments*
+            ``key`` (Python function object)
+                Optional. A function that accepts the object added to
+                the queue and returns its processing time.
+        """
+        super().__init__(key)
+        
+    def get_key(self, item):
+        if item.key_fld is None and self._key is None:
+            raise ValueError("SptDiscipline requires a processing time. "
+                             "Pass it to Queue.add() as the key argument "
+                             "or give the discipline a key function.")
+        return super().get_key(item)
+        
+        
+class RandomDiscipline(AbstractDiscipline):
+    """Items leave in random order. O(1) add and remove.
+    
+    The randomly selected item is swapped with the last item before it
+    is removed, so no items are shifted.
+    """
+    def __init__(self):
+        self._items = []
+        
+    def __len__(self):
+        return len(self._items)
+    
+    def push(self, item):
+        self._items.append(item)
+        
+    def pop(self):
+        items = self._items
+        if not items:
+            raise IndexError("pop from an empty RandomDiscipline")
+        index = np.random.randint(len(items))
+        items[index], items[-1] = items[-1], items[index]
+        return items.pop()
+    
+    def clear(self):
+        del self._items[:]
+        
+    def compact(self):
+        self._items = [item for item in self._items if item.active]
+    
+
+class QueueRenegeEvent(Event):
+    """Removes entities whose patience has run out from a :class:`Queue`.
+    
+    **Inherited Classes**
+      * :class:`despy.base.named_object2.NamedObject`
+      * :class:`despy.model.component.Component`
+      * :class:`despy.model.event.Event`
+      
+    Each queue keeps at most one live QueueRenegeEvent on the FEL. The
+    queue cancels and reschedules the event only when the earliest
+    deadline moves earlier. When entities leave before their deadline,
+    the event stays at its original time; it then finds no expired
+    deadlines and reschedules itself for the new earliest one. Cancelled
+    entries remain on the FEL until they reach the front, where the
+    simulation skips them.
+    
+    **Members**
+    
+    ..  autosummary::
+    
+        queue
+    """
+    
+    def __init__(self, queue):
+        """Create a QueueRenegeEvent object.
+        
+        *Arguments*
+            ``queue`` (:class:`Queue`)
+                The queue that entities will leave.
+        """
+        super().__init__("Renege_{}".format(queue.name))
+        self._queue = queue
+        
+    @property
+    def queue(self):
+        """The queue that entities will leave.
+        
+        *Type:* :class:`Queue`
+        """
+        return self._queue
+    
+    def do_event(self):
+        self._queue.dp_renege(self)
+
+
+class Queue(Component, AbstractWaitable):
     """A component that represents a real world queue.
     
     A Queue object represents a real-world queue, such as a line of
     customers waiting for a server, or a line of products waiting for a
     machine.
     
+    Entities balk (are turned away) when the queue already holds
+    ``max_length`` entities, and renege (leave without being served)
+    when they have waited longer than the ``patience`` passed to
+    :meth:`add`. Reneging entities are marked inactive rather than
+    searched for, and pending deadlines are kept in a heap.
+    
+    A process that yields the queue waits until the queue is not empty.
+    The process resumes with the next item, which has already been
+    removed from the queue.
+    
     **Inherited Classes**
       * :class:`despy.base.named_object2.NamedObject`
       * :class:`despy.model.component.Component`
@@ -54,16 +319,21 @@ class Queue(Component):
     ..  autosummary::
     
         Item
+        discipline
+        max_length
         length
         times_in_queue
         add
         remove
+        append_renege_callback
+        dp_renege
+        dp_wait
         get_data
       
     """
 
     def __init__(self, name, max_length = None,
-                 description = None):
+                 description = None, discipline = None):
         """Create a Queue object.
         
         *Arguments*
@@ -77,26 +347,92 @@ class Queue(Component):
                 be limited to ``max_length``.
             ``description`` (String)
                 Optional. Default is None. 
+            ``discipline`` (:class:`AbstractDiscipline`)
+                Optional. Determines the order in which items leave the
+                queue. Defaults to a new :class:`FifoDiscipline`.
         """
         
         super().__init__(name, description = description)
-        if isinstance(max_length, int):
-            self._queue = deque(max_length)
-        else:
-            self._queue = deque()
-        self._times_in_queue = []
+        if discipline is None:
+            discipline = FifoDiscipline()
+        self.discipline = discipline
+        self.max_length = max_length
+        self._length = 0
+        self._deadlines = []
+        self._deadline_counter = count()
+        self._renege_event = QueueRenegeEvent(self)
+        self._renege_fel_item = None
+        self._renege_deadline = None
+        self._renege_callbacks = []
+        self._getters = {}
         self.results.stats['Queue_time'] = DiscreteStatistic('w_q', 'u4')
         self.results.stats['Queue_length'] = TimeWeightedStatistic('L_q', 'u4')
+        self.results.stats['Balked'] = Counter('Balked')
+        self.results.stats['Reneged'] = Counter('Reneged')
+        
+    class Item(object):
+        """(Class) Contains an item added to the queue.
         
-    Item = namedtuple('Item', ['item_fld', 'time_in_fld'])
-    """(Class) A named tuple that contains an item added to the queue.
+        *Attributes*
+            ``item_fld``
+                An object that is added to the queue.
+            ``time_in_fld``
+                The time the object was added to the queue.
+            ``key_fld``
+                The sort key passed to :meth:`Queue.add`, or ``None``.
+            ``deadline_fld``
+                The time at which the object reneges, or ``None``.
+            ``active``
+                False once the object has reneged. Disciplines skip
+                inactive items.
+        """
+        __slots__ = ('item_fld', 'time_in_fld', 'key_fld', 'deadline_fld',
+                     'active')
+        
+        def __init__(self, item_fld, time_in_fld, key_fld = None,
+                     deadline_fld = None):
+            self.item_fld = item_fld
+            self.time_in_fld = time_in_fld
+            self.key_fld = key_fld
+            self.deadline_fld = deadline_fld
+            self.active = True
     
-    *Attributes*
-        ``item_fld``
-            An object that is added to the queue.
-        ``time_in_fld``
-            The time the object was added to the queue.
-    """
+    @property
+    def discipline(self):
+        """Determines the order in which items leave the queue.
+        
+        *Type:* :class:`AbstractDiscipline`
+        
+        *Raises:* ``TypeError`` if set to an object that is not an
+        instance of :class:`AbstractDiscipline`.
+        """
+        return self._discipline
+    
+    @discipline.setter
+    def discipline(self, discipline):
+        if not isinstance(discipline, AbstractDiscipline):
+            raise TypeError("{} passed to Queue.discipline. Must be an "
+                            "instance of despy.model.queue."
+                            "AbstractDiscipline.".format(type(discipline)))
+        self._discipline = discipline
+
+    @property
+    def max_length(self):
+        """The largest number of entities the queue will hold.
+        
+        *Type:* Integer or ``None``. If ``None``, the queue length is
+        not limited.
+        
+        *Raises:* ``ValueError`` if set to a negative number.
+        """
+        return self._max_length
+    
+    @max_length.setter
+    def max_length(self, max_length):
+        if max_length is not None and max_length < 0:
+            raise ValueError("Queue.max_length was set to {}. Must be None "
+                             "or a non-negative integer.".format(max_length))
+        self._max_length = max_length
 
     @property
     def length(self):
@@ -104,19 +440,22 @@ class Queue(Component):
         
         *Type:* Integer, read-only.
         """
-        return len(self._queue)
+        return self._length
 
     @property
     def times_in_queue(self):
-        """List of times (integers) that entities spent in the queue.
+        """Times (integers) that entities spent in the queue.
         
-        *Type:* List of integers, read-only.
+        *Type:* Numpy array, read-only. A view of the values of the
+        ``Queue_time`` statistic, covering all reps. Use the
+        statistic's ``rep_values()`` method for a single rep.
         
-        The first element of the list is the time that the first entity
+        The first element of the array is the time that the first entity
         to leave the queue spent in the queue, the second element is for
-        the second entity to leave the queue, etc.
+        the second entity to leave the queue, etc. Entities that renege
+        are not included.
         """
-        return self._times_in_queue
+        return self.results.stats['Queue_time'].values
     
     def setup(self):
         self.results.stats['Queue_length'].append(self.sim.now,
@@ -129,46 +468,195 @@ class Queue(Component):
     def teardown(self):
         self.clear()
 
-    def add(self, item):
-        """Add an item to the end of the queue.
+    def add(self, item, key = None, patience = None):
+        """Add an item to the queue.
         
         *Arguments*
             ``item``
                 The item that will be added to the queue.
+            ``key``
+                Optional. Sort key, such as a priority or processing
+                time, used by :class:`PriorityDiscipline` and
+                :class:`SptDiscipline`. Ignored by other disciplines.
+            ``patience`` (Integer)
+                Optional. If not ``None``, the item reneges if it is
+                still in the queue after waiting ``patience`` time
+                units.
+                
+        *Returns:* ``True`` if the item joined the queue, or ``False``
+        if the queue was full and the item balked.
         """
-        self._queue.append(Queue.Item(item_fld = item, \
-                                      time_in_fld = self.sim.now))
-        message = "Entering Queue"
-        fields = OrderedDict()
-        fields["Length"] = self.length
-        fields["Entity"] = str(item)
-        self.sim.results.trace.add_message(message, fields)
+        trace = self.sim.results.trace
+        if self._max_length is not None and \
+                self._length >= self._max_length:
+            self.results.stats['Balked'].increment()
+            self.dp_record_journey(Stage.balk, item)
+            if trace.active:
+                fields = OrderedDict()
+                fields["Length"] = self.length
+                fields["Entity"] = str(item)
+                trace.add_message("Balking", fields, self)
+            return False
+        
+        deadline = None
+        if patience is not None:
+            deadline = self.sim.now + round(patience)
+        q_item = Queue.Item(item, self.sim.now, key, deadline)
+        self._discipline.push(q_item)
+        self._length += 1
+        self.dp_record_journey(Stage.queue_enter, item)
+        if deadline is not None:
+            heappush(self._deadlines,
+                     (deadline, next(self._deadline_counter), q_item))
+            self._schedule_renege()
+        
+        if trace.active:
+            message = "Entering Queue"
+            fields = OrderedDict()
+            fields["Length"] = self.length
+            fields["Entity"] = str(item)
+            trace.add_message(message, fields, self)
+        
+        if self._getters:
+            process = next(iter(self._getters))
+            del self._getters[process]
+            process.dp_resume(self.remove())
+        return True
     
     def remove(self):
-        """Remove an item from the beginning of the queue.
+        """Remove the next item from the queue.
         
-        *Arguments*
-            ``item``
-                The item that will be removed from the queue.
+        The queue's :attr:`discipline` determines which item is next.
                 
         *Returns:* The item that was removed from the queue.
         """
-        item = self._queue.popleft()
+        return self._remove().item_fld
+    
+    def _remove(self):
+        """Removes the next :attr:`Queue.Item` and records statistics.
+        """
+        item = self._discipline.pop()
+        while not item.active:
+            item = self._discipline.pop()
+        item.active = False
+        self._length -= 1
+        self.dp_record_journey(Stage.queue_exit, item.item_fld)
+        if item.deadline_fld is not None:
+            self._schedule_renege()
         q_time = self.sim.now - item.time_in_fld
-        self.times_in_queue.append(q_time)
         self.results.stats['Queue_time'].append(self.sim.now, q_time)
         
-        message = "Leaving Queue"
-        fields = OrderedDict()
-        fields["Length"] = self.length
-        fields["Entity"] = str(item.item_fld)
-        fields["Time_in_Q"] = q_time
-        self.sim.results.trace.add_message(message, fields)        
+        trace = self.sim.results.trace
+        if trace.active:
+            message = "Leaving Queue"
+            fields = OrderedDict()
+            fields["Length"] = self.length
+            fields["Entity"] = str(item.item_fld)
+            fields["Time_in_Q"] = q_time
+            trace.add_message(message, fields, self)
         
-        return item.item_fld
+        return item
     
     def clear(self):
-        self._queue.clear()
+        """Removes all items, without recording statistics.
+        """
+        self._discipline.clear()
+        self._length = 0
+        self._getters.clear()
+        del self._deadlines[:]
+        if self._renege_fel_item is not None:
+            self.sim.cancel(self._renege_fel_item)
+            self._renege_fel_item = None
+            
+    def dp_wait(self, process):
+        """Resumes the process with the next item once one is available.
+        
+        Internal Method. Called when a process yields the queue.
+        
+        *Arguments*
+            ``process`` (:class:`despy.model.process.Process`)
+                The waiting process.
+        """
+        if self._length > 0:
+            process.dp_resume(self.remove())
+        else:
+            self._getters[process] = None
+            
+    def append_renege_callback(self, callback):
+        """Appends a function that is called when an item reneges.
+        
+        *Arguments*
+            ``callback`` (Python function object)
+                Called with the queue and the item that left the queue.
+        """
+        self._renege_callbacks.append(callback)
+        
+    def _schedule_renege(self):
+        """Keeps one renege event on the FEL, no later than the earliest
+        deadline.
+        
+        An event that is already scheduled at or before the earliest
+        deadline is kept, so entities leaving the queue do not cause
+        the event to be cancelled and rescheduled.
+        """
+        deadlines = self._deadlines
+        while deadlines and not deadlines[0][2].active:
+            heappop(deadlines)
+        if len(deadlines) > 2 * self._length + 16:
+            self._deadlines = deadlines = [entry for entry in deadlines
+                                           if entry[2].active]
+            heapify(deadlines)
+            
+        fel_item = self._renege_fel_item
+        if deadlines:
+            deadline = deadlines[0][0]
+            if fel_item is not None:
+                if self._renege_deadline <= deadline:
+                    return
+                self.sim.cancel(fel_item)
+            self._renege_deadline = deadline
+            self._renege_fel_item = self.sim.schedule(
+                                self._renege_event, deadline - self.sim.now)
+        elif fel_item is not None:
+            self.sim.cancel(fel_item)
+            self._renege_fel_item = None
+            
+    def dp_renege(self, event):
+        """Removes items whose deadline has passed.
+        
+        Internal Method. Called by :class:`QueueRenegeEvent`.
+        
+        *Arguments*
+            ``event`` (:class:`QueueRenegeEvent`)
+                The event that is executing. Trace messages are attached
+                to the event.
+        """
+        self._renege_fel_item = None
+        deadlines = self._deadlines
+        reneged = []
+        traced = self.sim.results.trace.active
+        while deadlines and deadlines[0][0] <= self.sim.now:
+            q_item = heappop(deadlines)[2]
+            if not q_item.active:
+                continue
+            q_item.active = False
+            self._length -= 1
+            self.results.stats['Reneged'].increment()
+            self.dp_record_journey(Stage.renege, q_item.item_fld)
+            reneged.append(q_item.item_fld)
+            if traced:
+                fields = OrderedDict()
+                fields["Length"] = self.length
+                fields["Entity"] = str(q_item.item_fld)
+                fields["Time_in_Q"] = self.sim.now - q_item.time_in_fld
+                event.add_message("Reneging", fields, self)
+            
+        if len(self._discipline) > 2 * self._length + 16:
+            self._discipline.compact()
+        self._schedule_renege()
+        for item in reneged:
+            for callback in self._renege_callbacks:
+                callback(self, item)
     
     def get_data(self, full_path):
         """Creates charts and adds data to final report.
@@ -182,9 +670,9 @@ class Queue(Component):
         containing data for the final report.
         """
         # Create Time in Queue Histogram
-        qtimes = np.array(self.times_in_queue, np.int32)
+        qtimes = self.times_in_queue
         qtime_filename = '{0}_time_in_q'.format(self.id)
-        full_fname = plot.Histogram(self.times_in_queue, full_path,
+        full_fname = plot.Histogram(qtimes, full_path,
                        qtime_filename,
                        title = self.name,
                        x_label = "Time in Queue",
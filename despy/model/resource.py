@@ -10,32 +10,287 @@ despy.model.resource
 ..  autosummary::
 
     Resource
+    CountingResource
+    PreemptiveResource
     ResourceFinishServiceEvent
     ResourceQueue
+    PreemptiveResourceQueue
+    ServiceRequest
+    Selection
+    FreeIndex
     
 ..  todo
 
     Modify get_service_time feature to allow passing a frozen scipy
     distribution directly into Resource.
     
-    Test different options for selection of empty resources, either
-    prioritization by number, random selection, or equal loading.
-    
     Check dictionary used to store resources in ResourceQueue class.
     It may cause problems when there is more than one Resource due to
     not preserving order.
 """
 
-from collections import OrderedDict, namedtuple
+from collections import OrderedDict, namedtuple, deque
+from enum import Enum
+from heapq import heappush, heappop, heapify
+from itertools import count
 
-from scipy.stats import randint
+import numpy as np
 
 from despy.model.component import Component
-from despy.fel.event import Event
-from despy.model.queue import Queue
+from despy.fel.event import Event, EventPool
+from despy.model.queue import Queue, PriorityDiscipline
+from despy.model.waitable import AbstractWaitable
 from despy.output.statistic import DiscreteStatistic
 from despy.output.statistic import TimeWeightedStatistic
 from despy.output.report import Datatype
+from despy.output.journey import Stage
+
+
+class Selection(Enum):
+    """Policies for choosing among several available stations or resources.
+
+    **Members**
+
+        *Selection.lowest*
+            Choose the available station or resource with the lowest
+            index.
+
+        *Selection.random*
+            Choose an available station or resource at random.
+
+        *Selection.least_recent*
+            Choose the station that has been idle the longest, i.e.,
+            the least recently used available station. Resource
+            stations only.
+            
+        *Selection.least_utilized*
+            Choose the available resource with the smallest fraction
+            of busy stations. ResourceQueue only.
+            
+        *Selection.round_robin*
+            Choose the first available station or resource after the
+            one that was chosen last, wrapping around to the
+            beginning.
+    """
+    lowest = 1
+    random = 2
+    least_recent = 3
+    least_utilized = 4
+    round_robin = 5
+
+
+class FreeIndex(object):
+    """Indexed set of available (free) slots numbered 0 to size - 1.
+
+    A FreeIndex tracks which stations of a resource are free without
+    scanning them. Free slots are counted in a binary indexed (Fenwick)
+    tree, so finding the lowest free slot, the k-th free slot, or a
+    randomly chosen free slot takes O(log n) time. If ``lru`` is True,
+    the FreeIndex also keeps a queue of slots in the order in which they
+    became free, which returns the least recently used free slot in
+    amortized O(1) time.
+
+    **Members**
+
+    ..  autosummary::
+
+        size
+        __len__
+        __contains__
+        add
+        discard
+        lowest
+        random
+        next_from
+        least_recent
+        kth
+        resize
+    """
+
+    def __init__(self, size, free = True, lru = False):
+        """Create a FreeIndex object.
+
+        *Arguments*
+            ``size`` (Integer)
+                Number of slots in the index.
+            ``free`` (Boolean)
+                Optional, defaults to True. If True, all slots are
+                initially free. Otherwise all slots are initially busy.
+            ``lru`` (Boolean)
+                Optional, defaults to False. If True, maintain the
+                order in which slots became free so that
+                :meth:`least_recent` is available.
+        """
+        self._size = size
+        if free:
+            self._flags = bytearray(b'\x01') * size
+            self._count = size
+        else:
+            self._flags = bytearray(size)
+            self._count = 0
+        self._build_tree()
+
+        if lru:
+            self._stamps = [0] * size
+            self._order = deque((0, index) for index in range(size)
+                                if self._flags[index])
+        else:
+            self._stamps = None
+            self._order = None
+
+    def _build_tree(self):
+        """Builds the Fenwick tree from the slot flags in O(n) time.
+        """
+        tree = [0] * (self._size + 1)
+        for pos in range(1, self._size + 1):
+            tree[pos] += self._flags[pos - 1]
+            parent = pos + (pos & -pos)
+            if parent <= self._size:
+                tree[parent] += tree[pos]
+        self._tree = tree
+        top = 1
+        while top * 2 <= self._size:
+            top *= 2
+        self._top = top
+
+    @property
+    def size(self):
+        """Total number of slots, free or busy. Read-only.
+
+        *Type:* Integer
+        """
+        return self._size
+
+    def __len__(self):
+        """Built-in len() function returns the number of free slots.
+        """
+        return self._count
+
+    def __contains__(self, index):
+        """True if the slot at ``index`` is free.
+        """
+        return bool(self._flags[index])
+
+    def _update(self, index, delta):
+        pos = index + 1
+        tree = self._tree
+        while pos <= self._size:
+            tree[pos] += delta
+            pos += pos & -pos
+
+    def _prefix(self, index):
+        """Returns the number of free slots with index less than ``index``.
+        """
+        total = 0
+        tree = self._tree
+        pos = index
+        while pos > 0:
+            total += tree[pos]
+            pos -= pos & -pos
+        return total
+
+    def add(self, index):
+        """Marks the slot at ``index`` as free.
+        """
+        if not self._flags[index]:
+            self._flags[index] = 1
+            self._count += 1
+            self._update(index, 1)
+            if self._order is not None:
+                self._stamps[index] += 1
+                self._order.append((self._stamps[index], index))
+                if len(self._order) > 2 * self._size + 16:
+                    self._compact()
+
+    def discard(self, index):
+        """Marks the slot at ``index`` as busy.
+        """
+        if self._flags[index]:
+            self._flags[index] = 0
+            self._count -= 1
+            self._update(index, -1)
+
+    def kth(self, k):
+        """Returns the index of the k-th free slot (k starts at zero).
+
+        *Returns:* Integer, or ``None`` if fewer than k + 1 slots are
+        free.
+        """
+        if k < 0 or k >= self._count:
+            return None
+        pos = 0
+        remaining = k + 1
+        step = self._top
+        tree = self._tree
+        while step:
+            nxt = pos + step
+            if nxt <= self._size and tree[nxt] < remaining:
+                pos = nxt
+                remaining -= tree[nxt]
+            step //= 2
+        return pos
+
+    def lowest(self):
+        """Returns the free slot with the lowest index, or ``None``.
+        """
+        return self.kth(0)
+
+    def random(self):
+        """Returns a randomly selected free slot, or ``None``.
+        """
+        if self._count == 0:
+            return None
+        return self.kth(np.random.randint(self._count))
+
+    def next_from(self, index):
+        """Returns the first free slot at or after ``index``, wrapping
+        around to the beginning. Returns ``None`` if no slots are free.
+        """
+        if self._count == 0:
+            return None
+        before = self._prefix(index % self._size)
+        if before < self._count:
+            return self.kth(before)
+        return self.kth(0)
+
+    def least_recent(self):
+        """Returns the free slot that has been free the longest.
+
+        *Returns:* Integer, or ``None`` if no slots are free.
+
+        *Raises:* ``RuntimeError`` if the FreeIndex was created with
+        ``lru = False``.
+        """
+        if self._order is None:
+            raise RuntimeError("FreeIndex was created without "
+                               "least recently used ordering.")
+        order = self._order
+        while order:
+            stamp, index = order[0]
+            if self._flags[index] and self._stamps[index] == stamp:
+                return index
+            order.popleft()
+        return None
+
+    def _compact(self):
+        """Drops stale entries from the least recently used order.
+        """
+        self._order = deque((stamp, index) for stamp, index in self._order
+                            if self._flags[index] and
+                            self._stamps[index] == stamp)
+
+    def resize(self, size):
+        """Changes the number of slots. New slots are busy.
+        """
+        if size < self._size:
+            raise ValueError("FreeIndex cannot shrink from {0} to {1} "
+                             "slots.".format(self._size, size))
+        self._flags.extend(bytearray(size - self._size))
+        if self._stamps is not None:
+            self._stamps.extend([0] * (size - self._size))
+        self._size = size
+        self._build_tree()
+
 
 class Resource(Component):
     """Represents a limited, real-world entity that provides a service.
@@ -54,13 +309,17 @@ class Resource(Component):
         capacity
         res_queue
         service_time
+        selection
+        available
         Station_tuple
         stations
         __str__
         __getitem__
         __setitem__
+        clear_stations
         get_available_station
         request
+        serve
         get_service_time
         start_service
         finish_service
@@ -69,7 +328,11 @@ class Resource(Component):
     """
     
     
-    def __init__(self, name, capacity = 1, time_function = None):
+    _Station_tuple = namedtuple('Station', ['entity', 'start_time'])
+    _empty_station = _Station_tuple(entity = None, start_time = None)
+    
+    def __init__(self, name, capacity = 1, time_function = None,
+                 selection = Selection.lowest):
         """Create a Resource object.
         
         *Arguments*
@@ -84,24 +347,31 @@ class Resource(Component):
             ``time_function`` (Python function object)
                 Optional, defaults to None. A function that returns the
                 time required to service an entity.
+            ``selection`` (:class:`Selection`)
+                Optional, defaults to Selection.lowest. Determines
+                which available station serves the next entity.
         """
         super().__init__(name)
         
         # Instance Attributes
         self._capacity = capacity
         self._res_queue = None
+        self._res_index = None
+        self._next_station = 0
+        self._service_waiters = {}
+        self._event_pool = EventPool(owner = self)
         self._service_time = time_function
+        self.selection = selection
         self.results.stats["Service Time"] = DiscreteStatistic("Service Time",
                                                         'u4')
         
-        self._Station_tuple = namedtuple('Station',
-                                        ['entity', 'start_time'])
         self.clear_stations()
-        """  """
         
     @property
     def capacity(self):
         """The number of entities that can be served simultaneously.
+        
+        Changing the capacity clears all stations.
          
         *Type:* Integer
         """
@@ -110,6 +380,40 @@ class Resource(Component):
     @capacity.setter
     def capacity(self, capacity):
         self._capacity = capacity
+        self.clear_stations()
+        
+    @property
+    def selection(self):
+        """Policy for choosing among available stations.
+        
+        *Type:* :class:`Selection`
+        
+        *Raises:* ``TypeError`` if set to a value that is not a member
+        of the :class:`Selection` enumeration.
+        """
+        return self._selection
+    
+    @selection.setter
+    def selection(self, selection):
+        if not isinstance(selection, Selection):
+            raise TypeError("{} passed to Resource.selection. Must be a "
+                            "member of despy.model.resource.Selection"
+                            ".".format(selection))
+        if selection is Selection.least_utilized:
+            raise ValueError("Selection.least_utilized applies to "
+                             "ResourceQueue objects, not Resource "
+                             "stations.")
+        self._selection = selection
+        if hasattr(self, "_free"):
+            self.clear_stations()
+        
+    @property
+    def available(self):
+        """The number of stations that are not serving an entity.
+        
+        *Type:* Integer, read-only
+        """
+        return len(self._free)
         
     @property    
     def res_queue(self):
@@ -185,35 +489,51 @@ class Resource(Component):
                 A ResourceStation namedtuple object.
         """
         self.stations[index] = entity
+        if entity.entity is None:
+            self._free.add(index)
+        else:
+            self._free.discard(index)
+        self._update_res_queue()
         
     def clear_stations(self):
-        empty_station = self.Station_tuple(entity = None,
-                                           start_time = None)
-        self._stations = [empty_station] * self.capacity
+        """Empties every station and rebuilds the index of free stations.
+        """
+        self._stations = [self._empty_station] * self.capacity
+        self._fel_items = {}
+        self._free = FreeIndex(self.capacity,
+                    lru = self.selection is Selection.least_recent)
+        self._next_station = 0
+        self._update_res_queue()
+        
+    def _update_res_queue(self):
+        """Notifies the resource queue that station availability changed.
+        """
+        if self._res_queue is not None:
+            self._res_queue.dp_update_availability(self)
 
     def get_available_station(self, random = False):
         """Returns the index of an empty station.
         
+        The station is chosen according to the :attr:`selection`
+        policy from an index of free stations, so the cost does not
+        grow with the resource's capacity.
+        
         *Arguments*
             ``random`` (Boolean)
                 If set to True, randomly chooses the index of an empty
-                station. Otherwise, returns the index of the empty
-                station with the lowest index value.
+                station, regardless of the :attr:`selection` policy.
                 
         *Returns:* A positive integer representing the index number of
         the station. ``None`` if no stations are empty.
         """
-        empty_stations = []
-        for index in range(self.capacity):
-            if self.stations[index].entity == None:
-                empty_stations.append(index)
-        
-        if len(empty_stations) == 0:
-            return None
-        elif not random:
-            return empty_stations[0]
+        if random or self._selection is Selection.random:
+            return self._free.random()
+        elif self._selection is Selection.least_recent:
+            return self._free.least_recent()
+        elif self._selection is Selection.round_robin:
+            return self._free.next_from(self._next_station)
         else:
-            return empty_stations[randint(0, len(empty_stations) - 1)]        
+            return self._free.lowest()
 
     def request(self, entity, random = False):
         """Request a resource for a entity.
@@ -228,10 +548,11 @@ class Resource(Component):
                 
         *Returns:* If a resource position is available, returns the
         index value of the resource that will serve the entity. Otherwise
-        returns False.
+        returns False, or ``None`` if the resource queue was full and the
+        entity balked.
         """
             
-        index = self.get_available_station()
+        index = self.get_available_station(random)
 
         if index is not None:
             #ResourceQueue position is available
@@ -240,9 +561,37 @@ class Resource(Component):
             return index
         else:
             #Resources all busy
-            if self.res_queue is not None:
-                self.res_queue.add(entity)
+            if self.res_queue is not None and \
+                    not self.res_queue.add(entity):
+                return None
             return False 
+        
+    def serve(self, entity, **kwargs):
+        """Returns a waitable request for serving an entity.
+        
+        A process that yields the result requests service for the
+        entity and resumes, with the entity, when the service finishes.
+        No events are scheduled for the process while it waits. The
+        resource must have a resource queue or a free station, or the
+        request will never finish.
+        
+        *Arguments*
+            ``entity``
+                The entity that will be serviced by the resource.
+            ``kwargs``
+                Passed to :meth:`request`.
+                
+        *Returns:* :class:`ServiceRequest`
+        """
+        return ServiceRequest(self, entity, kwargs)
+    
+    def _end_service(self, entity):
+        """Records the end of service and resumes a waiting process.
+        """
+        self.dp_record_journey(Stage.service_finish, entity)
+        process = self._service_waiters.pop(entity, None)
+        if process is not None:
+            process.dp_resume(entity)
 
     def get_service_time(self, station_index):
         """Gets the time needed for a position to complete an activity.
@@ -271,32 +620,65 @@ class Resource(Component):
         """
 
         #Assign entity to station
-        self.stations[index] = self.Station_tuple(entity, self.sim.now)
+        self._stations[index] = self._Station_tuple(entity, self.sim.now)
+        self._free.discard(index)
+        self._next_station = index + 1
+        self._update_res_queue()
         
         #Create trace record for starting the service.
-        fields = OrderedDict()
-        fields[self.name + ' station'] = str(index)
-        fields['Entity'] = self.stations[index].entity
-        message = "Starting Service"
-        self.sim.add_message(message, fields)
+        if self.sim.results.trace.active:
+            fields = OrderedDict()
+            fields[self.name + ' station'] = str(index)
+            fields['Entity'] = self.stations[index].entity
+            message = "Starting Service"
+            self.sim.add_message(message, fields, self)
         
         #Get service time and schedule end of service on FEL.
         service_time = self.get_service_time(index)
-        finish_event = ResourceFinishServiceEvent(self, index,
-                                                  service_time)
-        self.sim.schedule(finish_event, service_time)
+        self._fel_items[index] = self._schedule_finish(index, service_time,
+                                                       entity)
+        
+    def _schedule_finish(self, index, service_time, entity):
+        """Schedules a pooled finish-of-service event on the FEL.
         
-    def finish_service(self, index, service_time):
+        *Returns:* The :class:`despy.simulation.FutureEvent`.
+        """
+        self.dp_record_journey(Stage.service_start, entity)
+        event = self._event_pool.acquire("Finished_Service",
+                                self.finish_service,
+                                (index, service_time, entity),
+                                trace_function = self._finish_trace_fields)
+        return self.sim.schedule(event, service_time)
+    
+    def _finish_trace_fields(self, index, service_time, entity):
+        """Trace fields for a finish-of-service event.
+        """
+        fields = OrderedDict()
+        fields[self.name + ": duration"] = service_time
+        fields['Entity'] = entity
+        return fields
+        
+    def finish_service(self, index, service_time, entity = None):
         """Remove entity from a resource station.
         
         *Arguments:*
             ``index``: (Integer)
                 The index number of the resource station.
+            ``service_time``: (Integer)
+                The elapsed service time.
+            ``entity``
+                Optional. The entity that is finishing service.
         """
         # Record service time and remove entity from resource station.
         self.results.stats["Service Time"].append(self.sim.now,
                                               service_time)  
-        self.stations[index] = self.Station_tuple(None, None)
+        if entity is None:
+            entity = self._stations[index].entity
+        self._stations[index] = self._empty_station
+        self._fel_items.pop(index, None)
+        self._free.add(index)
+        self._update_res_queue()
+        self._end_service(entity)
         
         # Start service on next entity in queue.
         if self.res_queue:
@@ -305,7 +687,7 @@ class Resource(Component):
                 self.start_service(index, entity)   
     
     def remove_entity(self, index):
-        """Remove entity from a resource station.
+        """Remove entity from a resource station and cancel its service.
         
         *Arguments*
             ``index``
@@ -314,9 +696,13 @@ class Resource(Component):
         
         *Returns:* The entity that was being serviced by the resource.
         """
-        entity = self.stations[index].entity
-        self.stations[index].entity = None
-        self.stations[index].start_time = None
+        fel_item = self._fel_items.pop(index, None)
+        if fel_item is not None:
+            self.sim.cancel(fel_item)
+        entity = self._stations[index].entity
+        self._stations[index] = self._empty_station
+        self._free.add(index)
+        self._update_res_queue()
         return entity
     
     def finalize(self):
@@ -332,6 +718,522 @@ class Resource(Component):
         return output
 
 
+class CountingResource(Resource):
+    """A resource with interchangeable stations that only counts occupancy.
+    
+    A CountingResource is intended for large, homogeneous pools of
+    servers, such as call center agents or cloud computing slots, where
+    it does not matter which station serves an entity. Instead of a list
+    of station tuples, it keeps a count of busy stations and a
+    dictionary of the entities that are currently in service. Memory use
+    and the cost of each request are therefore independent of the
+    resource's capacity.
+    
+    CountingResource objects do not have individual stations. The
+    ``stations`` property and the array bracket operators raise a
+    ``TypeError``.
+    
+    **Inherited Classes**
+      * :class:`despy.model.component.Component`
+      * :class:`despy.model.resource.Resource`
+      
+    **Members**
+    
+    ..  autosummary::
+    
+        busy
+        available
+        in_service
+        clear_stations
+        get_available_station
+        request
+        start_service
+        finish_service
+        remove_entity
+    """
+    
+    def __init__(self, name, capacity = 1, time_function = None):
+        """Create a CountingResource object.
+        
+        *Arguments*
+            ``name`` (String)
+                A short descriptive name for the CountingResource.
+            ``capacity`` (Integer)
+                Optional, defaults to 1. The number of entities that
+                can be served simultaneously.
+            ``time_function`` (Python function object)
+                Optional, defaults to None. A function that returns the
+                time required to service an entity.
+        """
+        super().__init__(name, capacity, time_function)
+        
+    @property
+    def busy(self):
+        """The number of entities currently in service.
+        
+        *Type:* Integer, read-only
+        """
+        return self._busy
+    
+    @property
+    def available(self):
+        """The number of entities that could start service now.
+        
+        *Type:* Integer, read-only
+        """
+        return self._capacity - self._busy
+    
+    @property
+    def in_service(self):
+        """Dictionary of entities in service and their start times.
+        
+        *Type:* Python dictionary, read-only
+        """
+        return self._in_service
+    
+    @property
+    def stations(self):
+        raise TypeError("CountingResource {} does not have individual "
+                        "stations.".format(self.name))
+        
+    def clear_stations(self):
+        """Removes all entities from service and resets the busy count.
+        """
+        self._busy = 0
+        self._in_service = {}
+        self._fel_items = {}
+        self._update_res_queue()
+        
+    def get_available_station(self, random = False):
+        """Returns 0 if any station is free, ``None`` otherwise.
+        
+        Stations of a CountingResource are interchangeable, so there is
+        no station index to choose.
+        
+        *Arguments*
+            ``random`` (Boolean)
+                Ignored. Included for compatibility with
+                :meth:`Resource.get_available_station`.
+        """
+        if self._busy < self._capacity:
+            return 0
+        return None
+        
+    def request(self, entity, random = False):
+        """Request service for an entity.
+        
+        *Arguments*
+            ``entity``
+                The entity that will be serviced by the resource.
+            ``random`` (Boolean)
+                Ignored. Included for compatibility with
+                :meth:`Resource.request`.
+                
+        *Returns:* ``True`` if the entity starts service immediately.
+        Otherwise returns ``False`` and adds the entity to the resource
+        queue, if there is one, or returns ``None`` if the resource queue
+        was full and the entity balked.
+        """
+        if self._busy < self._capacity:
+            self.start_service(None, entity)
+            return True
+        else:
+            if self.res_queue is not None and \
+                    not self.res_queue.add(entity):
+                return None
+            return False
+        
+    def start_service(self, index, entity):
+        """Commence servicing an entity.
+        
+        *Arguments*
+            ``index``
+                Ignored. Included for compatibility with
+                :meth:`Resource.start_service`.
+            ``entity``
+                The entity that will be served.
+        """
+        self._busy += 1
+        self._in_service[entity] = self.sim.now
+        self._update_res_queue()
+        
+        if self.sim.results.trace.active:
+            fields = OrderedDict()
+            fields[self.name + ' busy'] = self._busy
+            fields['Entity'] = entity
+            self.sim.add_message("Starting Service", fields, self)
+        
+        service_time = self.get_service_time(None)
+        self._fel_items[entity] = self._schedule_finish(None, service_time,
+                                                        entity)
+        
+    def finish_service(self, index, service_time, entity = None):
+        """Ends service for an entity and starts the next queued entity.
+        
+        Does nothing if the entity was already removed from service
+        with :meth:`remove_entity`.
+        
+        *Arguments:*
+            ``index``
+                Ignored. Included for compatibility with
+                :meth:`Resource.finish_service`.
+            ``service_time``: (Integer)
+                The elapsed service time.
+            ``entity``
+                The entity that is finishing service.
+        """
+        if entity not in self._in_service:
+            return
+        self.results.stats["Service Time"].append(self.sim.now,
+                                                  service_time)
+        del self._in_service[entity]
+        self._fel_items.pop(entity, None)
+        self._busy -= 1
+        self._update_res_queue()
+        self._end_service(entity)
+        
+        if self.res_queue:
+            if self.res_queue.length > 0:
+                self.start_service(None, self.res_queue.remove())
+                
+    def remove_entity(self, entity):
+        """Remove an entity from service and cancel its finish event.
+        
+        *Arguments*
+            ``entity``
+                The entity that will be removed from service.
+                
+        *Returns:* The removed entity, or ``None`` if the entity was
+        not in service.
+        """
+        if entity not in self._in_service:
+            return None
+        del self._in_service[entity]
+        fel_item = self._fel_items.pop(entity, None)
+        if fel_item is not None:
+            self.sim.cancel(fel_item)
+        self._busy -= 1
+        self._update_res_queue()
+        return entity
+
+
+class PreemptiveResource(Resource):
+    """A resource that interrupts low priority entities for high priority ones.
+    
+    Every request to a PreemptiveResource has a priority. Lower numbers
+    indicate higher priorities, as with event priorities. If all
+    stations are busy when an entity requests service, the resource
+    compares the entity with the lowest priority entity in service. If
+    the requesting entity has a higher priority, the lower priority
+    entity is preempted: its pending finish event is cancelled, its
+    remaining service time is saved, and it is returned to the resource
+    queue, ahead of waiting entities with the same priority. When the
+    preempted entity starts service again, it is served for the
+    remaining time only. The "Service Time" statistic records the
+    entity's total service time when it finally finishes.
+    
+    In-service entities are kept in a heap ordered by priority, so
+    finding the entity to preempt takes O(log n) time and never scans
+    the stations or the FEL. Entries for services that have ended are
+    dropped from the top of the heap, and the heap is rebuilt when most
+    of its entries have ended, so its size does not grow with the
+    number of services. Among in-service entities with equal
+    priority, the one that started most recently is preempted first.
+    
+    **Inherited Classes**
+      * :class:`despy.model.component.Component`
+      * :class:`despy.model.resource.Resource`
+      
+    **Members**
+    
+    ..  autosummary::
+    
+        remaining_times
+        get_preemption_candidate
+        request
+        start_service
+        finish_service
+        preempt
+        remove_entity
+    """
+    
+    def __init__(self, name, capacity = 1, time_function = None,
+                 selection = Selection.lowest):
+        """Create a PreemptiveResource object.
+        
+        *Arguments*
+            See :class:`Resource`.
+        """
+        self._in_service = []
+        self._services = {}
+        self._remaining = {}
+        self._preempted = {}
+        self._tokens = count()
+        super().__init__(name, capacity, time_function, selection)
+        
+    ServiceRecord = namedtuple('ServiceRecord', ['priority', 'token',
+                                                 'fel_item', 'finish_time',
+                                                 'total'])
+    """(Class) A named tuple describing a service in progress.
+    
+    *Attributes*
+        ``priority``
+            Priority of the entity that is being served.
+        ``token``
+            Integer that identifies the service in the preemption heap.
+        ``fel_item``
+            The :class:`despy.simulation.FutureEvent` for the finish
+            event.
+        ``finish_time``
+            The time at which the service will finish.
+        ``total``
+            The entity's total service time, including any time served
+            before it was preempted.
+    """
+        
+    @property
+    def remaining_times(self):
+        """Remaining service times of preempted entities.
+        
+        Dictionary keyed by entity. An entry is removed when the entity
+        resumes service.
+        
+        *Type:* Python dictionary, read-only
+        """
+        return self._remaining
+    
+    def clear_stations(self):
+        """Empties every station and clears this resource's preemptions.
+        
+        The preemption heap and remaining times may be shared with the
+        other resources of a :class:`PreemptiveResourceQueue`; only the
+        entries that belong to this resource are removed.
+        """
+        super().clear_stations()
+        self._services.clear()
+        heap = self._in_service
+        heap[:] = [entry for entry in heap if entry[3] is not self]
+        heapify(heap)
+        for entity in [entity for entity, (resource, _)
+                       in self._preempted.items() if resource is self]:
+            del self._preempted[entity]
+            self._remaining.pop(entity, None)
+    
+    def get_preemption_candidate(self):
+        """Returns the lowest priority service in progress.
+        
+        Stale heap entries for services that have finished or been
+        preempted are discarded.
+        
+        *Returns:* A tuple (resource, station index, priority), or
+        ``None`` if no entities are in service.
+        """
+        heap = self._in_service
+        while heap:
+            if self._is_live(heap[0]):
+                neg_priority, _, _, resource, index = heap[0]
+                return resource, index, -neg_priority
+            heappop(heap)
+        return None
+    
+    @staticmethod
+    def _is_live(entry):
+        """True if a preemption heap entry is for a service in progress.
+        """
+        _, _, token, resource, index = entry
+        record = resource._services.get(index)
+        return record is not None and record.token == token
+    
+    def _discard_stale(self):
+        """Drops preemption heap entries for services that have ended.
+        
+        The heap may be shared with the other resources of a
+        :class:`PreemptiveResourceQueue`, so it is rebuilt only when it
+        holds more than twice as many entries as all of their services.
+        """
+        heap = self._in_service
+        while heap and not self._is_live(heap[0]):
+            heappop(heap)
+        if len(heap) > 2 * len(self._services) + 16:
+            if self._res_queue is None:
+                resources = [self]
+            else:
+                resources = self._res_queue._resources.values()
+            live = sum(len(resource._services) for resource in resources)
+            if len(heap) > 2 * live + 16:
+                heap[:] = [entry for entry in heap if self._is_live(entry)]
+                heapify(heap)
+        
+    def request(self, entity, random = False, priority = 0):
+        """Request service for an entity, preempting if necessary.
+        
+        *Arguments*
+            ``entity``
+                The entity that will be serviced by the resource.
+            ``random`` (Boolean)
+                If True, chooses a free station at random.
+            ``priority`` (Integer)
+                Optional, defaults to zero. Lower numbers indicate
+                higher priority.
+                
+        *Returns:* The index of the station that serves the entity,
+        ``False`` if the entity must wait, or ``None`` if the resource
+        queue was full and the entity balked.
+        """
+        index = self.get_available_station(random)
+        if index is not None:
+            self.start_service(index, entity, priority)
+            return index
+        
+        candidate = self.get_preemption_candidate()
+        if candidate is not None and candidate[0] is self and \
+                priority < candidate[2]:
+            index = candidate[1]
+            self.preempt(index)
+            self.start_service(index, entity, priority)
+            return index
+        
+        if self.res_queue is not None and \
+                not self.res_queue.add(entity, priority):
+            return None
+        return False
+        
+    def start_service(self, index, entity, priority = 0):
+        """Commence servicing an entity at the index position.
+        
+        If the entity was previously preempted, it is served for its
+        remaining service time.
+        
+        *Arguments*
+            ``index``
+                The index number of the station that will serve the
+                entity.
+            ``entity``
+                The entity that will be served.
+            ``priority`` (Integer)
+                Optional, defaults to zero. Lower numbers indicate
+                higher priority.
+        """
+        self._stations[index] = self._Station_tuple(entity, self.sim.now)
+        self._free.discard(index)
+        self._next_station = index + 1
+        self._update_res_queue()
+        
+        remaining = self._remaining.pop(entity, None)
+        if remaining is None:
+            service_time = total = self.get_service_time(index)
+            message = "Starting Service"
+        else:
+            service_time = remaining
+            _, total = self._preempted.pop(entity)
+            message = "Resuming Service"
+        if self.sim.results.trace.active:
+            fields = OrderedDict()
+            fields[self.name + ' station'] = str(index)
+            fields['Entity'] = entity
+            fields['Priority'] = priority
+            self.sim.add_message(message, fields, self)
+        
+        fel_item = self._schedule_finish(index, service_time, entity)
+        token = next(self._tokens)
+        self._services[index] = self.ServiceRecord(priority, token,
+                                    fel_item, self.sim.now + service_time,
+                                    total)
+        heappush(self._in_service, (-priority, -token, token, self, index))
+        
+    def finish_service(self, index, service_time, entity = None):
+        """Ends service at a station and starts the next queued entity.
+        
+        *Arguments:*
+            ``index``: (Integer)
+                The index number of the resource station.
+            ``service_time``: (Integer)
+                The service time of the finish event. For a resumed
+                service, this is the remaining time; the statistic
+                records the total service time instead.
+            ``entity``
+                Optional. The entity that is finishing service.
+        """
+        record = self._services.pop(index, None)
+        if record is not None:
+            service_time = record.total
+            self._discard_stale()
+        self.results.stats["Service Time"].append(self.sim.now,
+                                                  service_time)
+        if entity is None:
+            entity = self._stations[index].entity
+        self._stations[index] = self._empty_station
+        self._free.add(index)
+        self._update_res_queue()
+        self._end_service(entity)
+        
+        if self.res_queue is not None and self.res_queue.length > 0:
+            entity, priority = self.res_queue.remove(with_priority = True)
+            self.start_service(index, entity, priority)
+            
+    def preempt(self, index):
+        """Interrupts the service at a station.
+        
+        The pending finish event is cancelled and the entity's remaining
+        service time is saved in :attr:`remaining_times`, and the
+        entity is returned to the resource queue. If the resource has no
+        resource queue, or the queue is full, the entity's service is
+        abandoned: its remaining time is discarded and a process waiting
+        for its service resumes with ``None``. The station is left
+        empty.
+        
+        *Arguments*
+            ``index``
+                The index number of the station that will be preempted.
+                
+        *Returns:* The preempted entity.
+        """
+        record = self._services.pop(index)
+        self.sim.cancel(record.fel_item)
+        self._discard_stale()
+        entity = self._stations[index].entity
+        remaining = record.finish_time - self.sim.now
+        self._remaining[entity] = remaining
+        self._preempted[entity] = (self, record.total)
+        self._stations[index] = self._empty_station
+        self._free.add(index)
+        self._update_res_queue()
+        
+        if self.sim.results.trace.active:
+            fields = OrderedDict()
+            fields[self.name + ' station'] = str(index)
+            fields['Entity'] = entity
+            fields['Remaining'] = remaining
+            self.sim.add_message("Preempted", fields, self)
+        self.dp_record_journey(Stage.preempt, entity)
+        
+        if self.res_queue is None or \
+                not self.res_queue.add(entity, record.priority,
+                                       resumed = True):
+            self._remaining.pop(entity, None)
+            self._preempted.pop(entity, None)
+            process = self._service_waiters.pop(entity, None)
+            if process is not None:
+                process.dp_resume(None)
+        return entity
+    
+    def remove_entity(self, index):
+        """Remove entity from a resource station and cancel its service.
+        
+        *Arguments*
+            ``index``
+                The index number of the station from which the entity will
+                be removed.
+        
+        *Returns:* The entity that was being serviced by the resource.
+        """
+        record = self._services.pop(index, None)
+        if record is not None:
+            self.sim.cancel(record.fel_item)
+            self._discard_stale()
+        return super().remove_entity(index)
+
+
 class ResourceQueue(Queue):
     """A queue that provides entities to a resource object.
     
@@ -346,10 +1248,10 @@ class ResourceQueue(Queue):
     **Attributes**
       * :attr:`num_resources`: The number of resources added to the
         resourceQueue object.
+      * :attr:`selection`: Policy for choosing among available
+        resources.
         
     **Methods**
-      * :meth:`ResourceQueue.get_available_resource`: Gets the empty
-        resource position with the lowest number.
       * :meth:`ResourceQueue.__getitem__`: Allows accessing resource
         positions with array brackets.
       * :meth:`ResourceQueue.__setitem__`: Allows setting resource
@@ -359,9 +1261,22 @@ class ResourceQueue(Queue):
       * :meth:`ResourceQueue.get_available_resource`: Gets the index
         number of an available resource.
       * :meth:`ResourceQueue.request`: Request a resource for a entity.
+      * :meth:`ResourceQueue.serve`: Returns a waitable request that
+        resumes a process when the entity's service finishes.
+      * :meth:`ResourceQueue.dp_update_availability`: Internal method
+        called by resources when their number of free stations changes.
+        
+    A process waiting on :meth:`serve` resumes with ``None`` if its
+    entity balks or reneges instead of being served.
+        
+    The ResourceQueue keeps an index of the resources that have at
+    least one free station. Resources update the index whenever they
+    start or finish a service, so choosing a resource never requires
+    looping over the resources or their stations.
     """
     
-    def __init__(self, name):
+    def __init__(self, name, selection = Selection.lowest,
+                 discipline = None):
         """Instantiates a resourceQueue object.
         
         *Arguments*
@@ -370,11 +1285,48 @@ class ResourceQueue(Queue):
                 assigned to a `despy.model.model.Model`.
             ``name`` (String)
                 The name of the resourceQueue.
+            ``selection`` (:class:`Selection`)
+                Optional, defaults to Selection.lowest. Determines which
+                available resource serves the next entity.
+            ``discipline`` (:class:`despy.model.queue.AbstractDiscipline`)
+                Optional. Determines which waiting entity is served
+                next. Defaults to first in, first out.
                 
         """
-        super().__init__(name)
+        super().__init__(name, discipline = discipline)
         self._resources = {}
+        self._available = FreeIndex(0, free = False)
+        self._utilization = []
+        self._versions = []
+        self._next_resource = 0
+        self._service_waiters = {}
+        self.selection = selection
+        self.append_renege_callback(ResourceQueue._fail_service)
          
+    @property
+    def selection(self):
+        """Policy for choosing among available resources.
+        
+        *Type:* :class:`Selection`
+        
+        *Raises:* ``TypeError`` if set to a value that is not a member
+        of the :class:`Selection` enumeration.
+        """
+        return self._selection
+    
+    @selection.setter
+    def selection(self, selection):
+        if not isinstance(selection, Selection):
+            raise TypeError("{} passed to ResourceQueue.selection. Must "
+                            "be a member of despy.model.resource."
+                            "Selection.".format(selection))
+        if selection is Selection.least_recent:
+            raise ValueError("Selection.least_recent applies to "
+                             "Resource stations, not ResourceQueue "
+                             "objects.")
+        self._selection = selection
+        self._rebuild_utilization()
+        
     @property
     def num_resources(self):
         """The number of resources added to the resourceQueue object.
@@ -398,39 +1350,104 @@ class ResourceQueue(Queue):
             ``resource``
                 A :class:`despy.model.resource.Resource` object that will
                 be appended to the ResourceQueue object.
+                
+        *Raises:* ``TypeError`` if resource is a
+        :class:`PreemptiveResource` and the queue is not a
+        :class:`PreemptiveResourceQueue`.
         """
+        if isinstance(resource, PreemptiveResource) and \
+                not isinstance(self, PreemptiveResourceQueue):
+            raise TypeError("{} passed to ResourceQueue.assign_resource()."
+                            " PreemptiveResource objects require a "
+                            "PreemptiveResourceQueue.".format(resource))
         index = self.num_resources
         self[index] = resource
         self.add_component(resource)
         resource._res_queue = self
+        resource._res_index = index
+        resource._service_waiters = self._service_waiters
+        self._available.resize(index + 1)
+        self._versions.append(0)
+        self.dp_update_availability(resource)
+        
+    def dp_update_availability(self, resource):
+        """Updates the index of resources that have a free station.
+        
+        Internal method. Called by a :class:`Resource` whenever its
+        number of free stations changes.
+        
+        *Arguments*
+            ``resource`` (:class:`Resource`)
+                The resource whose availability has changed.
+        """
+        index = resource._res_index
+        if resource.available > 0:
+            self._available.add(index)
+        else:
+            self._available.discard(index)
+            
+        if self._selection is Selection.least_utilized:
+            self._versions[index] += 1
+            if resource.available > 0:
+                heappush(self._utilization,
+                         (self._get_utilization(resource), index,
+                          self._versions[index]))
+                if len(self._utilization) > 2 * self.num_resources + 16:
+                    self._rebuild_utilization()
+                    
+    def _get_utilization(self, resource):
+        """Returns the fraction of the resource's stations that are busy.
+        """
+        if resource.capacity == 0:
+            return 1
+        return 1 - resource.available / resource.capacity
+        
+    def _rebuild_utilization(self):
+        """Rebuilds the least utilized heap from current resource states.
+        """
+        self._utilization = []
+        if self._selection is not Selection.least_utilized:
+            return
+        for index, resource in self._resources.items():
+            self._versions[index] += 1
+            if resource.available > 0:
+                self._utilization.append((self._get_utilization(resource),
+                                          index, self._versions[index]))
+        heapify(self._utilization)
     
     def get_available_resource(self, random = False):
         """Gets the index number of an available resource.
         
+        The resource is chosen according to the :attr:`selection`
+        policy. Every policy takes O(log n) time or better, where n is
+        the number of resources.
+        
         *Arguments*
             ``random`` (Boolean)
                 If set to True, randomly chooses the index of an
-                available resource. Otherwise, returns the index of the
-                available resource with the lowest index value.
+                available resource, regardless of the
+                :attr:`selection` policy.
                 
         *Returns:* A positive integer representing the index number of
         the resource. ``None`` if all resources are busy.
         
         """
-    
-        empty_resources = []    
-        for index in range(self.num_resources):
-            if self[index].get_available_station() is not None:
-                empty_resources.append(index)
-        
-        if len(empty_resources) == 0:
+        if random or self._selection is Selection.random:
+            return self._available.random()
+        elif self._selection is Selection.round_robin:
+            return self._available.next_from(self._next_resource)
+        elif self._selection is Selection.least_utilized:
+            heap = self._utilization
+            while heap:
+                _, index, version = heap[0]
+                if version == self._versions[index]:
+                    return index
+                heappop(heap)
             return None
-        elif not random:
-            return empty_resources[0]
         else:
-            return empty_resources[randint(0, len(empty_resources) - 1)] 
+            return self._available.lowest()
 
-    def request(self, entity, random = False):
+    def request(self, entity, random = False, patience = None):
         """Request a resource for a entity.
         
         Checks if a resource position is available. If so, starts
@@ -440,32 +1457,252 @@ class ResourceQueue(Queue):
         *Arguments*
             ``entity``
                 The entity that will be serviced by the resource.
+            ``patience`` (Integer)
+                Optional. Passed to :meth:`despy.model.queue.Queue.add`;
+                the entity reneges if it waits longer than this.
                 
         *Returns:* If a resource position is available, returns the
         index value of the resource that will serve the entity. Otherwise
-        returns False.
+        returns False, or ``None`` if the queue was full and the entity
+        balked.
         """  
         
         index = self.get_available_resource(random)
 
         if index is not None:
             #ResourceQueue position is available
-            self[index].request(entity, random)
+            self._next_resource = index + 1
+            self[index].request(entity, random = random)
             return index
         else:
             #Resources all busy
-            self.add(entity)
+            if not self.add(entity, patience = patience):
+                return None
             return False
         
+    def serve(self, entity, **kwargs):
+        """Returns a waitable request for serving an entity.
+        
+        A process that yields the result requests a resource for the
+        entity and resumes, with the entity, when the service finishes.
+        
+        *Arguments*
+            ``entity``
+                The entity that will be serviced by a resource.
+            ``kwargs``
+                Passed to :meth:`request`.
+                
+        *Returns:* :class:`ServiceRequest`
+        """
+        return ServiceRequest(self, entity, kwargs)
+    
+    def _fail_service(self, entity):
+        """Resumes a process waiting on an entity that will not be served.
+        
+        Called when the entity balks or reneges. The process resumes
+        with ``None``.
+        """
+        process = self._service_waiters.pop(entity, None)
+        if process is not None:
+            process.dp_resume(None)
+        
     def finalize(self):
         for _, res in self._resources.items():
             res.clear_stations()
         self.clear()
         
 
+class PreemptiveResourceQueue(ResourceQueue):
+    """A priority queue that feeds one or more preemptive resources.
+    
+    Waiting entities are held in a heap and leave the queue in priority
+    order (lowest number first), and in order of arrival within a
+    priority. Preempted entities return ahead of waiting entities that
+    have the same priority.
+    
+    All assigned :class:`PreemptiveResource` objects share one
+    preemption heap, so a high priority request preempts the lowest
+    priority entity in service on any of the resources without looping
+    over the resources.
+    
+    **Inherited Classes**
+      * :class:`despy.model.component.Component`
+      * :class:`despy.model.queue.Queue`
+      * :class:`despy.model.resource.ResourceQueue`
+      
+    **Members**
+    
+    ..  autosummary::
+    
+        assign_resource
+        request
+        add
+        remove
+    """
+    
+    def __init__(self, name, selection = Selection.lowest):
+        """Instantiates a PreemptiveResourceQueue object.
+        
+        *Arguments*
+            ``name`` (String)
+                The name of the queue.
+            ``selection`` (:class:`Selection`)
+                Optional, defaults to Selection.lowest. Determines which
+                available resource serves the next entity.
+        """
+        super().__init__(name, selection, PriorityDiscipline())
+        self._in_service = []
+        self._remaining = {}
+        self._preempted = {}
+        
+    def assign_resource(self, resource):
+        """Assign a preemptive resource to the queue.
+        
+        *Arguments*
+            ``resource`` (:class:`PreemptiveResource`)
+                The resource that will be appended to the queue.
+                
+        *Raises:* ``TypeError`` if resource is not a
+        :class:`PreemptiveResource`.
+        """
+        if not isinstance(resource, PreemptiveResource):
+            raise TypeError("{} passed to PreemptiveResourceQueue."
+                            "assign_resource(). Must be a "
+                            "PreemptiveResource.".format(type(resource)))
+        resource._in_service = self._in_service
+        resource._remaining = self._remaining
+        resource._preempted = self._preempted
+        super().assign_resource(resource)
+        
+    def request(self, entity, random = False, priority = 0,
+                patience = None):
+        """Request a resource for an entity, preempting if necessary.
+        
+        *Arguments*
+            ``entity``
+                The entity that will be serviced by the resource.
+            ``random`` (Boolean)
+                If True, chooses an available resource at random.
+            ``priority`` (Integer)
+                Optional, defaults to zero. Lower numbers indicate
+                higher priority.
+            ``patience`` (Integer)
+                Optional. The entity reneges if it waits in the queue
+                longer than this.
+                
+        *Returns:* The index of the resource that serves the entity,
+        ``False`` if the entity must wait in the queue, or ``None`` if
+        the queue was full and the entity balked.
+        """
+        index = self.get_available_resource(random)
+        if index is not None:
+            self._next_resource = index + 1
+            self[index].request(entity, random = random,
+                                priority = priority)
+            return index
+        
+        candidate = None
+        if self.num_resources > 0:
+            candidate = self[0].get_preemption_candidate()
+        if candidate is not None and priority < candidate[2]:
+            resource, station, _ = candidate
+            resource.preempt(station)
+            resource.start_service(station, entity, priority)
+            return resource._res_index
+        
+        if not self.add(entity, priority, patience = patience):
+            return None
+        return False
+        
+    def add(self, item, priority = 0, resumed = False, patience = None):
+        """Add an item to the queue.
+        
+        *Arguments*
+            ``item``
+                The item that will be added to the queue.
+            ``priority`` (Integer)
+                Optional, defaults to zero. Lower numbers leave the
+                queue first.
+            ``resumed`` (Boolean)
+                Optional, defaults to False. If True, the item was
+                preempted and will leave ahead of other items with the
+                same priority.
+            ``patience`` (Integer)
+                Optional. The item reneges if it waits longer than this.
+                
+        *Returns:* ``True`` if the item joined the queue, or ``False``
+        if the queue was full and the item balked.
+        """
+        return super().add(item, key = (priority, 0 if resumed else 1),
+                           patience = patience)
+        
+    def remove(self, with_priority = False):
+        """Remove the highest priority item from the queue.
+        
+        *Arguments*
+            ``with_priority`` (Boolean)
+                Optional, defaults to False. If True, returns a tuple
+                containing the item and its priority.
+                
+        *Returns:* The item that was removed from the queue.
+        """
+        item = self._remove()
+        if with_priority:
+            return item.item_fld, item.key_fld[0]
+        return item.item_fld
+
+
+class ServiceRequest(AbstractWaitable):
+    """A waitable request for a resource to serve an entity.
+    
+    Returned by :meth:`Resource.serve` and :meth:`ResourceQueue.serve`.
+    When a process yields the request, the entity is requested from
+    the resource and the process is stored in a dictionary keyed by the
+    entity. The resource resumes the process with the entity when it
+    finishes service, or with ``None`` if the entity balks or reneges.
+    
+    **Members**
+    
+    ..  autosummary::
+    
+        target
+        entity
+        dp_wait
+    """
+    __slots__ = ('target', 'entity', '_kwargs')
+    
+    def __init__(self, target, entity, kwargs = None):
+        """Create a ServiceRequest object.
+        
+        *Arguments*
+            ``target`` (:class:`Resource` or :class:`ResourceQueue`)
+                The object that will serve the entity.
+            ``entity``
+                The entity that will be served.
+            ``kwargs`` (Dictionary)
+                Optional. Keyword arguments for the target's
+                ``request`` method.
+        """
+        self.target = target
+        self.entity = entity
+        self._kwargs = kwargs if kwargs is not None else {}
+        
+    def dp_wait(self, process):
+        waiters = self.target._service_waiters
+        waiters[self.entity] = process
+        if self.target.request(self.entity, **self._kwargs) is None:
+            # The entity balked.
+            del waiters[self.entity]
+            process.dp_resume(None)
+
+
 class ResourceFinishServiceEvent(Event):
     """Event that is called when the resource completes it's service.
     
+    Resources now schedule pooled
+    :class:`despy.fel.event.LightEvent` objects instead. The class is
+    kept for models that schedule finish events themselves.
+    
     **Inherited Classes**
       * :class:`despy.base.named_object2.NamedObject`
       * :class:`despy.model.component.Component`
@@ -489,23 +1726,30 @@ class ResourceFinishServiceEvent(Event):
     """
     
     
-    def __init__(self, resource, station_index, service_time):
+    def __init__(self, resource, station_index, service_time,
+                 entity = None):
         """Create a ResourceFinishServiceEvent object.
         
         *Arguments:*
             ``resource`` (:class:`Resource`)
                 The Resource that will complete the service.
             ``station_index`` (Integer)
-                The index number of the resource station.
+                The index number of the resource station. ``None`` for
+                a :class:`CountingResource`.
             ``service_time`` (Integer)
                 The time required to complete the service.
+            ``entity``
+                Optional. The entity that is being served. If omitted,
+                the entity is read from the resource station.
         """
         super().__init__("Finished_Service")
         
         self._resource = resource
         self._station_index = station_index
         self._service_time = service_time
-        self._entity = self.resource.stations[self.station_index].entity
+        if entity is None:
+            entity = self.resource.stations[self.station_index].entity
+        self._entity = entity
         
     @property
     def resource(self):
@@ -547,7 +1791,7 @@ class ResourceFinishServiceEvent(Event):
         waiting entity.
         """
         self.resource.finish_service(self.station_index,
-                                     self.service_time)    
+                                     self.service_time, self.entity)    
         
     def dp_update_trace_record(self, trace_record):
         """Adds the entity name and service time to the trace report.
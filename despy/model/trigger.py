@@ -9,7 +9,9 @@ despy.model.trigger
 
 ..  autosummary::
 
-    Trigger
+    AbstractTrigger
+    TimeTrigger
+    TraceDumpTrigger
     
 ..  todo
 
@@ -44,5 +46,54 @@ class TimeTrigger(AbstractTrigger):
         return False
 
 
+
+class TraceDumpTrigger(AbstractTrigger):
+    """Dumps the trace when a condition becomes true.
+    
+    Intended for a ring buffer trace (see
+    :attr:`despy.session.Config.trace_ring_length`), so the dump holds
+    the events that led up to the condition. Add the trigger with
+    :meth:`despy.simulation.Simulation.add_trigger`. The trigger is
+    checked after every event.
+    
+    **Members**
+    
+    ..  autosummary::
+    
+        condition
+        stop
+        dumps
+        check
+        pull
+    """
+    def __init__(self, condition, stop = True, file_name = None):
+        """Create a TraceDumpTrigger object.
+        
+        *Arguments*
+            ``condition`` (Python function object)
+                Called with no arguments after every event. The trace is
+                dumped when it returns True.
+            ``stop`` (Boolean)
+                Optional, defaults to True. If True, the replication
+                ends after the dump.
+            ``file_name`` (String)
+                Optional. Passed to
+                :meth:`despy.output.trace.Trace.dump`.
+        """
+        super().__init__()
+        self.condition = condition
+        self.stop = stop
+        self.file_name = file_name
+        self.dumps = 0
+        
+    def check(self):
+        return self.condition()
+    
+    def pull(self):
+        self.session.sim.results.trace.dump(self.file_name)
+        self.dumps += 1
+        return not self.stop
+
+
 if __name__ == '__main__':
     pass
\ No newline at end of file
@@ -0,0 +1,133 @@
+#   Despy: A discrete event simulation framework for Python
+#   Version 0.1
+#   Released under the MIT License (MIT)
+#   Copyright (c) 2015, Stacy Irwin
+"""
+*********************
+despy.model.waitable
+*********************
+
+..  autosummary::
+
+    AbstractWaitable
+    Signal
+
+..  todo
+
+    Add a timeout option for waiting processes.
+"""
+from abc import ABCMeta, abstractmethod
+
+
+class AbstractWaitable(metaclass = ABCMeta):
+    """A condition that a :class:`despy.model.process.Process` can wait on.
+
+    A process generator waits by yielding the waitable object. The
+    process is placed on the waitable's list of waiting processes and
+    no events are scheduled for it. When the condition is satisfied, the
+    waitable calls :meth:`despy.model.process.Process.dp_resume`, and
+    the value passed to ``dp_resume`` becomes the result of the
+    ``yield`` expression.
+
+    **Members**
+
+    ..  autosummary::
+
+        dp_wait
+    """
+    __slots__ = ()
+
+    @abstractmethod
+    def dp_wait(self, process):
+        """Registers a process that will be resumed later.
+
+        Internal Method. Called by the process when its generator
+        yields the waitable object.
+
+        *Arguments*
+            ``process`` (:class:`despy.model.process.Process`)
+                The waiting process.
+        """
+        pass
+
+
+class Signal(AbstractWaitable):
+    """A custom condition that processes wait on until it is fired.
+
+    Waiting processes are kept in insertion order in a dictionary, so
+    adding, resuming and cancelling a waiter each take O(1) time.
+
+    **Members**
+
+    ..  autosummary::
+
+        name
+        waiting
+        dp_wait
+        cancel
+        fire
+        fire_one
+    """
+
+    def __init__(self, name = None):
+        """Create a Signal object.
+
+        *Arguments*
+            ``name`` (String)
+                Optional. A short description of the signal.
+        """
+        self.name = name
+        self._waiters = {}
+
+    @property
+    def waiting(self):
+        """The number of processes waiting on the signal.
+
+        *Type:* Integer, read-only.
+        """
+        return len(self._waiters)
+
+    def dp_wait(self, process):
+        self._waiters[process] = None
+
+    def cancel(self, process):
+        """Removes a waiting process without resuming it.
+
+        *Returns:* ``True`` if the process was waiting, ``False``
+        otherwise.
+        """
+        return self._waiters.pop(process, False) is None
+
+    def fire(self, value = None):
+        """Resumes all waiting processes.
+
+        *Arguments*
+            ``value``
+                Optional. Returned to each process by its ``yield``
+                expression.
+
+        *Returns:* The number of processes that were resumed.
+        """
+        waiters = self._waiters
+        self._waiters = {}
+        for process in waiters:
+            process.dp_resume(value)
+        return len(waiters)
+
+    def fire_one(self, value = None):
+        """Resumes the process that has been waiting the longest.
+
+        *Arguments*
+            ``value``
+                Optional. Returned to the process by its ``yield``
+                expression.
+
+        *Returns:* ``True`` if a process was resumed, ``False`` if no
+        processes were waiting.
+        """
+        if not self._waiters:
+            return False
+        process = next(iter(self._waiters))
+        del self._waiters[process]
+        process.dp_resume(value)
+        return True
@@ -15,6 +15,21 @@ despy.output.trace
 ..  automodule:: despy.output.trace
     :noindex:
 
+despy.output.sink
+=================
+..  automodule:: despy.output.sink
+    :noindex:
+
+despy.output.tracefile
+======================
+..  automodule:: despy.output.tracefile
+    :noindex:
+
+despy.output.digest
+===================
+..  automodule:: despy.output.digest
+    :noindex:
+
 despy.output.report
 ===================
 ..  automodule:: despy.output.report
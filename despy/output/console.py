@@ -9,31 +9,113 @@ despy.output.console
 
 ..  autosummary::
 
+    ConsoleBuffer
+    enabled
+    display_header
+    display_message
+    display_dict
+    display_trace
+    flush
+
+Console output is controlled by
+:attr:`despy.session.Config.verbosity`. Each display function checks
+the level before it formats anything, so callers pass a template and
+its arguments rather than a formatted string. Lines are collected in
+:data:`buffer` and written to ``sys.stdout`` in batches.
     
 ..  todo::
 
-    Add option to control level of output (i.e., verbose, quiet, etc.).
-    
     Pull title-ize feature (replace().title() out to static helper
     function.
     
     Consider using colorama module for colored text.
 
 """
+import sys
+
 from IPython.display import display_html, HTML, display
 
-from despy.session import Session
+from despy.session import Session, Verbosity
 
-def display_header(header):
-    print()
-    print('=====', header.ljust(45, '='))
+class ConsoleBuffer(object):
+    """Collects console lines and writes them in batches.
+    
+    **Members**
     
-def display_message(message):
-    print(message)
+    ..  autosummary::
     
-def display_dict(data):
-    for _, value in data.items():
-        print("{0}: {1}".format(value[0], value[1]))
+        limit
+        write
+        flush
+    """
+    def __init__(self, limit = 256):
+        """Create a ConsoleBuffer object.
+        
+        *Arguments*
+            ``limit`` (Integer)
+                Optional, defaults to 256. The buffer is written once it
+                holds this many lines.
+        """
+        self.limit = limit
+        self._lines = []
+        
+    def write(self, line):
+        """Adds a line, writing the buffer if it is full.
+        """
+        lines = self._lines
+        lines.append(line)
+        if len(lines) >= self.limit:
+            self.flush()
+            
+    def flush(self):
+        """Writes all buffered lines to ``sys.stdout``.
+        """
+        if self._lines:
+            lines, self._lines = self._lines, []
+            sys.stdout.write("\n".join(lines) + "\n")
+            sys.stdout.flush()
+
+#: The :class:`ConsoleBuffer` used by the display functions.
+buffer = ConsoleBuffer()
+
+def enabled(level):
+    """True if the configured verbosity includes a level.
+    
+    *Arguments*
+        ``level`` (:class:`despy.session.Verbosity`)
+    """
+    return Session().config.verbosity.value >= level.value
+
+def display_header(header, *args, level = Verbosity.summary):
+    """Writes a header, formatted with ``args``, if the level is enabled.
+    """
+    if enabled(level):
+        if args:
+            header = header.format(*args)
+        buffer.write("")
+        buffer.write("===== " + header.ljust(45, '='))
+    
+def display_message(message, *args, level = Verbosity.verbose):
+    """Writes a message, formatted with ``args``, if the level is enabled.
+    """
+    if enabled(level):
+        buffer.write(message.format(*args) if args else message)
+    
+def display_dict(data, level = Verbosity.summary):
+    if enabled(level):
+        for _, value in data.items():
+            buffer.write("{0}: {1}".format(value[0], value[1]))
+            
+def display_trace(record):
+    """Writes a trace record if the verbosity is ``Verbosity.trace``.
+    """
+    if enabled(Verbosity.trace):
+        buffer.write(str(record))
+        
+def flush():
+    """Writes all buffered console output.
+    """
+    buffer.flush()
 
 class Console():
     def __init__(self):
@@ -63,8 +145,7 @@ class Console():
         print("====={}==========".format(header))
         
     def display_trace(self, record):
-        if Session().config.console_trace:
-            print(record)
+        display_trace(record)
         
 
 def test_table():
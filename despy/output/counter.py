@@ -40,7 +40,7 @@ class Counter(AbstractStatistic):
     def setup(self):
         self._rep_counts.append(0)
         
-    def teardown(self):
+    def teardown(self, time = None):
         pass
     
     def finalize(self):
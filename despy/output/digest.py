@@ -0,0 +1,174 @@
+#   Despy: A discrete event simulation framework for Python
+#   Version 0.1
+#   Released under the MIT License (MIT)
+#   Copyright (c) 2015, Stacy Irwin
+"""
+*******************
+despy.output.digest
+*******************
+
+..  autosummary::
+
+    TraceDigest
+"""
+from collections import OrderedDict
+from hashlib import blake2b
+
+
+class TraceDigest(object):
+    """A running hash of every event executed by the simulation.
+
+    Each event's rep, time, priority, name and custom trace fields are
+    hashed when the event runs, whether or not the trace stores the
+    record, so the memory used does not depend on the length of the
+    run. Two runs with the same :meth:`hexdigest` executed the same
+    events, in the same order, with the same trace fields.
+
+    Custom field values are hashed by their strings, so values whose
+    strings differ between runs, such as objects shown with their
+    memory address, make the digests differ.
+
+    The digest also keeps one hash per rep and, if ``window`` is set,
+    one hash per time window of each rep. Comparing these with
+    :meth:`first_difference` shows where two runs diverge.
+
+    Enable the digest by setting
+    :attr:`despy.session.Config.trace_digest` to True before the
+    simulation is initialized. It is then available as
+    ``results.digest``.
+
+    **Members**
+
+    ..  autosummary::
+
+        window
+        count
+        hexdigest
+        rep_digests
+        window_digests
+        update
+        finalize
+        first_difference
+    """
+
+    digest_size = 16
+
+    def __init__(self, window = None):
+        """Create a TraceDigest object.
+
+        *Arguments*
+            ``window`` (Integer)
+                Optional. Length of the time windows that get their own
+                digest. Defaults to None, meaning no window digests.
+        """
+        if window is not None and window < 1:
+            raise ValueError("TraceDigest window must be a positive "
+                             "integer or None. {} was passed instead."
+                             "".format(window))
+        self.window = window
+        self.count = 0
+        self._total = blake2b(digest_size = self.digest_size)
+        self._rep = None
+        self._rep_hash = None
+        self._rep_digests = OrderedDict()
+        self._window_key = None
+        self._window_hash = None
+        self._window_digests = OrderedDict()
+
+    def hexdigest(self):
+        """Digest of all events so far.
+
+        *Returns:* String of hexadecimal digits.
+        """
+        return self._total.hexdigest()
+
+    @property
+    def rep_digests(self):
+        """Digest of each rep, including the current one.
+
+        *Type:* Ordered dictionary that maps reps to hexadecimal digest
+        strings.
+        """
+        digests = OrderedDict(self._rep_digests)
+        if self._rep_hash is not None:
+            digests[self._rep] = self._rep_hash.hexdigest()
+        return digests
+
+    @property
+    def window_digests(self):
+        """Digest of each time window that had events.
+
+        *Type:* Ordered dictionary that maps ``(rep, window start)``
+        tuples to hexadecimal digest strings. Empty unless
+        :attr:`window` is set.
+        """
+        digests = OrderedDict(self._window_digests)
+        if self._window_hash is not None:
+            digests[self._window_key] = self._window_hash.hexdigest()
+        return digests
+
+    def update(self, record):
+        """Adds an event to the digest.
+
+        *Arguments*
+            ``record`` (:class:`despy.output.trace.TraceRecord`)
+                The event's trace record, with its custom fields.
+        """
+        rep, time = record['rep'], record['time']
+        parts = [str(rep), str(time), str(int(record['priority'])),
+                 record['name']]
+        for label in record.custom_labels:
+            parts.append("{}={!s}".format(label, record[label]))
+        data = ("\x1f".join(parts) + "\x1e").encode('utf-8')
+        self._total.update(data)
+        self.count += 1
+
+        if rep != self._rep:
+            if self._rep_hash is not None:
+                self._rep_digests[self._rep] = self._rep_hash.hexdigest()
+            self._rep = rep
+            self._rep_hash = blake2b(digest_size = self.digest_size)
+        self._rep_hash.update(data)
+
+        if self.window is not None:
+            key = (rep, time - time % self.window)
+            if key != self._window_key:
+                if self._window_hash is not None:
+                    self._window_digests[self._window_key] = \
+                            self._window_hash.hexdigest()
+                self._window_key = key
+                self._window_hash = blake2b(digest_size = self.digest_size)
+            self._window_hash.update(data)
+
+    def finalize(self):
+        """Stores the digests of the current rep and time window.
+        """
+        if self._rep_hash is not None:
+            self._rep_digests[self._rep] = self._rep_hash.hexdigest()
+            self._rep_hash = None
+        if self._window_hash is not None:
+            self._window_digests[self._window_key] = \
+                    self._window_hash.hexdigest()
+            self._window_hash = None
+
+    def first_difference(self, other):
+        """Finds the first rep, and time window, where two runs differ.
+
+        *Arguments*
+            ``other`` (:class:`TraceDigest`)
+                The digest of the other run.
+
+        *Returns:* None if the runs are identical. Otherwise the first
+        rep that differs, or the first ``(rep, window start)`` tuple
+        that differs if both digests have the same :attr:`window`.
+        """
+        if self.hexdigest() == other.hexdigest():
+            return None
+        if self.window is not None and self.window == other.window:
+            mine, theirs = self.window_digests, other.window_digests
+        else:
+            mine, theirs = self.rep_digests, other.rep_digests
+        for key in sorted(set(mine) | set(theirs)):
+            if mine.get(key) != theirs.get(key):
+                return key
+        return None
@@ -0,0 +1,248 @@
+#   Despy: A discrete event simulation framework for Python
+#   Version 0.1
+#   Released under the MIT License (MIT)
+#   Copyright (c) 2015, Stacy Irwin
+"""
+********************
+despy.output.journey
+********************
+
+..  autosummary::
+
+    Stage
+    JourneyLog
+
+..  todo::
+
+    Add journey data to the HTML report.
+"""
+from enum import Enum
+
+import numpy as np
+
+
+class Stage(Enum):
+    """Steps of an entity's journey that are recorded by JourneyLog.
+
+    *Members*
+        ``queue_enter``, ``queue_exit``
+            The entity joined or was removed from a queue.
+        ``renege``, ``balk``
+            The entity gave up waiting, or was turned away from a full
+            queue.
+        ``service_start``, ``service_finish``
+            The entity started or finished service at a resource.
+        ``preempt``
+            The entity's service was interrupted by a higher priority
+            entity.
+    """
+    queue_enter = 1
+    queue_exit = 2
+    renege = 3
+    balk = 4
+    service_start = 5
+    service_finish = 6
+    preempt = 7
+
+
+class JourneyLog(object):
+    """Records the path of every entity through queues and resources.
+
+    Each record is appended to five typed numpy columns: ``rep``,
+    ``time``, ``entity``, ``component`` and ``stage``. Columns double in
+    size when full, so recording takes O(1) time and does not depend on
+    the trace, which is limited in length.
+
+    Component names are stored as small integer codes; see
+    :attr:`components`. The ``entity`` column holds an integer key:
+    integer entities, such as :class:`despy.model.entity.EntityTable`
+    ids, are stored as is. Other entities are interned and stored as
+    negative keys, see :attr:`labels`. Entities with a ``number``
+    attribute are interned by their class and number, since entity
+    classes can keep separate number sequences; other entities are
+    interned by their string.
+
+    Recording is enabled by setting
+    :attr:`despy.session.Config.journey_log` to True before the
+    simulation is initialized.
+
+    **Members**
+
+    ..  autosummary::
+
+        active
+        components
+        labels
+        __len__
+        __getitem__
+        record
+        intervals
+        time_in_system
+    """
+
+    _dtypes = (('rep', 'u4'), ('time', 'i8'), ('entity', 'i8'),
+               ('component', 'u2'), ('stage', 'u1'))
+
+    def __init__(self, sim, capacity = 1024):
+        """Create a JourneyLog object.
+
+        *Arguments*
+            ``sim`` (:class:`despy.simulation.Simulation`)
+                Supplies the current rep and time for each record.
+            ``capacity`` (Integer)
+                Optional, defaults to 1024. Number of records allocated
+                initially.
+        """
+        self.active = False
+        self._sim = sim
+        self._length = 0
+        self._columns = {column: np.empty(capacity, dtype = dtype)
+                         for column, dtype in self._dtypes}
+        self._component_codes = {}
+        self._components = []
+        self._label_keys = {}
+        self._labels = {}
+
+    @property
+    def components(self):
+        """Component names, indexed by the codes in the component column.
+
+        *Type:* List of strings, read-only.
+        """
+        return self._components
+
+    @property
+    def labels(self):
+        """Maps negative entity keys to the string of the entity.
+
+        *Type:* Dictionary, read-only.
+        """
+        return self._labels
+
+    def __len__(self):
+        """Built-in len() function returns the number of records.
+        """
+        return self._length
+
+    def __getitem__(self, column):
+        """Returns a view of a column, one element per record.
+        """
+        return self._columns[column][:self._length]
+
+    def _entity_key(self, entity):
+        """Returns the integer stored in the entity column.
+        """
+        if isinstance(entity, int):
+            return entity
+        number = getattr(entity, 'number', None)
+        if isinstance(number, int):
+            identity = (type(entity), number)
+        else:
+            identity = str(entity)
+        key = self._label_keys.get(identity)
+        if key is None:
+            key = -1 - len(self._label_keys)
+            self._label_keys[identity] = key
+            self._labels[key] = str(entity)
+        return key
+
+    def _grow(self):
+        """Doubles the number of allocated records.
+        """
+        for column, data in self._columns.items():
+            grown = np.empty(2 * len(data), dtype = data.dtype)
+            grown[:self._length] = data[:self._length]
+            self._columns[column] = grown
+
+    def record(self, component, stage, entity):
+        """Appends a record at the current simulation time.
+
+        *Arguments*
+            ``component`` (String)
+                Name of the queue or resource.
+            ``stage`` (:class:`Stage`)
+                The step of the journey.
+            ``entity``
+                The entity.
+        """
+        code = self._component_codes.get(component)
+        if code is None:
+            code = len(self._components)
+            self._component_codes[component] = code
+            self._components.append(component)
+
+        row = self._length
+        columns = self._columns
+        if row == len(columns['rep']):
+            self._grow()
+            columns = self._columns
+        sim = self._sim
+        columns['rep'][row] = sim.rep
+        columns['time'][row] = sim.now
+        columns['entity'][row] = self._entity_key(entity)
+        columns['component'][row] = code
+        columns['stage'][row] = stage.value
+        self._length = row + 1
+
+    def intervals(self, component, start_stage, end_stages):
+        """Times between a start stage and the following end stage.
+
+        Each record in ``end_stages`` is paired with the latest
+        preceding ``start_stage`` record for the same entity, rep and
+        component. For example, ``intervals('c_qu', Stage.queue_enter,
+        Stage.queue_exit)`` returns the time each entity waited in the
+        queue ``c_qu``.
+
+        *Arguments*
+            ``component`` (String)
+                Name of the queue or resource.
+            ``start_stage`` (:class:`Stage`)
+                Stage that starts the interval.
+            ``end_stages`` (:class:`Stage` or tuple of Stages)
+                Stage or stages that end the interval.
+
+        *Returns:* A tuple of numpy arrays: entity keys and interval
+        lengths, in the order that the intervals ended.
+        """
+        if isinstance(end_stages, Stage):
+            end_stages = (end_stages,)
+        code = self._component_codes.get(component)
+        if code is None:
+            return np.empty(0, 'i8'), np.empty(0, 'i8')
+        stage = self['stage']
+        is_end = np.isin(stage, [s.value for s in end_stages])
+        is_start = stage == start_stage.value
+        rows = np.flatnonzero((self['component'] == code) &
+                              (is_start | is_end))
+        rep = self['rep'][rows]
+        entity = self['entity'][rows]
+        order = np.lexsort((rows, entity, rep))
+        rows, rep, entity = rows[order], rep[order], entity[order]
+        time = self['time'][rows]
+        ends = np.flatnonzero(is_end[rows][1:]) + 1
+        prev = ends - 1
+        paired = is_start[rows][prev] & (rep[prev] == rep[ends]) & \
+                 (entity[prev] == entity[ends])
+        ends, prev = ends[paired], prev[paired]
+        by_end_time = np.argsort(rows[ends], kind = 'mergesort')
+        ends, prev = ends[by_end_time], prev[by_end_time]
+        return entity[ends], time[ends] - time[prev]
+
+    def time_in_system(self):
+        """Time from each entity's first record to its last.
+
+        *Returns:* A tuple of numpy arrays: reps, entity keys and
+        times in system, sorted by rep and entity key.
+        """
+        if self._length == 0:
+            return (np.empty(0, 'u4'), np.empty(0, 'i8'),
+                    np.empty(0, 'i8'))
+        rep, entity, time = self['rep'], self['entity'], self['time']
+        order = np.lexsort((entity, rep))
+        rep, entity, time = rep[order], entity[order], time[order]
+        starts = np.flatnonzero(np.concatenate(([True],
+                                (rep[1:] != rep[:-1]) |
+                                (entity[1:] != entity[:-1]))))
+        durations = np.maximum.reduceat(time, starts) - \
+                    np.minimum.reduceat(time, starts)
+        return rep[starts], entity[starts], durations
@@ -23,6 +23,7 @@ from collections import OrderedDict, namedtuple
 from despy.session import Session
 from despy.abstract.model import AbstractModel
 from despy.output.trace import Trace
+from despy.output.journey import JourneyLog
 import despy.output.console as console
 
 class Values(namedtuple('Result', ['value', 'label', 'description'])):
@@ -37,6 +38,8 @@ class Results(object):
             self._owner = "Simulation"
             self._top = True
             self.trace = Trace()
+            self.journey = JourneyLog(owner)
+            self.digest = None
         else:
             raise TypeError("Owner argument must be type despy.simulation."
                             "Simulation or despy.model.component.Component. "
@@ -91,6 +94,7 @@ class Results(object):
     
     def list_values(self):
         console.display_dict(self._vals)
+        console.flush()
             
         
     @property
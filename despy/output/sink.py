@@ -0,0 +1,360 @@
+#   Despy: A discrete event simulation framework for Python
+#   Version 0.1
+#   Released under the MIT License (MIT)
+#   Copyright (c) 2015, Stacy Irwin
+"""
+*****************
+despy.output.sink
+*****************
+
+..  autosummary::
+
+    SinkFormat
+    TraceSink
+    ShardedTraceSink
+
+..  todo::
+
+    Write the simulation parameters as header rows.
+"""
+import csv
+from enum import Enum
+import gzip
+import json
+from queue import Queue
+from threading import Thread
+
+from despy.output.tracefile import TraceFileWriter
+
+
+class SinkFormat(Enum):
+    """File formats written by :class:`TraceSink`.
+
+    *Members*
+        ``csv``
+            Comma separated values. Each row holds the standard fields,
+            followed by a label and value for each custom field, like
+            :meth:`despy.output.trace.TraceRecord.get_row`.
+        ``ndjson``
+            Newline delimited JSON. Each line is an object with the
+            standard and custom fields. Values that are not JSON types
+            are written as strings.
+        ``binary``
+            The binary trace file format of
+            :mod:`despy.output.tracefile`, which
+            :class:`despy.output.tracefile.TraceFile` memory maps.
+            Cannot be compressed.
+    """
+    csv = 1
+    ndjson = 2
+    binary = 3
+
+
+class TraceSink(object):
+    """Streams trace records to a file from a background thread.
+
+    A TraceSink is attached to a trace with
+    :meth:`despy.output.trace.Trace.add_sink`. The trace passes every
+    record in the trace window to :meth:`write`, including records past
+    :attr:`despy.session.Config.trace_max_length`, so the file holds the
+    full trace of the run.
+
+    :meth:`write` only appends the record to the current batch. Full
+    batches are handed to a writer thread, which formats them and
+    writes them to disk. At most ``max_batches`` batches wait for the
+    writer, so memory use does not grow with the length of the run;
+    the simulation only waits if the writer falls that far behind.
+
+    **Members**
+
+    ..  autosummary::
+
+        file_name
+        file_format
+        written
+        write
+        flush
+        close
+    """
+
+    labels = ['Record #', 'Rep', 'Time', 'Priority', 'Record Type', 'Name']
+
+    def __init__(self, file_name, file_format = SinkFormat.csv,
+                 compress = None, batch_size = 4096, max_batches = 8):
+        """Create a TraceSink object and start its writer thread.
+
+        *Arguments*
+            ``file_name`` (String)
+                The full name, including the path, of the output file.
+            ``file_format`` (:class:`SinkFormat`)
+                Optional, defaults to ``SinkFormat.csv``.
+            ``compress`` (Boolean)
+                Optional. If True, the file is gzip compressed. Defaults
+                to True if ``file_name`` ends with ".gz".
+            ``batch_size`` (Integer)
+                Optional, defaults to 4096. Number of records passed to
+                the writer thread at a time.
+            ``max_batches`` (Integer)
+                Optional, defaults to 8. Number of full batches that can
+                wait for the writer thread.
+        """
+        if not isinstance(file_format, SinkFormat):
+            raise TypeError("file_format must be a despy.output.sink."
+                            "SinkFormat. {} was passed instead."
+                            "".format(file_format))
+        if compress is None:
+            compress = file_name.endswith(".gz")
+        if compress and file_format is SinkFormat.binary:
+            raise ValueError("Binary trace files cannot be compressed, "
+                             "because they are read by memory mapping.")
+        self._file_name = file_name
+        self._file_format = file_format
+        self._compress = compress
+        self._batch_size = batch_size
+        self._batch = []
+        self._batches = Queue(max_batches)
+        self._written = 0
+        self._error = None
+        self._closed = False
+        self._thread = Thread(target = self._run, daemon = True,
+                              name = "TraceSink-" + file_name)
+        self._thread.start()
+
+    @property
+    def file_name(self):
+        """The full name, including the path, of the output file.
+
+        *Type:* String, read-only.
+        """
+        return self._file_name
+
+    @property
+    def file_format(self):
+        """The format of the output file.
+
+        *Type:* :class:`SinkFormat`, read-only.
+        """
+        return self._file_format
+
+    @property
+    def written(self):
+        """Number of records written to the file so far.
+
+        *Type:* Integer, read-only.
+        """
+        return self._written
+
+    def write(self, record):
+        """Adds a record to the current batch.
+
+        *Arguments*
+            ``record`` (Tuple)
+                The record number, rep, time, priority, record type,
+                name, and a dictionary of custom fields or None.
+
+        *Raises*
+            The exception raised by the writer thread, if it failed.
+        """
+        batch = self._batch
+        batch.append(record)
+        if len(batch) >= self._batch_size:
+            self.flush()
+
+    def flush(self):
+        """Hands the current batch to the writer thread.
+        """
+        if self._error is not None:
+            raise self._error
+        if self._batch:
+            self._batches.put(self._batch)
+            self._batch = []
+
+    def close(self):
+        """Writes the remaining records, then closes the file.
+
+        Waits for the writer thread to finish, even if it failed.
+        Calling ``close`` more than once has no effect.
+
+        *Raises*
+            The exception raised by the writer thread, if it failed.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self.flush()
+        finally:
+            self._batches.put(None)
+            self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def _open(self):
+        """Opens the output file in text mode.
+        """
+        if self._compress:
+            return gzip.open(self._file_name, 'wt', newline = '')
+        return open(self._file_name, 'w', newline = '')
+
+    def _run(self):
+        """Writer thread. Formats and writes batches until closed.
+        """
+        batches = self._batches
+        try:
+            if self._file_format is SinkFormat.binary:
+                self._run_binary()
+                return
+            with self._open() as file:
+                if self._file_format is SinkFormat.csv:
+                    writer = csv.writer(file)
+                    writer.writerow(self.labels)
+                    write_batch = lambda batch: \
+                            writer.writerows(self._csv_row(record)
+                                             for record in batch)
+                else:
+                    write_batch = lambda batch: \
+                            file.write("".join(self._json_line(record)
+                                               for record in batch))
+                batch = batches.get()
+                while batch is not None:
+                    write_batch(batch)
+                    self._written += len(batch)
+                    batch = batches.get()
+        except Exception as error:
+            self._error = error
+            # Keep draining so the simulation never waits on a dead writer.
+            while batches.get() is not None:
+                pass
+
+    def _run_binary(self):
+        """Writer thread loop for the binary format.
+        """
+        writer = TraceFileWriter(self._file_name)
+        try:
+            batch = self._batches.get()
+            while batch is not None:
+                writer.write_batch(batch)
+                self._written += len(batch)
+                batch = self._batches.get()
+        except Exception:
+            writer.abort()
+            raise
+        writer.close()
+
+    @staticmethod
+    def _csv_row(record):
+        """Returns a CSV row list for a record tuple.
+        """
+        row = list(record[:6])
+        fields = record[6]
+        if fields:
+            for label, value in fields.items():
+                row.append(label + ":")
+                row.append(value)
+        return row
+
+    @staticmethod
+    def _json_line(record):
+        """Returns a line of JSON for a record tuple.
+        """
+        data = {'number': record[0], 'rep': record[1], 'time': record[2],
+                'priority': record[3], 'record_type': record[4],
+                'name': record[5]}
+        if record[6]:
+            data.update(record[6])
+        return json.dumps(data, default = str) + "\n"
+
+
+class ShardedTraceSink(object):
+    """Streams each rep's trace records to its own file.
+
+    Each shard is written by a :class:`TraceSink`. A new shard is
+    started when a record from a new rep arrives, and the previous
+    shard is closed, so only one writer thread runs at a time, and
+    memory use does not grow with the number of records or reps. Merge
+    the shards into one chronological trace with
+    :func:`despy.output.trace.merge_traces`.
+
+    **Members**
+
+    ..  autosummary::
+
+        file_names
+        written
+        write
+        flush
+        close
+    """
+
+    def __init__(self, file_pattern, file_format = SinkFormat.binary,
+                 **kwargs):
+        """Create a ShardedTraceSink object.
+
+        *Arguments*
+            ``file_pattern`` (String)
+                Full name of the shard files, with a ``{rep}``
+                placeholder, for example "trace_{rep}.dpt".
+            ``file_format`` (:class:`SinkFormat`)
+                Optional, defaults to ``SinkFormat.binary``.
+            ``kwargs``
+                Optional. Passed to each :class:`TraceSink`.
+        """
+        if "{rep" not in file_pattern:
+            raise ValueError("ShardedTraceSink file_pattern must contain "
+                             "a {{rep}} placeholder. {} was passed "
+                             "instead.".format(file_pattern))
+        self._file_pattern = file_pattern
+        self._file_format = file_format
+        self._kwargs = kwargs
+        self._sink = None
+        self._rep = None
+        self._file_names = []
+        self._written = 0
+
+    @property
+    def file_names(self):
+        """Names of the shard files, in the order they were started.
+
+        *Type:* List of strings, read-only.
+        """
+        return self._file_names
+
+    @property
+    def written(self):
+        """Number of records written to closed shards.
+
+        *Type:* Integer, read-only.
+        """
+        return self._written
+
+    def write(self, record):
+        """Adds a record to the shard for its rep.
+
+        *Arguments*
+            ``record`` (Tuple)
+                See :meth:`TraceSink.write`.
+        """
+        rep = record[1]
+        if rep != self._rep:
+            self.close()
+            file_name = self._file_pattern.format(rep = rep)
+            self._sink = TraceSink(file_name, self._file_format,
+                                   **self._kwargs)
+            self._file_names.append(file_name)
+            self._rep = rep
+        self._sink.write(record)
+
+    def flush(self):
+        """Hands the current shard's batch to its writer thread.
+        """
+        if self._sink is not None:
+            self._sink.flush()
+
+    def close(self):
+        """Closes the current shard.
+        """
+        if self._sink is not None:
+            sink, self._sink = self._sink, None
+            self._rep = None
+            sink.close()
+            self._written += sink.written
@@ -148,7 +148,15 @@ class AbstractStatistic(metaclass = abc.ABCMeta):
         pass
     
 class  DiscreteStatistic(AbstractStatistic):
-    """Basic statistic that is NOT time-weighted."""
+    """Basic statistic that is NOT time-weighted.
+    
+    Times and values are stored in typed numpy arrays that double in
+    size when full. The :attr:`times`, :attr:`values`,
+    :meth:`rep_times` and :meth:`rep_values` members return views of
+    the arrays, not copies.
+    """
+    
+    _initial_capacity = 64
     
     def __init__(self, name, dtype):
         super().__init__(name, dtype)        
@@ -163,8 +171,9 @@ class  DiscreteStatistic(AbstractStatistic):
                                 'reps', 'rep_lengths', 'rep_means'])
         
         #### Internal Details #####
-        self._times = [];
-        self._values = [];
+        self._times = np.empty(self._initial_capacity, dtype='u8')
+        self._values = np.empty(self._initial_capacity, dtype=self.dtype)
+        self._length = 0
         self._index = []        
         # Index structure
         #[[rep1_beg, rep1_len], 
@@ -187,14 +196,40 @@ class  DiscreteStatistic(AbstractStatistic):
         
     @property
     def times(self):
-        return np.array(self._times)
+        """Times of all data points, for all reps.
+        
+        *Type:* Numpy array view, read-only.
+        """
+        return self._times[:self._length]
     
     @property
     def values(self):
-        return np.array(self._values)
+        """Values of all data points, for all reps.
+        
+        *Type:* Numpy array view, read-only.
+        """
+        return self._values[:self._length]
+    
+    def rep_times(self, rep):
+        """Returns a view of the data point times for a single rep.
+        
+        *Arguments*
+            ``rep`` (Integer)
+                The replication number, starting with zero.
+        """
+        return self._times[self._grb(rep):self._grb(rep) + self._grl(rep)]
+    
+    def rep_values(self, rep):
+        """Returns a view of the data point values for a single rep.
+        
+        *Arguments*
+            ``rep`` (Integer)
+                The replication number, starting with zero.
+        """
+        return self._values[self._grb(rep):self._grb(rep) + self._grl(rep)]
         
     def setup(self):
-        self._index.append([len(self._times), 0])
+        self._index.append([self._length, 0])
         
     def teardown(self, time = None):
         pass
@@ -230,8 +265,12 @@ class  DiscreteStatistic(AbstractStatistic):
               and is read-only).
         """
         if not self._finalized:
-            self._times.append(time)
-            self._values.append(value)
+            length = self._length
+            if length == len(self._values):
+                self._grow()
+            self._times[length] = time
+            self._values[length] = value
+            self._length = length + 1
 #             if len(self.index) == 0:
 #                 self.initialize()            
             self._index[-1][1] += 1
@@ -239,12 +278,21 @@ class  DiscreteStatistic(AbstractStatistic):
             raise StatisticError("Cannot append to finalized "
                                  "statistics.")
         
+    def _grow(self):
+        """Doubles the capacity of the time and value arrays.
+        """
+        capacity = 2 * len(self._values)
+        times = np.empty(capacity, dtype='u8')
+        times[:self._length] = self._times[:self._length]
+        values = np.empty(capacity, dtype=self.dtype)
+        values[:self._length] = self._values[:self._length]
+        self._times = times
+        self._values = values
+        
     def finalize(self):
-        """Convert data to numpy arrays to speed up calculations."""       
-        np_times = np.array(self._times, dtype='u8')
-        np_values = np.array(self._values, dtype=self.dtype)
-        self._times = np_times
-        self._values = np_values
+        """Releases unused capacity and makes the statistic read-only."""       
+        self._times = self._times[:self._length].copy()
+        self._values = self._values[:self._length].copy()
         self._finalized = True
         
     @property
@@ -252,7 +300,7 @@ class  DiscreteStatistic(AbstractStatistic):
         if self._total_length is not None:
             return self._total_length
         else:
-            total_length = len(self._times)
+            total_length = self._length
             if self._finalized:
                 self._total_length = total_length
             return total_length
@@ -283,9 +331,8 @@ class  DiscreteStatistic(AbstractStatistic):
         if self._rep_means is not None:
             return self._rep_means
         else:
-            rep_means = np.array([np.mean(
-                            self._values[self._grb(i):self._gre(i)+1])\
-                            for i in range(self.reps)])
+            rep_means = np.array([np.mean(self.rep_values(i))
+                                  for i in range(self.reps)])
             if self._finalized:
                 self._rep_means = rep_means
             return rep_means
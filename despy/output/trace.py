@@ -10,8 +10,10 @@ despy.output.trace
 ..  autosummary::
 
     TraceRecord
+    TraceFilter
     Trace
     CSV_file
+    merge_traces
 
     
 ..  todo::
@@ -35,13 +37,21 @@ despy.output.trace
     
     Write column headers to console trace.
 """
+from array import array
+from bisect import bisect_left
 from collections import OrderedDict
 import csv
+from fnmatch import fnmatchcase
+from heapq import merge
+from operator import itemgetter
+import random
 
 from IPython.display import HTML
+import numpy as np
 
 from despy.output.report import Datatype
-from despy.session import Session
+import despy.output.console as console
+from despy.session import Session, Verbosity
         
 class TraceRecord(OrderedDict):
     """Single record in a trace report containing multiple data fields.
@@ -132,7 +142,10 @@ class TraceRecord(OrderedDict):
         return default_fields + custom_fields
     
     def show(self):
-        print(self)
+        """Writes the record to the console, unless the verbosity is quiet.
+        """
+        console.display_message("{}", self, level = Verbosity.summary)
+        console.flush()
     
     @property
     def standard_labels(self):
@@ -189,9 +202,170 @@ class TraceRecord(OrderedDict):
             
         return trace_row
         
+class TraceFilter(object):
+    """A rule that includes or excludes trace records.
+    
+    A record matches the rule if it matches every criterion that is not
+    None. Add rules with :meth:`Trace.add_filter`; the first matching
+    rule decides whether a record is kept. If no rule matches, the
+    record is kept, unless the trace has at least one include rule.
+    
+    Decisions are cached by record type, name, event class and
+    component, so each distinct kind of record is matched against the
+    rules only once per simulation. Events whose records are filtered
+    out do not build them.
+    
+    **Members**
+    
+    ..  autosummary::
+    
+        exclude
+        event_class
+        component
+        record_type
+        name
+        every
+        probability
+        matches
+        dp_sample
+        dp_reset
+    """
+    def __init__(self, exclude = False, event_class = None, component = None,
+                 record_type = None, name = None, every = None,
+                 probability = None):
+        """Create a TraceFilter object.
+        
+        *Arguments*
+            ``exclude`` (Boolean)
+                Optional, defaults to False. If True, matching records
+                are dropped. If False, they are kept.
+            ``event_class`` (Class or tuple of classes)
+                Optional. Matches event records for events of this
+                class, including subclasses.
+            ``component`` (String)
+                Optional. A name pattern, with shell-style wildcards,
+                for the component that owns the event, or that added
+                the message.
+            ``record_type`` (String)
+                Optional. "Event" or "Msg".
+            ``name`` (String)
+                Optional. A name pattern, with shell-style wildcards,
+                for the record's name.
+            ``every`` (Integer)
+                Optional. Keep only every Nth matching record, starting
+                with the first.
+            ``probability`` (Float)
+                Optional. Keep each matching record with this
+                probability. Sampling uses its own random number
+                generator, so it does not change the simulation.
+        """
+        if every is not None and every < 1:
+            raise ValueError("TraceFilter every argument must be a "
+                             "positive integer. {} was passed instead."
+                             "".format(every))
+        if probability is not None and not 0 <= probability <= 1:
+            raise ValueError("TraceFilter probability argument must be "
+                             "between 0 and 1. {} was passed instead."
+                             "".format(probability))
+        self.exclude = exclude
+        self.event_class = event_class
+        self.component = component
+        self.record_type = record_type
+        self.name = name
+        self.every = every
+        self.probability = probability
+        self._seen = 0
+        
+    def matches(self, record_type, name, event_class = None,
+                component = None):
+        """True if a record matches every criterion of the rule.
+        
+        *Arguments*
+            ``record_type`` (String)
+                "Event" or "Msg".
+            ``name`` (String)
+                The name of the record.
+            ``event_class`` (Class)
+                Optional. The class of the event, for event records.
+            ``component`` (String)
+                Optional. The name of the component.
+                
+        *Returns:* Boolean
+        """
+        if self.record_type is not None and record_type != self.record_type:
+            return False
+        if self.name is not None and not fnmatchcase(name, self.name):
+            return False
+        if self.event_class is not None and (event_class is None or
+                not issubclass(event_class, self.event_class)):
+            return False
+        if self.component is not None and (component is None or
+                not fnmatchcase(component, self.component)):
+            return False
+        return True
+    
+    def dp_sample(self, generator):
+        """Decides whether to keep a record that matched the rule.
+        
+        Internal Method. Called by the trace for each matching record.
+        
+        *Arguments*
+            ``generator`` (:class:`random.Random`)
+                Random number generator used for probability sampling.
+                
+        *Returns:* Boolean
+        """
+        if self.exclude:
+            return False
+        seen = self._seen
+        self._seen = seen + 1
+        if self.every is not None and seen % self.every:
+            return False
+        if self.probability is not None and \
+                generator.random() >= self.probability:
+            return False
+        return True
+    
+    def dp_reset(self):
+        """Restarts the every-Nth count.
+        """
+        self._seen = 0
+
+
 class Trace(object):
     """List of messages and events that occurred during the simulation.
     
+    Records are stored by column rather than as TraceRecord objects.
+    The standard fields are kept in typed numpy arrays that double in
+    size when full. The ``name`` and ``record_type`` strings are
+    interned, and their columns hold integer codes into
+    :attr:`strings`. Each custom field label has its own sparse column,
+    which holds only the rows that have that field. Each record also
+    keeps a code for the order of its custom field labels.
+    
+    In ring buffer mode, set with
+    :attr:`despy.session.Config.trace_ring_length`, the trace keeps the
+    most recent records in preallocated storage instead of the first
+    :attr:`max_length` records, and custom fields are kept per record.
+    The simulation calls :meth:`dump` if an event raises an exception,
+    and :class:`despy.model.trigger.TraceDumpTrigger` dumps the trace
+    when a condition is met, so tracing can stay on at constant memory.
+    
+    Indexing the trace with an integer, or iterating over it, rebuilds
+    :class:`TraceRecord` objects, with custom fields in the order they
+    were added to the original record. Indexing it with a standard field
+    label returns a numpy view of that column, for vectorized filtering
+    and aggregation. For example, the times of all events named
+    "Arrival" are::
+    
+        trace['time'][trace['name'] == trace.code("Arrival")]
+    
+    While tracing, the trace also indexes record positions by name and
+    by the value of the ``Entity`` field, so :meth:`by_name` and
+    :meth:`for_entity` return their k results in O(k) time. Records
+    are added in rep and time order, so :meth:`between` finds a time
+    range by binary search in O(log n) time.
+    
     **Members**
     
     ..  autosummary::
@@ -199,24 +373,81 @@ class Trace(object):
         start
         stop
         max_length
+        reps
+        ring_length
+        active
+        strings
+        labels
+        sinks
+        filters
         __len__
         __getitem__
+        __iter__
+        code
+        field
+        by_name
+        for_entity
+        between
         is_active
+        dp_update_window
+        dp_set_ring
+        add_filter
+        dp_compile_filters
+        dp_accept
+        dump
+        write_binary
+        add_sink
+        close_sinks
         add
     """
     
+    _dtypes = (('rep', 'u4'), ('time', 'i8'), ('priority', 'i1'),
+               ('record_type', 'u4'), ('name', 'u4'))
     
-    def __init__(self):
+    #: Custom field label whose values are indexed by :meth:`for_entity`.
+    entity_label = 'Entity'
+    
+    def __init__(self, capacity = 1024):
+        """Create a Trace object.
         
-        #Public attributes
-        self._max_length = 1000  
+        *Arguments*
+            ``capacity`` (Integer)
+                Optional, defaults to 1024. Number of records allocated
+                initially.
+        """
         
         #Private attributes
-        self._record_list = [] #List of TraceRecords
+        self._length = 0
         self._number = 0
+        self._sinks = []
+        self._ring = None
+        self._ring_fields = None
+        self._name_index = {}
+        self._entity_index = {}
+        self._last_key = (0, float('-inf'))
+        self._sorted = True
+        self._filters = []
+        self._filter_cache = {}
+        self._include_rules = False
+        self._filter_random = random.Random()
+        self._columns = {label: np.empty(capacity, dtype = dtype)
+                         for label, dtype in self._dtypes}
+        self._string_codes = {}
+        self._strings = []
+        self._fields = OrderedDict()
+        self._layout_codes = {(): 0}
+        self._layouts = [()]
+        self._record_layouts = array('l')
         self._session = Session()
         self._config = self._session.config
         
+        #: True if the trace is recording at the current simulation
+        #: time. Checked before building trace records, so events and
+        #: messages outside of the trace window cost nothing. Updated
+        #: by :meth:`dp_update_window`.
+        self.active = False
+        self._next_check = float('-inf')
+        
     @property
     def sim(self):
         return self._session.sim
@@ -252,6 +483,24 @@ class Trace(object):
         reaches 500 TraceRecords.
         """
         return self._config.trace_max_length
+    
+    @property
+    def reps(self):
+        """The trace records replications ``reps[0]`` to ``reps[1] - 1``.
+        
+        *Type:* Tuple of two integers. The second integer may be None,
+        in which case every replication from ``reps[0]`` on is recorded.
+        """
+        return self._config.trace_reps
+    
+    @property
+    def ring_length(self):
+        """Number of records kept in ring buffer mode, or None.
+        
+        *Type:* Integer or None, read-only. Set with
+        :meth:`dp_set_ring`.
+        """
+        return self._ring
         
     @property
     def length(self):
@@ -259,39 +508,519 @@ class Trace(object):
         
         *Type:* Integer
         """
-        return len(self._record_list)
+        return self._length
+    
+    @property
+    def strings(self):
+        """Interned names and record types, indexed by their codes.
+        
+        *Type:* List of strings, read-only.
+        """
+        return self._strings
+    
+    @property
+    def labels(self):
+        """Custom field labels, in the order they were first recorded.
+        
+        *Type:* List of strings.
+        """
+        if self._ring is None:
+            return list(self._fields)
+        labels = OrderedDict()
+        for index in range(self._length):
+            fields = self._ring_fields[self._row(index)]
+            if fields:
+                labels.update(fields)
+        return list(labels)
+    
+    @property
+    def sinks(self):
+        """Sinks that receive every record in the trace window.
+        
+        *Type:* List of :class:`despy.output.sink.TraceSink`, read-only.
+        """
+        return self._sinks
+    
+    @property
+    def filters(self):
+        """Rules that decide which records are kept, in order.
+        
+        *Type:* List of :class:`TraceFilter`, read-only. Use
+        :meth:`add_filter` to add a rule.
+        """
+        return self._filters
     
     def __len__(self):
         """Built-in len() function will return number of records.
         
         *Returns:* Integer
         """
-        return len(self._record_list)
+        return self._length
     
     def __getitem__(self, index):
         """Enables accessing TraceRecord with square brackets and index.
         
         *Arguments*
-            ``index`` (Integer)
+            ``index`` (Integer or String)
                 The first Record added to the Trace will be at
-                index = 0, the second at index = 1, and so on.
+                index = 0, the second at index = 1, and so on. If
+                ``index`` is a standard field label, such as ``'time'``,
+                returns a numpy view of that column instead.
+                
+        *Returns:* :class:`TraceRecord` rebuilt from the columns, or a
+        numpy array.
         """
-        return self._record_list[index]
+        if isinstance(index, str):
+            column = self._columns[index]
+            if self._ring is not None and self._length == self._ring:
+                start = self._number % self._ring
+                return np.concatenate((column[start:], column[:start]))
+            return column[:self._length]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("Trace index {} out of range.".format(index))
+        row = self._row(index)
+        columns = self._columns
+        strings = self._strings
+        record = TraceRecord(int(columns['rep'][row]),
+                             int(columns['time'][row]),
+                             int(columns['priority'][row]),
+                             strings[columns['record_type'][row]],
+                             strings[columns['name'][row]])
+        if self._ring is not None:
+            record['number'] = self._number - self._length + index
+            fields = self._ring_fields[row]
+            if fields:
+                record.add_fields(fields)
+            return record
+        record['number'] = index
+        fields = self._fields
+        for label in self._layouts[self._record_layouts[index]]:
+            rows, values = fields[label]
+            record[label] = values[bisect_left(rows, index)]
+        return record
     
     def __iter__(self):
-        return self._record_list
+        """Iterates over the records, rebuilding each TraceRecord.
+        """
+        for index in range(self._length):
+            yield self[index]
+            
+    def code(self, string):
+        """Returns the integer code of an interned name or record type.
+        
+        *Returns:* Integer, or -1 if the string has not been recorded.
+        """
+        return self._string_codes.get(string, -1)
+    
+    def field(self, label):
+        """Returns the sparse column for a custom field.
+        
+        *Arguments*
+            ``label`` (String)
+                The custom field label.
+                
+        *Returns:* A tuple of a numpy array with the numbers of the
+        records that have the field, and a list of the field values.
+        """
+        if self._ring is None:
+            rows, values = self._fields[label]
+            return np.array(rows, dtype = 'l'), list(values)
+        first = self._number - self._length
+        numbers, values = [], []
+        for index in range(self._length):
+            fields = self._ring_fields[self._row(index)]
+            if fields and label in fields:
+                numbers.append(first + index)
+                values.append(fields[label])
+        if not numbers:
+            raise KeyError(label)
+        return np.array(numbers, dtype = 'l'), values
+    
+    def by_name(self, name):
+        """Indexes of the records with a name.
+        
+        *Arguments*
+            ``name`` (String)
+                The event name or message, such as "Entering Queue".
+                
+        *Returns:* A numpy array of record indexes, in order.
+        """
+        code = self.code(name)
+        if code < 0:
+            return np.empty(0, dtype = 'l')
+        if self._ring is not None:
+            return np.flatnonzero(self['name'] == code)
+        return np.array(self._name_index[code], dtype = 'l')
+    
+    def for_entity(self, entity):
+        """Indexes of the records whose ``Entity`` field is an entity.
+        
+        Entities are matched by their string, so the entity object and
+        ``str(entity)`` give the same result.
+        
+        *Arguments*
+            ``entity``
+                The entity, or its string.
+                
+        *Returns:* A numpy array of record indexes, in order.
+        """
+        key = str(entity)
+        if self._ring is not None:
+            label = self.entity_label
+            found = []
+            for index in range(self._length):
+                fields = self._ring_fields[self._row(index)]
+                if fields and label in fields and str(fields[label]) == key:
+                    found.append(index)
+            return np.array(found, dtype = 'l')
+        rows = self._entity_index.get(key)
+        if rows is None:
+            return np.empty(0, dtype = 'l')
+        return np.array(rows, dtype = 'l')
+    
+    def between(self, start = None, stop = None, rep = None):
+        """Finds the records in a time range, a rep, or both.
+        
+        *Arguments*
+            ``start`` (Integer)
+                Optional. Only records at or after this time.
+            ``stop`` (Integer)
+                Optional. Only records before this time.
+            ``rep`` (Integer)
+                Optional. Only records from this rep. Required with
+                ``start`` or ``stop`` if the trace holds more than one
+                rep.
+                
+        *Returns:* A Python slice object, for indexing the columns or
+        ``range(len(trace))``.
+        """
+        if not self._sorted:
+            raise ValueError("Trace records were not added in rep and "
+                             "time order, so they cannot be searched "
+                             "by time.")
+        first, last = 0, self._length
+        if rep is not None:
+            reps = self['rep']
+            first = int(np.searchsorted(reps, rep, 'left'))
+            last = int(np.searchsorted(reps, rep, 'right'))
+        times = self['time'][first:last]
+        if stop is not None:
+            last = first + int(np.searchsorted(times, stop, 'left'))
+        if start is not None:
+            first = first + int(np.searchsorted(times, start, 'left'))
+        return slice(first, max(first, last))
     
     def is_active(self):
         """True if Trace object is currently recording.
         
-        True if max_length not reached and current simulation time
-        between Trace.start and Trace.stop. False otherwise.
+        True if max_length not reached, the current replication is in
+        Trace.reps, and current simulation time between Trace.start and
+        Trace.stop. False otherwise.
         
         *Returns:* Boolean
         """
         now = self.sim.now
-        return (now < self.stop) and (self._number < self.max_length) \
-            and (now >= self.start)
+        if now >= self._next_check:
+            self.dp_update_window(self.sim.rep, now)
+        return self.active
+    
+    def dp_update_window(self, rep, now):
+        """Recomputes :attr:`active` and the time of the next change.
+        
+        Internal Method. Called by the simulation at the start of each
+        replication, and whenever the simulation time reaches the next
+        trace start or stop time, so that :attr:`active` is only
+        recomputed when the trace window opens or closes.
+        
+        *Arguments*
+            ``rep`` (Integer)
+                The current replication.
+            ``now`` (Integer)
+                The current simulation time.
+        """
+        first_rep, stop_rep = self.reps
+        full = self._length >= self.max_length and not self._sinks \
+                and self._ring is None
+        if (rep < first_rep) or (stop_rep is not None and rep >= stop_rep) \
+                or full or (now >= self.stop):
+            self.active = False
+            self._next_check = float('inf')
+        elif now < self.start:
+            self.active = False
+            self._next_check = self.start
+        else:
+            self.active = True
+            self._next_check = self.stop
+            
+    def dp_set_ring(self, length):
+        """Switches ring buffer mode on or off.
+        
+        Internal Method. Called by the simulation when it is
+        initialized, with :attr:`despy.session.Config.trace_ring_length`.
+        Changing the mode clears the trace.
+        
+        *Arguments*
+            ``length`` (Integer or None)
+                Number of records to keep, or None to keep the first
+                :attr:`max_length` records.
+        """
+        if length == self._ring:
+            return
+        if length is not None and length < 1:
+            raise ValueError("Trace ring length must be a positive "
+                             "integer or None. {} was passed instead."
+                             "".format(length))
+        self.clear()
+        self._ring = length
+        if length is None:
+            self._ring_fields = None
+        else:
+            self._columns = {label: np.empty(length, dtype = dtype)
+                             for label, dtype in self._dtypes}
+            self._ring_fields = [None] * length
+            
+    def add_filter(self, trace_filter):
+        """Appends a rule to :attr:`filters`.
+        
+        *Arguments*
+            ``trace_filter`` (:class:`TraceFilter`)
+                The rule. Rules added earlier take precedence.
+        """
+        if not isinstance(trace_filter, TraceFilter):
+            raise TypeError("Trace.add_filter() requires a despy.output."
+                            "trace.TraceFilter. {} was passed instead."
+                            "".format(type(trace_filter)))
+        self._filters.append(trace_filter)
+        self._include_rules = any(not rule.exclude
+                                  for rule in self._filters)
+        self._filter_cache.clear()
+        
+    def dp_compile_filters(self, seed = None):
+        """Clears cached filter decisions and restarts sampling.
+        
+        Internal Method. Called by the simulation when it is
+        initialized.
+        
+        *Arguments*
+            ``seed`` (Integer)
+                Optional. Seed for the probability sampling generator.
+        """
+        self._filter_cache.clear()
+        self._filter_random.seed(seed)
+        for rule in self._filters:
+            rule.dp_reset()
+            
+    def dp_accept(self, record_type, name, event = None, component = None):
+        """True if a record passes the trace filters.
+        
+        Internal Method. Called before a record is built. The matching
+        rule for each distinct record type, name, event class and
+        component is looked up once and cached.
+        
+        *Arguments*
+            ``record_type`` (String)
+                "Event" or "Msg".
+            ``name`` (String)
+                The name of the record.
+            ``event``
+                Optional. The event, for event records.
+            ``component`` (:class:`despy.model.component.Component`)
+                Optional. The component that added a message.
+                
+        *Returns:* Boolean
+        """
+        if not self._filters:
+            return True
+        event_class = None
+        if event is not None:
+            event_class = type(event)
+            if component is None:
+                component = getattr(event, 'owner', None)
+        component_name = None if component is None else component.name
+        key = (record_type, name, event_class, component_name)
+        try:
+            rule = self._filter_cache[key]
+        except KeyError:
+            rule = None
+            for candidate in self._filters:
+                if candidate.matches(record_type, name, event_class,
+                                     component_name):
+                    rule = candidate
+                    break
+            self._filter_cache[key] = rule
+        if rule is None:
+            return not self._include_rules
+        return rule.dp_sample(self._filter_random)
+        
+    def dump(self, file_name = None):
+        """Writes the records held by the trace, oldest first.
+        
+        *Arguments*
+            ``file_name`` (String)
+                Optional. Full name of the CSV file. Defaults to
+                :attr:`despy.session.Config.trace_dump_file`. If both
+                are None, the records are written to the console, after
+                any buffered console output, unless the verbosity is
+                quiet.
+                
+        *Returns:* The file name, or None if the records were written
+        to the console.
+        """
+        if file_name is None:
+            file_name = self._config.trace_dump_file
+        if file_name is None:
+            self._display(range(self._length))
+            return None
+        with open(file_name, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(['Record #', 'Rep', 'Time',
+                             'Priority', 'Record Type', 'Name'])
+            for record in self:
+                writer.writerow(record.get_row())
+        return file_name
+        
+    def write_binary(self, file_name):
+        """Writes the records held by the trace to a binary trace file.
+        
+        Open the file with :class:`despy.output.tracefile.TraceFile`.
+        
+        *Arguments*
+            ``file_name`` (String)
+                The full name, including the path, of the file.
+                
+        *Returns:* The file name.
+        """
+        from despy.output.tracefile import TraceFileWriter
+        writer = TraceFileWriter(file_name)
+        batch = []
+        for record in self:
+            fields = {label: record[label] for label in record.custom_labels}
+            batch.append((record['number'], record['rep'], record['time'],
+                          record['priority'], record['record_type'],
+                          record['name'], fields))
+            if len(batch) == 4096:
+                writer.write_batch(batch)
+                batch = []
+        writer.write_batch(batch)
+        writer.close()
+        return file_name
+        
+    def add_sink(self, sink):
+        """Streams every following record in the trace window to a sink.
+        
+        Records are passed to the sink even after the trace reaches
+        :attr:`max_length`, so a sink can hold the full trace of a long
+        run. Sinks are closed by :meth:`close_sinks`, which is called
+        when the simulation is finalized.
+        
+        *Arguments*
+            ``sink`` (:class:`despy.output.sink.TraceSink`)
+                Any object with ``write`` and ``close`` methods.
+        """
+        self._sinks.append(sink)
+        self._next_check = float('-inf')
+        
+    def close_sinks(self):
+        """Writes any buffered records and closes and removes all sinks.
+        """
+        sinks, self._sinks = self._sinks, []
+        for sink in sinks:
+            sink.close()
+        if self._length >= self.max_length and self._ring is None:
+            self.active = False
+            self._next_check = float('inf')
+        
+    def _row(self, index):
+        """Returns the storage row of the record at an index.
+        """
+        if self._ring is None:
+            return index
+        return (self._number - self._length + index) % self._ring
+        
+    def _intern(self, string):
+        """Returns the code for a string, adding it if necessary.
+        """
+        code = self._string_codes.get(string)
+        if code is None:
+            code = len(self._strings)
+            self._string_codes[string] = code
+            self._strings.append(string)
+        return code
+    
+    def _grow(self):
+        """Doubles the number of allocated records.
+        """
+        for label, data in self._columns.items():
+            grown = np.empty(max(2 * len(data), 16), dtype = data.dtype)
+            grown[:self._length] = data[:self._length]
+            self._columns[label] = grown
+    
+    def _append(self, rep, time, priority, record_type, name, fields):
+        """Stores one record in the columns and sinks, returns its number.
+        """
+        number = self._number
+        self._number = number + 1
+        for sink in self._sinks:
+            sink.write((number, rep, time, int(priority), record_type, name,
+                        fields))
+        ring = self._ring
+        if ring is not None:
+            row = number % ring
+            self._ring_fields[row] = fields
+            if self._length < ring:
+                self._length += 1
+        else:
+            row = self._length
+            if row >= self.max_length:
+                return number
+        columns = self._columns
+        if row == len(columns['rep']):
+            self._grow()
+            columns = self._columns
+        columns['rep'][row] = rep
+        columns['time'][row] = time
+        columns['priority'][row] = priority
+        columns['record_type'][row] = self._intern(record_type)
+        name_code = self._intern(name)
+        columns['name'][row] = name_code
+        key = (rep, time)
+        if key < self._last_key:
+            self._sorted = False
+        self._last_key = key
+        if ring is not None:
+            return number
+        rows = self._name_index.get(name_code)
+        if rows is None:
+            rows = self._name_index[name_code] = array('l')
+        rows.append(row)
+        layout = tuple(fields) if fields else ()
+        layout_code = self._layout_codes.get(layout)
+        if layout_code is None:
+            layout_code = self._layout_codes[layout] = len(self._layouts)
+            self._layouts.append(layout)
+        self._record_layouts.append(layout_code)
+        if fields:
+            for label, value in fields.items():
+                column = self._fields.get(label)
+                if column is None:
+                    column = (array('l'), [])
+                    self._fields[label] = column
+                column[0].append(row)
+                column[1].append(value)
+            entity = fields.get(self.entity_label)
+            if entity is not None:
+                entity = str(entity)
+                rows = self._entity_index.get(entity)
+                if rows is None:
+                    rows = self._entity_index[entity] = array('l')
+                rows.append(row)
+        self._length = row + 1
+        if self._length >= self.max_length and not self._sinks:
+            self.active = False
+            self._next_check = float('inf')
+        return number
         
     def add(self, trace_records):
         """Adds TraceRecords to Trace class and writes console output.
@@ -300,7 +1029,7 @@ class Trace(object):
             `trace_records`: :class:`despy.output.trace.TraceRecord`
                 A single or list of TraceRecord objects
         """
-        if self.is_active():
+        if self.active:
             
             #Check if argument is a single TraceRecord or a list.
             if isinstance(trace_records, TraceRecord):
@@ -310,14 +1039,15 @@ class Trace(object):
                 
             #Save each TraceRecord object to the Trace object.
             for rec in records:
-                rec["number"] = self._number
-                self._record_list.append(rec)
-                self._number = self._number + 1
+                custom = {label: rec[label] for label in rec.custom_labels}
+                rec["number"] = self._append(rec['rep'], rec['time'],
+                                             rec['priority'],
+                                             rec['record_type'],
+                                             rec['name'], custom)
                 
                 #Write TraceRecord to the console.
                 if self._config.console_trace:
-                    assert isinstance(rec, TraceRecord)
-                    self.sim.con.display_trace(rec)
+                    console.display_trace(rec)
             
     def add_event(self, rep, time, priority, event):
         """Record an event on the Trace report.
@@ -330,12 +1060,12 @@ class Trace(object):
             `event` (:class:`despy.model.event.Event)
                 Event object that is being recorded.
         """
-        if self.is_active():
+        if self.active and self.dp_accept("Event", event.name, event):
             trace_record = TraceRecord(rep, time,
                                        priority, 'Event', event.name)
             self.add(event.dp_update_trace_record(trace_record))
 
-    def add_message(self, message, fields = None):
+    def add_message(self, message, fields = None, component = None):
         """Creates a message TraceRecord and adds it to the Trace.
         
         *Arguments:*
@@ -344,15 +1074,22 @@ class Trace(object):
             `fields` (Python dictionary)
                 Custom fields that will be added to the TraceRecord.
                 Optional. Defaults to None.
+            `component` (:class:`despy.model.component.Component`)
+                The component that added the message, used by the
+                trace filters. Optional. Defaults to None.
         """
-        trace_record = TraceRecord(self.sim.rep,
-                                   self.sim.now,
-                                   self.sim.pri, "Msg", message)
-        if fields is not None:
-            trace_record.add_fields(fields)
-        
-        #Record message in event trace records.
-        self.add(trace_record)
+        if not self.active or \
+                not self.dp_accept("Msg", message, component = component):
+            return
+        sim = self.sim
+        if self._config.console_trace:
+            trace_record = TraceRecord(sim.rep, sim.now, sim.pri, "Msg",
+                                       message)
+            if fields is not None:
+                trace_record.add_fields(fields)
+            self.add(trace_record)
+        else:
+            self._append(sim.rep, sim.now, sim.pri, "Msg", message, fields)
             
     def show(self, start=None, stop=None):
         if start is None:
@@ -361,8 +1098,17 @@ class Trace(object):
             stop = self.stop
         if stop > len(self):
             stop = len(self)
-        for idx in range(start, stop):
-            self[idx].show()
+        self._display(range(start, stop))
+        
+    def _display(self, indexes):
+        """Writes records to the console at the summary level.
+        """
+        console.flush()
+        if console.enabled(Verbosity.summary):
+            for index in indexes:
+                console.display_message("{}", self[index],
+                                        level = Verbosity.summary)
+        console.flush()
             
     def write_csv(self, directory = None):
         """Create a CSV file_name containing all trace data.
@@ -385,8 +1131,22 @@ class Trace(object):
     def clear(self):
         """Remove all TraceRecords from Trace object.
         """
-        del self._record_list[:]
+        self._length = 0
         self._number = 0
+        self._string_codes.clear()
+        del self._strings[:]
+        self._fields.clear()
+        self._layout_codes = {(): 0}
+        self._layouts = [()]
+        self._record_layouts = array('l')
+        self._name_index.clear()
+        self._entity_index.clear()
+        self._last_key = (0, float('-inf'))
+        self._sorted = True
+        if self._ring is not None:
+            self._ring_fields = [None] * self._ring
+        self.active = False
+        self._next_check = float('-inf')
         
         
 class CSV_file(object):
@@ -457,7 +1217,7 @@ class CSV_file(object):
             # Write trace table
             self._writer.writerow(['Record #', 'Rep', 'Time',
                                    'Priority', 'Record Type', 'Name'])
-            for trace_record in self.trace._record_list:
+            for trace_record in self.trace:
                 self._writer.writerow(trace_record.get_row())
             file.close()
             
@@ -470,4 +1230,82 @@ class CSV_file(object):
             if section[0] == Datatype.param_list:
                 for field in section[1]:
                     self._writer.writerow([field[0], field[1]])
-                    
\ No newline at end of file
+
+
+def _shard_records(trace_file, shard, chunk_size):
+    """Yields ``(sort key, record tuple)`` pairs from a binary shard.
+    
+    Reads ``chunk_size`` records at a time from the memory map.
+    """
+    strings = trace_file.strings
+    fields = trace_file.fields
+    field_numbers = fields['number']
+    for first in range(0, len(trace_file), chunk_size):
+        chunk = np.array(trace_file.records[first:first + chunk_size])
+        numbers = chunk['number']
+        lo = np.searchsorted(field_numbers, numbers[0], 'left')
+        hi = np.searchsorted(field_numbers, numbers[-1], 'right')
+        chunk_fields = np.array(fields[lo:hi])
+        starts = np.searchsorted(chunk_fields['number'], numbers, 'left')
+        stops = np.searchsorted(chunk_fields['number'], numbers, 'right')
+        decode = trace_file.value
+        for row, start, stop in zip(chunk.tolist(), starts, stops):
+            number, rep, time, priority, record_type, name = row
+            custom = None
+            if stop > start:
+                custom = OrderedDict(
+                    (strings[label], decode(offset, length))
+                    for label, offset, length
+                    in chunk_fields[['label', 'offset', 'length']]
+                    [start:stop].tolist())
+            yield ((rep, time, priority, number, shard),
+                   (number, rep, time, priority, strings[record_type],
+                    strings[name], custom))
+
+
+def merge_traces(shard_names, file_name, file_format = None,
+                 chunk_size = 4096):
+    """Merges trace shards into one chronological trace file.
+    
+    Shards are binary trace files, such as those written by
+    :class:`despy.output.sink.ShardedTraceSink` or by separate worker
+    processes. Records are merged in order of rep, time, priority and
+    record number, with ties broken by shard order, and renumbered from
+    zero. Each shard is read through a memory map, ``chunk_size``
+    records at a time, and a binary merged file is written by a
+    :class:`despy.output.tracefile.TraceFileWriter`, which streams its
+    tables to disk. Memory use depends on the number of shards,
+    ``chunk_size``, and the number of distinct record types, names and
+    custom field labels, but not on the number of records.
+    
+    *Arguments*
+        ``shard_names`` (List of strings)
+            Full names of the binary trace shard files.
+        ``file_name`` (String)
+            Full name of the merged file.
+        ``file_format`` (:class:`despy.output.sink.SinkFormat`)
+            Optional, defaults to ``SinkFormat.binary``.
+        ``chunk_size`` (Integer)
+            Optional, defaults to 4096. Records read from a shard at a
+            time.
+            
+    *Returns:* The number of records in the merged file.
+    """
+    from despy.output.sink import SinkFormat, TraceSink
+    from despy.output.tracefile import TraceFile
+    if file_format is None:
+        file_format = SinkFormat.binary
+    shards = [TraceFile(name) for name in shard_names]
+    sink = TraceSink(file_name, file_format, batch_size = chunk_size)
+    try:
+        streams = [_shard_records(shard, index, chunk_size)
+                   for index, shard in enumerate(shards)]
+        count = 0
+        for _, record in merge(*streams, key = itemgetter(0)):
+            sink.write((count,) + record[1:])
+            count += 1
+    finally:
+        sink.close()
+        for shard in shards:
+            shard.close()
+    return count
@@ -0,0 +1,469 @@
+#   Despy: A discrete event simulation framework for Python
+#   Version 0.1
+#   Released under the MIT License (MIT)
+#   Copyright (c) 2015, Stacy Irwin
+"""
+**********************
+despy.output.tracefile
+**********************
+
+..  autosummary::
+
+    TraceFileWriter
+    TraceFile
+
+A binary trace file holds, in order:
+
+1. A 16 byte header: the magic bytes ``DPTRACE2``, a format version
+   and four reserved bytes.
+2. One fixed width record per trace record, see
+   :attr:`TraceFile.record_dtype`. Record types and names are codes
+   into the string table.
+3. The string table: the UTF-8 bytes of each record type, name and
+   custom field label, one after the other, followed by one 8 byte
+   offset per string plus the end offset, and then the string codes in
+   sorted string order.
+4. The custom field table, one fixed width row per custom field,
+   holding the record number, a string code for the label, and the
+   offset and length of the value in the value table. Rows are in
+   record number order.
+5. The value table: each custom field value, encoded as JSON text.
+6. A 72 byte footer: the record count, the offset, length and count
+   of the string table, the offset and row count of the field table,
+   the offset and length of the value table, and the magic bytes
+   again.
+
+All numbers are little-endian.
+"""
+import json
+import shutil
+import struct
+import tempfile
+
+import numpy as np
+
+from despy.output.trace import TraceRecord
+
+_MAGIC = b"DPTRACE2"
+_VERSION = 2
+_HEADER = struct.Struct("<8sII")
+_FOOTER = struct.Struct("<QQQQQQQQ8s")
+
+_RECORD_DTYPE = np.dtype([('number', '<i8'), ('rep', '<u4'),
+                          ('time', '<i8'), ('priority', '<i1'),
+                          ('record_type', '<u4'), ('name', '<u4')])
+_FIELD_DTYPE = np.dtype([('number', '<i8'), ('label', '<u4'),
+                         ('offset', '<u8'), ('length', '<u4')])
+
+
+class TraceFileWriter(object):
+    """Writes trace records to a binary trace file.
+
+    Used by :meth:`despy.output.trace.Trace.write_binary` and by
+    :class:`despy.output.sink.TraceSink` with
+    ``SinkFormat.binary``. Records are written in batches as fixed width
+    rows. Custom field rows and values are written to temporary files
+    with each batch and copied into place by :meth:`close`, so memory
+    use does not grow with the number of records.
+
+    Record types, names and custom field labels are interned, so the
+    writer keeps one copy of each distinct string. Custom field values
+    are not interned.
+
+    **Members**
+
+    ..  autosummary::
+
+        file_name
+        written
+        write_batch
+        close
+        abort
+    """
+
+    def __init__(self, file_name):
+        """Create a TraceFileWriter object and write the file header.
+
+        *Arguments*
+            ``file_name`` (String)
+                The full name, including the path, of the file.
+        """
+        self._file_name = file_name
+        self._file = open(file_name, 'wb')
+        self._file.write(_HEADER.pack(_MAGIC, _VERSION, 0))
+        self._written = 0
+        self._string_codes = {}
+        self._string_file = tempfile.TemporaryFile()
+        self._string_offsets = [0]
+        self._field_file = tempfile.TemporaryFile()
+        self._field_count = 0
+        self._value_file = tempfile.TemporaryFile()
+        self._value_length = 0
+
+    @property
+    def file_name(self):
+        """The full name, including the path, of the file.
+
+        *Type:* String, read-only.
+        """
+        return self._file_name
+
+    @property
+    def written(self):
+        """Number of records written so far.
+
+        *Type:* Integer, read-only.
+        """
+        return self._written
+
+    def _intern(self, string):
+        """Returns the code for a string, adding it if necessary.
+        """
+        code = self._string_codes.get(string)
+        if code is None:
+            code = len(self._string_codes)
+            self._string_codes[string] = code
+            data = string.encode('utf-8')
+            self._string_file.write(data)
+            self._string_offsets.append(self._string_offsets[-1] +
+                                        len(data))
+        return code
+
+    def write_batch(self, records):
+        """Writes a list of record tuples.
+
+        *Arguments*
+            ``records`` (List of tuples)
+                Each tuple holds the record number, rep, time,
+                priority, record type, name, and a dictionary of custom
+                fields or None.
+        """
+        rows = np.empty(len(records), dtype = _RECORD_DTYPE)
+        intern = self._intern
+        fields = []
+        values = []
+        offset = self._value_length
+        for row, record in enumerate(records):
+            number, rep, time, priority, record_type, name, custom = record
+            rows[row] = (number, rep, time, priority, intern(record_type),
+                         intern(name))
+            if custom:
+                for label, value in custom.items():
+                    data = json.dumps(value, default = str).encode('utf-8')
+                    fields.append((number, intern(label), offset,
+                                   len(data)))
+                    values.append(data)
+                    offset += len(data)
+        self._file.write(rows.tobytes())
+        self._written += len(records)
+        if fields:
+            self._field_file.write(np.array(fields, dtype = _FIELD_DTYPE)
+                                   .tobytes())
+            self._value_file.write(b"".join(values))
+            self._field_count += len(fields)
+            self._value_length = offset
+
+    def close(self):
+        """Writes the string, field and value tables and the footer.
+        """
+        file = self._file
+        strings_offset = file.tell()
+        self._copy(self._string_file)
+        strings = sorted(self._string_codes.items())
+        file.write(np.array(self._string_offsets, dtype = '<u8').tobytes())
+        file.write(np.array([code for _, code in strings], dtype = '<u4')
+                   .tobytes())
+        fields_offset = file.tell()
+        self._copy(self._field_file)
+        values_offset = file.tell()
+        self._copy(self._value_file)
+        file.write(_FOOTER.pack(self._written, strings_offset,
+                                self._string_offsets[-1], len(strings),
+                                fields_offset, self._field_count,
+                                values_offset, self._value_length, _MAGIC))
+        file.close()
+
+    def abort(self):
+        """Closes the file without writing the tables and footer.
+
+        The file is left incomplete, and :class:`TraceFile` will not
+        open it.
+        """
+        self._file.close()
+        for side_file in (self._string_file, self._field_file,
+                          self._value_file):
+            side_file.close()
+
+    def _copy(self, side_file):
+        """Copies a temporary file to the end of the file and closes it.
+        """
+        side_file.seek(0)
+        shutil.copyfileobj(side_file, self._file)
+        side_file.close()
+
+
+class _StringTable(object):
+    """The string table of a :class:`TraceFile`, decoded on demand.
+
+    Strings are decoded the first time they are read. :meth:`code`
+    finds a string by binary search of the sorted string codes.
+    """
+
+    def __init__(self, data, offsets, order):
+        self._data = data
+        self._offsets = offsets
+        self._order = order
+        self._decoded = {}
+
+    def __len__(self):
+        return len(self._order)
+
+    def __getitem__(self, code):
+        string = self._decoded.get(code)
+        if string is None:
+            if not 0 <= code < len(self._order):
+                raise IndexError("String code {} out of range."
+                                 "".format(code))
+            string = self._data[int(self._offsets[code]):
+                                int(self._offsets[code + 1])] \
+                         .tobytes().decode('utf-8')
+            self._decoded[code] = string
+        return string
+
+    def __iter__(self):
+        for code in range(len(self)):
+            yield self[code]
+
+    def code(self, string):
+        """Returns the code of a string, or -1 if it is not in the table.
+        """
+        order = self._order
+        first, last = 0, len(order)
+        while first < last:
+            middle = (first + last) // 2
+            code = int(order[middle])
+            found = self[code]
+            if found == string:
+                return code
+            if found < string:
+                first = middle + 1
+            else:
+                last = middle
+        return -1
+
+
+class TraceFile(object):
+    """Reads a binary trace file without loading it into memory.
+
+    The records, the string table, the custom field table and the value
+    table are memory mapped, so opening a file takes the same time
+    regardless of its size, and column views only read the pages they
+    touch. Strings and custom field values are decoded when they are
+    read. Records are in the order they were written, so the rep
+    column, and the time column within each rep, are sorted;
+    :meth:`span` uses binary search to find a rep or time range.
+
+    **Members**
+
+    ..  autosummary::
+
+        record_dtype
+        records
+        fields
+        strings
+        labels
+        __len__
+        __getitem__
+        __iter__
+        code
+        value
+        field
+        span
+        close
+    """
+
+    record_dtype = _RECORD_DTYPE
+
+    def __init__(self, file_name):
+        """Open a binary trace file.
+
+        *Arguments*
+            ``file_name`` (String)
+                The full name, including the path, of the file.
+
+        *Raises*
+            ``ValueError`` if the file is not a binary trace file.
+        """
+        with open(file_name, 'rb') as file:
+            magic, version, _ = _HEADER.unpack(file.read(_HEADER.size))
+            file.seek(-_FOOTER.size, 2)
+            (count, strings_offset, strings_length, string_count,
+             fields_offset, field_count, values_offset, values_length,
+             end_magic) = _FOOTER.unpack(file.read(_FOOTER.size))
+        if magic != _MAGIC or end_magic != _MAGIC or version != _VERSION:
+            raise ValueError("{} is not a despy binary trace file."
+                             "".format(file_name))
+        self._file_name = file_name
+        self._records = self._map(_RECORD_DTYPE, _HEADER.size, count)
+        offsets_offset = strings_offset + strings_length
+        order_offset = offsets_offset + 8 * (string_count + 1)
+        self._strings = _StringTable(
+                self._map('u1', strings_offset, strings_length),
+                self._map('<u8', offsets_offset, string_count + 1),
+                self._map('<u4', order_offset, string_count))
+        self._fields = self._map(_FIELD_DTYPE, fields_offset, field_count)
+        self._values = self._map('u1', values_offset, values_length)
+
+    def _map(self, dtype, offset, count):
+        """Memory maps a table, or returns an empty array.
+        """
+        if count == 0:
+            return np.empty(0, dtype = dtype)
+        return np.memmap(self._file_name, dtype = dtype, mode = 'r',
+                         offset = offset, shape = (count,))
+
+    @property
+    def records(self):
+        """The memory mapped records.
+
+        *Type:* numpy structured array of :attr:`record_dtype`,
+        read-only.
+        """
+        return self._records
+
+    @property
+    def fields(self):
+        """The memory mapped custom field table, in record number order.
+
+        *Type:* numpy structured array with ``number``, ``label``,
+        ``offset`` and ``length`` fields, read-only. Labels are string
+        codes. Pass the offset and length to :meth:`value` to decode a
+        value.
+        """
+        return self._fields
+
+    @property
+    def strings(self):
+        """The string table, indexed by string codes.
+
+        *Type:* Read-only sequence of strings. Each string is decoded
+        the first time it is read.
+        """
+        return self._strings
+
+    @property
+    def labels(self):
+        """Custom field labels that appear in the file.
+
+        *Type:* List of strings.
+        """
+        codes = np.unique(self._fields['label'])
+        return [self._strings[code] for code in codes]
+
+    def __len__(self):
+        """Built-in len() function returns the number of records.
+        """
+        return len(self._records)
+
+    def __getitem__(self, index):
+        """Returns a record, or a view of a standard column.
+
+        *Arguments*
+            ``index`` (Integer or String)
+                Position of a record, or a standard field label such
+                as ``'time'``.
+
+        *Returns:* :class:`despy.output.trace.TraceRecord`, or a
+        numpy array.
+        """
+        if isinstance(index, str):
+            return self._records[index]
+        row = self._records[index]
+        strings = self._strings
+        record = TraceRecord(int(row['rep']), int(row['time']),
+                             int(row['priority']),
+                             strings[row['record_type']],
+                             strings[row['name']])
+        number = int(row['number'])
+        record['number'] = number
+        numbers = self._fields['number']
+        first = np.searchsorted(numbers, number, 'left')
+        last = np.searchsorted(numbers, number, 'right')
+        for label, offset, length in self._fields[
+                ['label', 'offset', 'length']][first:last].tolist():
+            record[strings[label]] = self.value(offset, length)
+        return record
+
+    def __iter__(self):
+        """Iterates over the records, rebuilding each TraceRecord.
+        """
+        for index in range(len(self._records)):
+            yield self[index]
+
+    def code(self, string):
+        """Returns the code of a string in the string table.
+
+        *Returns:* Integer, or -1 if the string is not in the table.
+        """
+        return self._strings.code(string)
+
+    def value(self, offset, length):
+        """Decodes a custom field value from the value table.
+
+        *Arguments*
+            ``offset``, ``length`` (Integers)
+                From a row of :attr:`fields`.
+        """
+        return json.loads(self._values[offset:offset + length].tobytes()
+                          .decode('utf-8'))
+
+    def field(self, label):
+        """Returns the record numbers and values of a custom field.
+
+        *Arguments*
+            ``label`` (String)
+                The custom field label.
+
+        *Returns:* A tuple of a numpy array of record numbers and a
+        list of decoded values.
+        """
+        rows = self._fields[self._fields['label'] == self.code(label)]
+        return (np.array(rows['number']),
+                [self.value(offset, length) for offset, length
+                 in rows[['offset', 'length']].tolist()])
+
+    def span(self, rep = None, start = None, stop = None):
+        """Finds the records in a rep, a time range, or both.
+
+        *Arguments*
+            ``rep`` (Integer)
+                Optional. Only records from this rep.
+            ``start`` (Integer)
+                Optional. Only records at or after this time. Requires
+                ``rep`` if the file holds more than one rep.
+            ``stop`` (Integer)
+                Optional. Only records before this time.
+
+        *Returns:* A Python slice object, for indexing :attr:`records`
+        or a column.
+        """
+        first, last = 0, len(self._records)
+        if rep is not None:
+            reps = self._records['rep']
+            first = int(np.searchsorted(reps, rep, 'left'))
+            last = int(np.searchsorted(reps, rep, 'right'))
+        times = self._records['time'][first:last]
+        if stop is not None:
+            last = first + int(np.searchsorted(times, stop, 'left'))
+        if start is not None:
+            first = first + int(np.searchsorted(times, start, 'left'))
+        return slice(first, max(first, last))
+
+    def close(self):
+        """Releases the memory maps.
+        """
+        self._records = np.empty(0, dtype = _RECORD_DTYPE)
+        self._strings = _StringTable(np.empty(0, 'u1'), np.zeros(1, '<u8'),
+                                     np.empty(0, '<u4'))
+        self._fields = np.empty(0, dtype = _FIELD_DTYPE)
+        self._values = np.empty(0, 'u1')
@@ -12,6 +12,7 @@ despy.model.session
 
     Session
     Config
+    Verbosity
 """
 
 import enum
@@ -21,6 +22,25 @@ from despy.abstract.model import AbstractModel
 class Format(enum.Enum):
     text = 1
     html = 2        
+    
+class Verbosity(enum.Enum):
+    """Amount of console output. Each level includes the ones before it.
+    
+    *Members*
+        ``quiet``
+            No console output.
+        ``summary``
+            Headers for the initialize, run and finalize phases.
+        ``verbose``
+            Also a header for each rep's setup and teardown, and a
+            message for each component phase.
+        ``trace``
+            Also every trace record.
+    """
+    quiet = 0
+    summary = 1
+    verbose = 2
+    trace = 3
         
 class Config(object):
     """Generates the simulation's output reports and graphs.
@@ -32,7 +52,14 @@ class Config(object):
         trace_start
         trace_stop
         trace_max_length
+        trace_reps
+        trace_ring_length
+        trace_dump_file
+        verbosity
         console_trace
+        journey_log
+        trace_digest
+        trace_digest_window
         folder_basename
         reps
         initial_time
@@ -50,12 +77,17 @@ class Config(object):
         #Public Attributes
         self.folder_basename = None
         self.write_files = True
-        self.console_trace = False
+        self.verbosity = Verbosity.verbose
+        self.journey_log = False
+        self.trace_digest = False
+        self.trace_digest_window = None
         self.console_format = Format.text
         self._trace_start = 0
         self._trace_stop = 500
         self._trace_max_length = 1000
         self._trace_reps = (0, 1)
+        self._trace_ring_length = None
+        self.trace_dump_file = None
         self._reps = 1
         self.initial_time = 0
         self._seed = None
@@ -101,17 +133,151 @@ class Config(object):
         except:
             pass
 
+    @property
+    def trace_reps(self):
+        """Trace records reps from trace_reps[0] up to, but not including,
+        trace_reps[1]. Default = (0, 1).
+        
+        The second item may be None, in which case every rep from
+        trace_reps[0] on is recorded.
+        
+        *Type:* Tuple of two integers
+        """
+        return self._trace_reps
+    
+    @trace_reps.setter
+    def trace_reps(self, reps):
+        first, stop = reps
+        if first < 0 or (stop is not None and stop <= first):
+            raise ValueError("trace_reps must be a (first, stop) tuple "
+                             "with 0 <= first < stop. {} was passed "
+                             "instead.".format(reps))
+        self._trace_reps = (first, stop)
+        
+    @property
+    def trace_ring_length(self):
+        """If not None, the trace keeps only this many of the most recent
+        records. Default = None.
+        
+        In ring buffer mode trace_max_length is ignored, and the trace
+        is dumped to trace_dump_file if an event raises an exception.
+        The setting takes effect when the simulation is initialized.
+        
+        *Type:* Integer or None
+        """
+        return self._trace_ring_length
+    
+    @trace_ring_length.setter
+    def trace_ring_length(self, length):
+        if length is not None and length < 1:
+            raise ValueError("trace_ring_length must be a positive "
+                             "integer or None. {} was passed instead."
+                             "".format(length))
+        self._trace_ring_length = length
+        
+    @property
+    def trace_dump_file(self):
+        """Full name of the CSV file written when the trace is dumped.
+        Default = None.
+        
+        If None, dumped trace records are printed to the console. See
+        :meth:`despy.output.trace.Trace.dump`.
+        
+        *Type:* String or None
+        """
+        return self._trace_dump_file
+    
+    @trace_dump_file.setter
+    def trace_dump_file(self, file_name):
+        self._trace_dump_file = file_name
+
+    @property
+    def verbosity(self):
+        """Amount of console output. Default = Verbosity.verbose.
+        
+        Console output is buffered and written in batches; see
+        :mod:`despy.output.console`.
+        
+        *Type:* :class:`Verbosity`
+        """
+        return self._verbosity
+    
+    @verbosity.setter
+    def verbosity(self, verbosity):
+        if not isinstance(verbosity, Verbosity):
+            raise TypeError("Config.verbosity must be a despy.session."
+                            "Verbosity. {} was passed instead."
+                            "".format(verbosity))
+        self._verbosity = verbosity
+
     @property
     def console_trace(self):
-        """If True, send Trace data to console output. Default = True.
+        """If True, send Trace data to console output. Default = False.
+        
+        Same as verbosity == Verbosity.trace. Setting console_trace to
+        False lowers the verbosity from trace to verbose.
         
         *Type:* Boolean
         """
-        return self._console_trace
+        return self._verbosity is Verbosity.trace
 
     @console_trace.setter
     def console_trace(self, console_trace):
-        self._console_trace = console_trace
+        if console_trace:
+            self._verbosity = Verbosity.trace
+        elif self._verbosity is Verbosity.trace:
+            self._verbosity = Verbosity.verbose
+
+    @property
+    def journey_log(self):
+        """If True, record entity journeys. Default = False.
+        
+        Queues and resources record when each entity enters and leaves
+        them in :class:`despy.output.journey.JourneyLog`, available as
+        ``results.journey``. The setting takes effect when the
+        simulation is initialized.
+        
+        *Type:* Boolean
+        """
+        return self._journey_log
+    
+    @journey_log.setter
+    def journey_log(self, journey_log):
+        self._journey_log = journey_log
+        
+    @property
+    def trace_digest(self):
+        """If True, hash every event into a running digest. Default =
+        False.
+        
+        The digest is available as ``results.digest``, a
+        :class:`despy.output.digest.TraceDigest`, and its value is saved
+        as the ``trace_digest`` result when the simulation is
+        finalized. The setting takes effect when the simulation is
+        initialized.
+        
+        *Type:* Boolean
+        """
+        return self._trace_digest
+    
+    @trace_digest.setter
+    def trace_digest(self, trace_digest):
+        self._trace_digest = trace_digest
+        
+    @property
+    def trace_digest_window(self):
+        """Length of the time windows with their own digest. Default =
+        None.
+        
+        If None, the digest only keeps one hash per rep.
+        
+        *Type:* Integer or None
+        """
+        return self._trace_digest_window
+    
+    @trace_digest_window.setter
+    def trace_digest_window(self, window):
+        self._trace_digest_window = window
 
     @property
     def write_files(self):
@@ -42,12 +42,13 @@ from collections import namedtuple, OrderedDict
 
 import numpy as np
 
-from despy.session import Session
+from despy.session import Session, Verbosity
 from despy.output.results import Results
 # from despy.output.report import Datatype
 from despy.fel.event import Priority
 from despy.model.trigger import AbstractTrigger, TimeTrigger
 from despy.output.counter import Counter
+from despy.output.digest import TraceDigest
 import despy.output.console as console
 
 
@@ -58,16 +59,20 @@ class NoEventsRemainingError(Exception):
 
 
 class FutureEvent(namedtuple('FutureEventTuple',
-                         ['time', 'event', 'priority'])):
+                         ['time', 'seq', 'event', 'priority'])):
     """A event that has been placed on the future event list (FEL).
     
     Every item on the FEL must be an instance of FutureEvent. A
-    FutureEvent consists of the event, the scheduled time, and priority.
+    FutureEvent consists of the event, the scheduled time, a sequence
+    number, and priority.
     
     **Properties**
     
       * :attr:`time`: The time that the event is scheduled for
         execution. Type: a non-negative integer.
+      * :attr:`seq`: Sequence number that uniquely identifies the FEL
+        entry. Events with the same time and priority are executed in
+        the order in which they were scheduled.
       * :attr:`event`: An instance of
         :class:`despy.model.event.Event`.
       * :attr:`priority`: A priority constant from the 
@@ -126,6 +131,7 @@ class Simulation():
         finalize
         peek
         schedule
+        cancel
         run
         irun
         irunf
@@ -184,6 +190,7 @@ class Simulation():
         self._now = self._session.config.initial_time * 10
         self._pri = 0
         self._futureEventList = []
+        self._cancelled = set()
         self._counter = count()
         self.results = Results(self)
         self.results.stats["event_counter"] = Counter("event_counter")
@@ -322,9 +329,18 @@ class Simulation():
                 
         self._now = self._session.config.initial_time * 10
         self.results.set_value('initial_time', self.now)    
+        self.results.journey.active = self.config.journey_log
+        self.results.trace.dp_set_ring(self.config.trace_ring_length)
+        self.results.trace.dp_update_window(self.rep, self.now)
+        self.results.trace.dp_compile_filters(self.config.seed)
+        if self.config.trace_digest:
+            self.results.digest = TraceDigest(self.config.trace_digest_window)
+        else:
+            self.results.digest = None
         
         self.model.dp_initialize()
         console.display_message("All Components Initialized.")
+        console.flush()
 
     def _setup(self):
         """Resets simulation for the next rep and calls model setup() methods.
@@ -336,12 +352,15 @@ class Simulation():
         * Resets time to config.initial_time.
         * Calls every model component's setup() method.
         """
-        console.display_header("Setup Rep #{} ".format(self.rep))
+        console.display_header("Setup Rep #{} ", self.rep,
+                               level = Verbosity.verbose)
         if self.rep > 0:
             self._now = self._session.config.initial_time * 10
             self._pri = 0
             self._futureEventList = []
+            self._cancelled.clear()
             self._counter = count()
+        self.results.trace.dp_update_window(self.rep, self.now)
             
         self._session.model.dp_setup()        
         for _, stat in self.results.stats.items():
@@ -350,7 +369,8 @@ class Simulation():
     def _teardown(self):
         """Calls all Component.teardown() methods at the end of each rep.
         """
-        console.display_header("Teardown Rep #{} ".format(self.rep))
+        console.display_header("Teardown Rep #{} ", self.rep,
+                               level = Verbosity.verbose)
         self._session.model.dp_teardown(self.now)
         for _, stat in self.results.stats.items():
             stat.teardown()
@@ -368,8 +388,15 @@ class Simulation():
         self._session.model.dp_finalize()
         for _, stat in self.results.stats.items():
             stat.finalize()
+        self.results.trace.close_sinks()
+        if self.results.digest is not None:
+            self.results.digest.finalize()
+            self.results.set_value('trace_digest',
+                                   self.results.digest.hexdigest(),
+                                   overwrite = True)
         self.results.set_full_path()
         self._session.results = self.results
+        console.flush()
         return self.results
 
     def peek(self, prioritized=True):
@@ -388,6 +415,8 @@ class Simulation():
             An integer or float value if the FEL contains events.
             Infinity if there are no remaining events.
         """
+        if self._cancelled:
+            self._discard_cancelled()
         try:
             if prioritized:
                 return int((self._futureEventList[0].time - \
@@ -412,6 +441,9 @@ class Simulation():
                 an integer ranging from -5 to +5. The default is
                 ``Priority.STANDARD``, which is equivalent to
                 zero.
+                
+        *Returns:* The :class:`FutureEvent` that was placed on the FEL.
+        Pass it to :meth:`cancel` to withdraw the event.
         """
         # Ensures delay value is always an integer.
         delay = round(delay)
@@ -420,9 +452,31 @@ class Simulation():
         # and event object.
         scheduleTime = self._now + (delay * 10) + priority
         
-        heappush(self._futureEventList,
-                 FutureEvent(time=scheduleTime, event=event,
-                         priority=priority))
+        fel_item = FutureEvent(time=scheduleTime, seq=next(self._counter),
+                               event=event, priority=priority)
+        heappush(self._futureEventList, fel_item)
+        return fel_item
+    
+    def cancel(self, fel_item):
+        """Withdraw a scheduled event from the FEL.
+        
+        The entry is not searched for. Its sequence number is recorded
+        and the entry is discarded, without being executed or traced,
+        when it reaches the front of the FEL. Cancelling takes O(1)
+        time.
+        
+        *Arguments*
+            fel_item (:class:`FutureEvent`):
+                The value returned by :meth:`schedule`.
+        """
+        self._cancelled.add(fel_item.seq)
+        
+    def _discard_cancelled(self):
+        """Removes cancelled entries from the front of the FEL.
+        """
+        fel = self._futureEventList
+        while fel and fel[0].seq in self._cancelled:
+            self._cancelled.discard(heappop(fel).seq)
 
     def run(self, until=None, resume_on_next_rep = False):
         """ Execute events on the FEL until reaching a stop condition.
@@ -475,6 +529,7 @@ class Simulation():
             self._teardown()
         
         console.display_header("Simulation Completed")
+        console.flush()
         run_stop_time = datetime.datetime.today()
         self.results.set_value('run_stop_time', run_stop_time,
                                overwrite = True)
@@ -514,18 +569,34 @@ class Simulation():
         """
 
         # Get next event from FEL and advance current simulation time.
+        if self._cancelled:
+            self._discard_cancelled()
         try:
             fel_item = heappop(self._futureEventList)
         except IndexError:
             raise NoEventsRemainingError
         else:
-            self.now = int((fel_item.time - \
-                    fel_item.priority) / 10)
+            now = int((fel_item.time - fel_item.priority) / 10)
+            self.now = now
             self._pri = fel_item.priority
+            
+        # Only recompute the trace flag when the trace window changes.
+        trace = self.results.trace
+        if now >= trace._next_check:
+            trace.dp_update_window(self._rep, now)
 
         # Run event
         self._evt = fel_item.event
-        fel_item.event.dp_do_event()
+        try:
+            fel_item.event.dp_do_event()
+        except Exception as error:
+            console.flush()
+            # A ring buffer trace holds the events leading up to the error.
+            if trace.ring_length is not None:
+                trace.add_message("Exception", {'Event': fel_item.event,
+                                                'Error': repr(error)})
+                trace.dump()
+            raise
         self._evt = None
         self.results.stats["event_counter"].increment()
         return fel_item
@@ -582,7 +653,7 @@ class Simulation():
         self.run(until = until, resume_on_next_rep = resume_on_next_rep)
         return self.finalize()
 
-    def add_message(self, message, fields):
+    def add_message(self, message, fields, component = None):
         """Add a message to the trace report.
         
         *Arguments:*
@@ -591,11 +662,14 @@ class Simulation():
             `fields` (Python dictionary)
                 Custom fields that will be added to the TraceRecord.
                 Optional. Defaults to None.
+            `component` (:class:`despy.model.component.Component`)
+                The component that added the message, used by the
+                trace filters. Optional. Defaults to None.
         """
         if self.event is None:
-            self.results.trace.add_message(message, fields)
+            self.results.trace.add_message(message, fields, component)
         else:
-            self.event.add_message(message, fields)
+            self.event.add_message(message, fields, component)
 #     
 #     def get_data(self):
 #         """ Get a Python list with simulation parameters and results.
@@ -6,6 +6,7 @@ test_core_queue.py tests queue performance.
 
 import unittest
 
+import numpy as np
 import scipy.stats as stats
 
 import despy.dp as dp
@@ -36,7 +37,73 @@ class testQueue(unittest.TestCase):
         self.assertEqual(ent1.number, 1)
         ent2 = dp.model.Entity("Entity_2")
         self.assertEqual(ent2.number, 2)
- 
+
+    def test_light_entity(self):
+        print()
+        print("=====Light Entity Test=====")
+        session = dp.Session.new()
+        session.model = model = dp.model.Component("Light_Entity_Model")
+        sim = session.sim = dp.Simulation()
+        dp.model.LightEntity.set_counter()
+        ent1 = dp.model.LightEntity("Customer")
+        ent2 = dp.model.LightEntity("Customer", created = 7)
+        self.assertEqual((ent1.number, ent2.number), (1, 2))
+        self.assertEqual((ent1.created, ent2.created), (0, 7))
+        self.assertEqual(str(ent2), "Customer:2")
+        self.assertRaises(AttributeError, setattr, ent1, "color", "red")
+        self.assertIsNone(ent1.get("color"))
+        ent1["color"] = "red"
+        self.assertTrue("color" in ent1)
+        self.assertEqual(ent1["color"], "red")
+
+        #   Light entities flow through queues and resources.
+        res_q = dp.model.ResourceQueue("res_q")
+        model.add_component(res_q)
+        res_q.assign_resource(dp.model.Resource("server", 1,
+                                    dp.stats.get_empirical_pmf([3], [1])))
+        sim.initialize()
+        sim.schedule(dp.fel.LightEvent("Arrivals", callback = lambda:
+                    [res_q.request(ent) for ent in (ent1, ent2)]), 0)
+        results = sim.runf()
+        entities = [results.trace[i]['Entity']
+                    for i in range(results.trace.length)
+                    if results.trace[i]['name'] == "Finished_Service"]
+        self.assertListEqual(entities, [ent1, ent2])
+
+    def test_entity_table(self):
+        print()
+        print("=====Entity Table Test=====")
+        session = dp.Session.new()
+        session.model = model = dp.model.Component("Table_Model")
+        session.sim = dp.Simulation()
+        table = dp.model.EntityTable("customers",
+                                     [("arrival", "f8"), ("cls", "u2"),
+                                      ("departure", "f8")], capacity = 2)
+        model.add_component(table)
+        qu = dp.model.Queue("id_q")
+        model.add_component(qu)
+        qu.dp_setup()
+        self.assertRaises(ValueError, dp.model.EntityTable, "bad",
+                          [("rep", "u4")])
+
+        #   Queues carry plain integer ids from the table.
+        for time, cls in [(0, 1), (1, 2), (2, 1), (4, 2), (5, 1)]:
+            qu.add(table.new(arrival = time, cls = cls))
+        self.assertEqual(len(table), 5)
+        for time in (3, 6, 9, 12):
+            table.set(qu.remove(), "departure", time)
+        self.assertEqual(table.get(4, "cls"), 1)
+        self.assertListEqual(table["rep"].tolist(), [0] * 5)
+
+        by_class = table.group_by(table.durations("arrival", "departure"),
+                                  "cls")
+        self.assertListEqual(list(by_class), [1, 2])
+        self.assertListEqual(by_class[1][:2].tolist(), [3, 7])
+        self.assertTrue(np.isnan(by_class[1][2]))
+        self.assertListEqual(by_class[2].tolist(), [5, 8])
+        table.finalize()
+        self.assertEqual(len(table["cls"]), 5)
+
     def test_queue(self):
         print()
         print("=====Test Queue=====")
@@ -69,7 +136,109 @@ class testQueue(unittest.TestCase):
         entity = qu.remove()
         self.assertEqual(entity.name, "Customer_2")
         self.assertEqual(qu.length, 0)
- 
+
+    def test_queue_disciplines(self):
+        print()
+        print("=====Test Queue Disciplines=====")
+        session = dp.Session.new()
+        session.model = model = dp.model.Component("Discipline_test")
+        session.sim = dp.Simulation()
+
+        def get_queue(name, discipline):
+            qu = dp.model.Queue(name, discipline = discipline)
+            model.add_component(qu)
+            qu.dp_setup()
+            return qu
+
+        def drain(qu):
+            return [qu.remove() for _ in range(qu.length)]
+
+        lifo_q = get_queue("lifo_q", dp.model.LifoDiscipline())
+        for item in "abc":
+            lifo_q.add(item)
+        self.assertListEqual(drain(lifo_q), ["c", "b", "a"])
+
+        #   Equal priorities leave in arrival order.
+        priority_q = get_queue("priority_q", dp.model.PriorityDiscipline())
+        for item, priority in [("a", 3), ("b", 1), ("c", 3), ("d", 2)]:
+            priority_q.add(item, priority)
+        self.assertListEqual(drain(priority_q), ["b", "d", "a", "c"])
+
+        spt_q = get_queue("spt_q", dp.model.SptDiscipline(key = len))
+        for item in ["ccc", "a", "bb"]:
+            spt_q.add(item)
+        spt_q.add("dddd", key = 0)
+        self.assertListEqual(drain(spt_q), ["dddd", "a", "bb", "ccc"])
+        self.assertRaises(ValueError,
+                          get_queue("spt_q2", dp.model.SptDiscipline()).add,
+                          "a")
+
+        random_q = get_queue("random_q", dp.model.RandomDiscipline())
+        for item in range(100):
+            random_q.add(item)
+        self.assertListEqual(sorted(drain(random_q)), list(range(100)))
+        self.assertRaises(TypeError, dp.model.Queue, "bad_q",
+                          discipline = "FIFO")
+
+    def test_balking_and_reneging(self):
+        print()
+        print("=====Test Balking and Reneging=====")
+        session = dp.Session.new()
+        session.model = model = dp.model.Component("Renege_test")
+        sim = session.sim = dp.Simulation()
+        qu = dp.model.Queue("renege_q", max_length = 3)
+        model.add_component(qu)
+        reneged = []
+        qu.append_renege_callback(lambda queue, item: reneged.append(item))
+        served = []
+
+        def arrive(event):
+            self.assertTrue(qu.add("A", patience = 5))
+            self.assertTrue(qu.add("B", patience = 3))
+            self.assertTrue(qu.add("C", patience = 10))
+            self.assertFalse(qu.add("D"))
+
+        def serve(event):
+            served.append(qu.remove())
+
+        arrival = dp.fel.Event("Arrival")
+        arrival.append_callback(arrive)
+        service = dp.fel.Event("Service")
+        service.append_callback(serve)
+        sim.initialize()
+        sim.schedule(arrival, 0)
+        sim.schedule(service, 4)
+        results = sim.runf()
+
+        self.assertListEqual(served, ["A"])
+        self.assertListEqual(reneged, ["B", "C"])
+        self.assertEqual(qu.length, 0)
+        self.assertEqual(qu.results.stats['Balked'].total_counts, 1)
+        self.assertEqual(qu.results.stats['Reneged'].total_counts, 2)
+        #   A left before its deadline. Rather than being rescheduled,
+        #   the event still fires at time 5, finds no expired deadlines,
+        #   and moves on to C's deadline.
+        renege_times = [results.trace[i]['time']
+                        for i in range(results.trace.length)
+                        if results.trace[i]['name'] == "Renege_renege_q"]
+        self.assertListEqual(renege_times, [3, 5, 10])
+
+        #   An earlier deadline moves the scheduled event forward.
+        session = dp.Session.new()
+        session.model = model = dp.model.Component("Earlier_Renege_Test")
+        sim = session.sim = dp.Simulation()
+        qu = dp.model.Queue("renege_q")
+        model.add_component(qu)
+        sim.initialize()
+        qu.add("A", patience = 5)
+        self.assertEqual(sim.peek(), 5)
+        qu.add("B", patience = 2)
+        self.assertEqual(sim.peek(), 2)
+        qu.add("C", patience = 8)
+        self.assertEqual(sim.peek(), 2)
+        results = sim.runf()
+        self.assertEqual(qu.results.stats['Reneged'].total_counts, 3)
+
     def test_queue_in_simulation(self):
         print()
         print("=====Test Queue In Simulation======")
@@ -4,6 +4,15 @@ test_despy.py tests the methods in the despy.py module.
 ===============================================================================
 """
 
+import contextlib
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+import time
+import tracemalloc
 import unittest
 
 import scipy.stats as stats
@@ -223,7 +232,167 @@ class testDespyb(unittest.TestCase):
         process.start()
         model.sim.initialize()
         model.sim.runf(20)
-          
+
+    def test_process_plain_delays(self):
+        session = dp.Session.new()
+        session.model = model = dp.model.Component("Delay_Model")
+        sim = session.sim = dp.Simulation()
+        times = []
+
+        def generator(self):
+            while True:
+                times.append(self.sim.now)
+                yield 3
+                times.append(self.sim.now)
+                yield 2, dp.LATE
+
+        process = dp.model.Process("Delay_Process", generator)
+        model.add_component(process)
+        process.start()
+        sim.initialize()
+        resume_event = process.resume_event
+        results = sim.runf(12)
+        self.assertListEqual(times, [0, 3, 5, 8, 10])
+        #   Every step after the start reuses the same resumption event.
+        self.assertIs(process.resume_event, resume_event)
+        names = [results.trace[i]['name']
+                 for i in range(results.trace.length)]
+        self.assertListEqual(names, ["Start_Delay_Process"] +
+                             ["Delay_Process"] * 4)
+
+        #   Numpy scalars, such as values drawn from a distribution, are
+        #   accepted as plain delays.
+        session = dp.Session.new()
+        session.model = model = dp.model.Component("Random_Delay_Model")
+        sim = session.sim = dp.Simulation()
+        dist = dp.stats.get_empirical_pmf([3], [1])
+        times = []
+
+        def random_generator(self):
+            while True:
+                times.append(self.sim.now)
+                yield dist.rvs()
+
+        process = dp.model.Process("Random_Delay_Process", random_generator)
+        model.add_component(process)
+        process.start()
+        sim.initialize()
+        sim.runf(10)
+        self.assertListEqual(times, [0, 3, 6, 9])
+
+        def bad_generator(self):
+            yield "three"
+
+        bad_process = dp.model.Process("Bad_Process", bad_generator)
+        model.add_component(bad_process)
+        self.assertRaises(TypeError, bad_process.call)
+
+    def test_pooled_events(self):
+        session = dp.Session.new()
+        session.model = model = dp.model.Component("Pool_Model")
+        sim = session.sim = dp.Simulation()
+        calls = []
+        pool = dp.fel.EventPool()
+        for time in range(3):
+            sim.schedule(pool.acquire("Pooled", calls.append, (time,)),
+                         time)
+        self.assertEqual(pool.created, 3)
+        sim.initialize()
+        results = sim.runf()
+        self.assertListEqual(calls, [0, 1, 2])
+        self.assertEqual(pool.free, 3)
+        self.assertEqual(results.trace[2]['name'], "Pooled")
+        event = pool.acquire("Reused")
+        self.assertEqual(pool.created, 3)
+        self.assertEqual(event.name, "Reused")
+
+        #   Processes recycle their timeout events.
+        session = dp.Session.new()
+        session.model = model = dp.model.Component("Timeout_Model")
+        sim = session.sim = dp.Simulation()
+
+        def generator(self):
+            while True:
+                yield self.schedule_timeout("Timeout", 1)
+
+        process = dp.model.Process("Timeout_Process", generator)
+        model.add_component(process)
+        process.start()
+        sim.initialize()
+        sim.runf(50)
+        self.assertEqual(process._event_pool.created, 1)
+
+    def test_process_waiting(self):
+        session = dp.Session.new()
+        session.model = model = dp.model.Component("Wait_Model")
+        sim = session.sim = dp.Simulation()
+        signal = dp.model.Signal("Go")
+        qu = dp.model.Queue("wait_q")
+        model.add_component(qu)
+        res_q = dp.model.ResourceQueue("res_q")
+        model.add_component(res_q)
+        res_q.assign_resource(dp.model.Resource("server", 1,
+                                    dp.stats.get_empirical_pmf([4], [1])))
+        log = []
+
+        def consumer(self):
+            value = yield signal
+            log.append((self.sim.now, "signal", value))
+            item = yield qu
+            log.append((self.sim.now, "item", item))
+            entity = dp.model.Entity("Customer")
+            served = yield res_q.serve(entity)
+            log.append((self.sim.now, "served", served is entity))
+
+        def producer(self):
+            yield 5
+            signal.fire("go")
+            yield 3
+            qu.add("widget")
+
+        consumer_process = dp.model.Process("Consumer", consumer)
+        producer_process = dp.model.Process("Producer", producer)
+        model.add_component(consumer_process)
+        model.add_component(producer_process)
+        consumer_process.start()
+        producer_process.start()
+        sim.initialize()
+        results = sim.runf()
+        self.assertListEqual(log, [(5, "signal", "go"), (8, "item", "widget"),
+                                   (12, "served", True)])
+        self.assertEqual(signal.waiting, 0)
+        #   The consumer is resumed once per condition and never polls.
+        names = [results.trace[i]['name']
+                 for i in range(results.trace.length)]
+        self.assertEqual(names.count("Consumer"), 3)
+
+        #   Processes resume with None if their entity balks or reneges.
+        session = dp.Session.new()
+        session.model = model = dp.model.Component("Balk_Model")
+        sim = session.sim = dp.Simulation()
+        res_q = dp.model.ResourceQueue("res_q")
+        res_q.max_length = 1
+        model.add_component(res_q)
+        res_q.assign_resource(dp.model.Resource("server", 1,
+                                    dp.stats.get_empirical_pmf([10], [1])))
+        log = []
+
+        def customer(self):
+            entity = dp.model.Entity("Customer")
+            served = yield res_q.serve(entity, patience = 3)
+            log.append((self.name, self.sim.now, served is entity))
+
+        for name in ("First", "Second", "Third"):
+            process = dp.model.Process(name, customer)
+            model.add_component(process)
+            process.start()
+        sim.initialize()
+        sim.runf()
+        self.assertListEqual(log, [("Third", 0, False),
+                                   ("Second", 3, False),
+                                   ("First", 10, True)])
+        self.assertEqual(len(res_q._service_waiters), 0)
+
     def test_simultaneous_events(self):
         #Test simultaneous, different events.
         config1 = get_config()
@@ -323,6 +492,500 @@ class testDespyb(unittest.TestCase):
         self.assertEqual(results.trace[0]['time'], 365)
         self.assertEqual(results.trace[1999]['time'], 2364)
 
+    def test_trace_columns(self):
+        print()
+        print("=====Trace Columns Test=====")
+        session = dp.Session.new()
+        session.model = dp.model.Component("Trace_Columns")
+        session.sim = sim = dp.Simulation()
+        event = dp.fel.Event("Column_Event")
+
+        def event_callback(self):
+            self.trace_fields["Count"] = self.sim.now
+            self.sim.add_message("Column_Message", {"Half": self.sim.now / 2})
+            if self.sim.now < 30:
+                self.sim.schedule(event, 10)
+
+        event.append_callback(event_callback)
+        sim.schedule(event, 0)
+        results = sim.irunf()
+        trace = results.trace
+
+        self.assertEqual(len(trace), 8)
+        self.assertListEqual(trace['time'].tolist(),
+                             [0, 0, 10, 10, 20, 20, 30, 30])
+        is_event = trace['name'] == trace.code("Column_Event")
+        self.assertListEqual(trace['time'][is_event].tolist(),
+                             [0, 10, 20, 30])
+        self.assertEqual(trace.code("Missing"), -1)
+        rows, values = trace.field("Half")
+        self.assertListEqual(rows.tolist(), [1, 3, 5, 7])
+        self.assertListEqual(values, [0, 5, 10, 15])
+
+        #   Records are rebuilt on demand.
+        record = trace[-1]
+        self.assertIsInstance(record, dp.output.TraceRecord)
+        self.assertEqual((record['number'], record['name'], record['Half']),
+                         (7, "Column_Message", 15))
+        self.assertNotIn("Count", record)
+        self.assertEqual(trace[2]['Count'], 10)
+        self.assertEqual(len(list(trace)), 8)
+        self.assertRaises(IndexError, trace.__getitem__, 8)
+
+        #   Each record keeps the order of its own custom fields.
+        session = dp.Session.new()
+        session.model = dp.model.Component("Field_Order")
+        session.sim = sim = dp.Simulation()
+        order_event = dp.fel.LightEvent("Order_Event", lambda: [
+                        sim.add_message("First", {"A": 1, "B": 2}),
+                        sim.add_message("Second", {"B": 3, "A": 4})])
+        sim.schedule(order_event, 0)
+        trace = sim.irunf().trace
+        self.assertListEqual(trace[1].custom_labels, ["A", "B"])
+        self.assertListEqual(trace[2].custom_labels, ["B", "A"])
+        self.assertEqual(trace[2]['A'], 4)
+
+    def test_trace_sink(self):
+        print()
+        print("=====Trace Sink Test=====")
+        session = dp.Session.new()
+        session.model = dp.model.Component("Trace_Sink")
+        session.sim = sim = dp.Simulation()
+        session.config.trace_max_length = 5
+        event = dp.fel.Event("Sink_Event")
+
+        def event_callback(self):
+            self.sim.add_message("Sink_Message", {"Count": self.sim.now})
+            if self.sim.now < 90:
+                self.sim.schedule(event, 10)
+
+        event.append_callback(event_callback)
+        sim.schedule(event, 0)
+        with tempfile.TemporaryDirectory() as folder:
+            csv_name = os.path.join(folder, "trace.csv.gz")
+            json_name = os.path.join(folder, "trace.ndjson")
+            csv_sink = dp.output.TraceSink(csv_name, batch_size = 3)
+            json_sink = dp.output.TraceSink(json_name,
+                                            dp.output.SinkFormat.ndjson)
+            sim.results.trace.add_sink(csv_sink)
+            sim.results.trace.add_sink(json_sink)
+            results = sim.irunf()
+
+            #   Sinks get the full trace; memory keeps max_length records.
+            self.assertEqual(len(results.trace), 5)
+            self.assertListEqual(results.trace.sinks, [])
+            self.assertEqual(csv_sink.written, 20)
+            with gzip.open(csv_name, 'rt', newline = '') as file:
+                rows = list(csv.reader(file))
+            self.assertEqual(rows[0][0], "Record #")
+            self.assertListEqual(rows[-1], ["19", "0", "90", "0", "Msg",
+                                            "Sink_Message", "Count:", "90"])
+            with open(json_name) as file:
+                lines = [json.loads(line) for line in file]
+            self.assertEqual(len(lines), 20)
+            self.assertEqual(lines[18]['name'], "Sink_Event")
+            self.assertEqual(lines[19]['Count'], 90)
+        self.assertRaises(TypeError, dp.output.TraceSink, "trace.csv",
+                          "csv")
+
+        #   A sink whose writer failed still stops its thread on close.
+        with tempfile.TemporaryDirectory() as folder:
+            sink = dp.output.TraceSink(os.path.join(folder, "missing",
+                                                    "trace.csv"),
+                                       batch_size = 1)
+            sink.write((0, 0, 0, 0, "Msg", "Failed", None))
+            for _ in range(500):
+                if sink._error is not None:
+                    break
+                time.sleep(0.01)
+            self.assertRaises(FileNotFoundError, sink.close)
+            self.assertFalse(sink._thread.is_alive())
+            sink.close()
+
+    def test_trace_ring_buffer(self):
+        print()
+        print("=====Trace Ring Buffer Test=====")
+        session = dp.Session.new()
+        session.model = dp.model.Component("Trace_Ring")
+        session.sim = sim = dp.Simulation()
+        session.config.trace_ring_length = 4
+        event = dp.fel.Event("Ring_Event")
+
+        def event_callback(self):
+            self.trace_fields["Count"] = self.sim.now
+            if self.sim.now == 12:
+                raise RuntimeError("Failure")
+            self.sim.schedule(event, 1)
+
+        event.append_callback(event_callback)
+        sim.schedule(event, 0)
+        sim.add_trigger("dump", dp.model.TraceDumpTrigger(
+                                lambda: sim.now == 5, stop = False))
+        with tempfile.TemporaryDirectory() as folder:
+            session.config.trace_dump_file = os.path.join(folder, "dump.csv")
+            sim.initialize()
+            self.assertRaises(RuntimeError, sim.run)
+            with open(session.config.trace_dump_file, newline = '') as file:
+                rows = list(csv.reader(file))
+        trace = sim.results.trace
+        self.assertEqual(sim.triggers["dump"].dumps, 1)
+
+        #   Only the last four records are kept, oldest first.
+        self.assertEqual(len(trace), 4)
+        self.assertListEqual(trace['time'].tolist(), [9, 10, 11, 12])
+        self.assertListEqual([record['number'] for record in trace],
+                             [9, 10, 11, 12])
+        self.assertEqual(trace[0]['Count'], 9)
+        self.assertListEqual(trace.field("Count")[0].tolist(), [9, 10, 11])
+        self.assertListEqual([row[5] for row in rows[1:]],
+                             ["Ring_Event"] * 3 + ["Exception"])
+        self.assertEqual(rows[-1][-1], "RuntimeError('Failure')")
+
+    def test_trace_filters(self):
+        print()
+        print("=====Trace Filter Test=====")
+        session = dp.Session.new()
+        session.model = model = dp.model.Component("Trace_Filter")
+        session.sim = sim = dp.Simulation()
+        qu = dp.model.Queue("filter_q")
+        model.add_component(qu)
+        built = []
+
+        class CountedEvent(dp.fel.Event):
+            def update_trace_record(self, trace_record):
+                built.append(self.name)
+                return trace_record
+
+        def arrive(event):
+            qu.add(event.name)
+            if event.sim.now < 9:
+                event.sim.schedule(event, 1)
+
+        for name in ("Arrival", "Noise"):
+            event = CountedEvent(name)
+            event.append_callback(arrive)
+            sim.schedule(event, 0)
+        trace = sim.results.trace
+        trace.add_filter(dp.output.TraceFilter(exclude = True,
+                                               name = "Noi*"))
+        trace.add_filter(dp.output.TraceFilter(component = "filter_q",
+                                               every = 4))
+        trace.add_filter(dp.output.TraceFilter(event_class = CountedEvent))
+        self.assertRaises(TypeError, trace.add_filter, "Noise")
+        self.assertRaises(ValueError, dp.output.TraceFilter, every = 0)
+        results = sim.irunf()
+
+        #   Excluded events never build their records.
+        self.assertListEqual(built, ["Arrival"] * 10)
+        names = [record['name'] for record in results.trace]
+        self.assertEqual(names.count("Arrival"), 10)
+        self.assertEqual(names.count("Entering Queue"), 5)
+        self.assertNotIn("Noise", names)
+
+        #   Pooled resource and process events match their component.
+        session = dp.Session.new()
+        session.model = model = dp.model.Component("Component_Filter")
+        session.sim = sim = dp.Simulation()
+        res_q = dp.model.ResourceQueue("res_q")
+        model.add_component(res_q)
+        res_q.assign_resource(dp.model.Resource("server", 1,
+                                    dp.stats.get_empirical_pmf([4], [1])))
+
+        def customers(self):
+            for _ in range(2):
+                yield self.schedule_timeout("Arrival", 1)
+                res_q.request(dp.model.Entity("Customer"))
+
+        process = dp.model.Process("arrivals", customers)
+        model.add_component(process)
+        process.start()
+        trace = sim.results.trace
+        for component in ("server", "arrivals"):
+            trace.add_filter(dp.output.TraceFilter(component = component))
+        results = sim.irunf()
+        names = [record['name'] for record in results.trace]
+        self.assertEqual(names.count("Starting Service"), 2)
+        self.assertEqual(names.count("Finished_Service"), 2)
+        self.assertEqual(names.count("Arrival"), 2)
+        self.assertNotIn("Entering Queue", names)
+
+    def test_binary_trace_file(self):
+        print()
+        print("=====Binary Trace File Test=====")
+        session = dp.Session.new()
+        session.model = dp.model.Component("Binary_Trace")
+        session.sim = sim = dp.Simulation()
+        session.config.reps = 2
+        session.config.trace_reps = (0, None)
+        event = dp.fel.Event("Binary_Event")
+
+        def event_callback(self):
+            self.sim.add_message("Binary_Message",
+                                 {"Count": self.sim.now, "Tag": "é"})
+            if self.sim.now < 40:
+                self.sim.schedule(event, 10)
+
+        event.append_callback(event_callback)
+        session.model.setup = lambda cpt: cpt.sim.schedule(event, 0)
+        with tempfile.TemporaryDirectory() as folder:
+            sink_name = os.path.join(folder, "sink.dpt")
+            sink = dp.output.TraceSink(sink_name, dp.output.SinkFormat.binary,
+                                       batch_size = 7)
+            sim.results.trace.add_sink(sink)
+            results = sim.irunf()
+            file_name = results.trace.write_binary(
+                                        os.path.join(folder, "trace.dpt"))
+
+            for name in (file_name, sink_name):
+                trace_file = dp.output.TraceFile(name)
+                self.assertEqual(len(trace_file), 20)
+                self.assertListEqual(trace_file['time'][:4].tolist(),
+                                     [0, 0, 10, 10])
+                record = trace_file[3]
+                self.assertEqual((record['number'], record['name'],
+                                  record['Count'], record['Tag']),
+                                 (3, "Binary_Message", 10, "é"))
+                self.assertNotIn("Count", trace_file[2])
+
+                #   Binary search by rep and time.
+                span = trace_file.span(rep = 1, start = 10, stop = 30)
+                self.assertEqual((span.start, span.stop), (12, 16))
+                self.assertTrue((trace_file['rep'][span] == 1).all())
+                numbers, values = trace_file.field("Count")
+                self.assertListEqual(values[:3], [0, 10, 20])
+                self.assertListEqual(numbers[:3].tolist(), [1, 3, 5])
+
+                #   Values are stored inline; only record types, names
+                #   and labels are in the string table.
+                self.assertListEqual(sorted(trace_file.strings),
+                                     ["Binary_Event", "Binary_Message",
+                                      "Count", "Event", "Msg", "Tag"])
+                self.assertEqual(trace_file.strings[trace_file.code("Tag")],
+                                 "Tag")
+                self.assertEqual(trace_file.code("é"), -1)
+                trace_file.close()
+            self.assertRaises(ValueError, dp.output.TraceSink,
+                              sink_name + ".gz", dp.output.SinkFormat.binary)
+            with open(sink_name, 'r+b') as file:
+                file.write(b"NOTTRACE")
+            self.assertRaises(ValueError, dp.output.TraceFile, sink_name)
+
+    def test_trace_digest(self):
+        print()
+        print("=====Trace Digest Test=====")
+
+        def run(changed_time = None):
+            session = dp.Session.new()
+            session.model = dp.model.Component("Digest_Model")
+            session.sim = sim = dp.Simulation()
+            session.config.reps = 2
+            session.config.trace_stop = 5
+            session.config.trace_digest = True
+            session.config.trace_digest_window = 10
+            event = dp.fel.Event("Digest_Event")
+
+            def event_callback(self):
+                self.trace_fields["Value"] = self.sim.now
+                if (self.sim.rep, self.sim.now) == (1, changed_time):
+                    self.trace_fields["Value"] = -1
+                if self.sim.now < 40:
+                    self.sim.schedule(event, 5)
+
+            event.append_callback(event_callback)
+            session.model.setup = lambda cpt: cpt.sim.schedule(event, 0)
+            return sim.irunf()
+
+        first, second, changed = run(), run(), run(25)
+        digest = first.digest
+        self.assertEqual(digest.count, 18)
+        self.assertEqual(len(first.trace), 1)
+        self.assertEqual(first.trace_digest, ("Trace Digest",
+                                              digest.hexdigest()))
+        self.assertEqual(digest.hexdigest(), second.digest.hexdigest())
+        self.assertIsNone(digest.first_difference(second.digest))
+        self.assertListEqual(list(digest.rep_digests), [0, 1])
+        self.assertEqual(len(digest.window_digests), 10)
+
+        #   The change is found in rep 1, in the window from 20 to 30.
+        self.assertNotEqual(digest.hexdigest(), changed.digest.hexdigest())
+        self.assertEqual(digest.rep_digests[0],
+                         changed.digest.rep_digests[0])
+        self.assertEqual(digest.first_difference(changed.digest), (1, 20))
+        self.assertRaises(ValueError, dp.output.TraceDigest, 0)
+
+    def test_trace_shards(self):
+        print()
+        print("=====Trace Shard Merge Test=====")
+        session = dp.Session.new()
+        session.model = dp.model.Component("Shard_Model")
+        session.sim = sim = dp.Simulation()
+        session.config.reps = 3
+        session.config.trace_reps = (0, None)
+        event = dp.fel.Event("Shard_Event")
+
+        def event_callback(self):
+            self.sim.add_message("Shard_Message", {"Rep": self.sim.rep})
+            if self.sim.now < 20:
+                self.sim.schedule(event, 10)
+
+        event.append_callback(event_callback)
+        session.model.setup = lambda cpt: cpt.sim.schedule(event, 0)
+        with tempfile.TemporaryDirectory() as folder:
+            sink = dp.output.ShardedTraceSink(
+                        os.path.join(folder, "rep_{rep}.dpt"), batch_size = 2)
+            sim.results.trace.add_sink(sink)
+            sim.irunf()
+            self.assertEqual(len(sink.file_names), 3)
+            self.assertEqual(sink.written, 18)
+
+            #   Shards are merged in rep order, whatever order they are
+            #   listed in, and in small chunks.
+            merged = os.path.join(folder, "merged.dpt")
+            count = dp.output.merge_traces(sink.file_names[::-1], merged,
+                                           chunk_size = 4)
+            self.assertEqual(count, 18)
+            trace_file = dp.output.TraceFile(merged)
+            self.assertListEqual(trace_file['rep'].tolist(),
+                                 [0] * 6 + [1] * 6 + [2] * 6)
+            self.assertListEqual(trace_file['number'].tolist(),
+                                 list(range(18)))
+            self.assertEqual(trace_file[7]['Rep'], 1)
+            trace_file.close()
+
+            #   Worker shards that overlap in time are interleaved.
+            shards = []
+            for shard, times in enumerate([(0, 10, 20), (5, 10, 15)]):
+                name = os.path.join(folder, "worker_{}.dpt".format(shard))
+                writer = dp.output.TraceFileWriter(name)
+                writer.write_batch([(i, 0, time, 0, "Event",
+                                     "Worker_{}".format(shard), None)
+                                    for i, time in enumerate(times)])
+                writer.close()
+                shards.append(name)
+            merged = os.path.join(folder, "workers.ndjson")
+            dp.output.merge_traces(shards, merged,
+                                   dp.output.SinkFormat.ndjson)
+            with open(merged) as file:
+                lines = [json.loads(line) for line in file]
+            self.assertListEqual([(line['time'], line['name'][-1])
+                                  for line in lines],
+                                 [(0, "0"), (5, "1"), (10, "0"), (10, "1"),
+                                  (15, "1"), (20, "0")])
+
+            #   Merging does not hold the records or their values.
+            shards = []
+            for shard in range(2):
+                name = os.path.join(folder, "large_{}.dpt".format(shard))
+                writer = dp.output.TraceFileWriter(name)
+                for first in range(0, 10000, 1000):
+                    writer.write_batch([(i, shard, i, 0, "Msg", "Large",
+                                         {"Entity": "{:0>200}".format(i)})
+                                        for i in range(first, first + 1000)])
+                writer.close()
+                shards.append(name)
+            tracemalloc.start()
+            count = dp.output.merge_traces(shards, os.path.join(folder,
+                                           "large.dpt"), chunk_size = 256)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            self.assertEqual(count, 20000)
+            self.assertLess(peak, 2 * 10 ** 6)
+
+    def test_trace_window(self):
+        print()
+        print("=====Trace Window Test=====")
+        session = dp.Session.new()
+        session.model = dp.model.Component("Trace_Window")
+        session.sim = sim = dp.Simulation()
+        session.config.reps = 3
+        session.config.trace_start = 20
+        session.config.trace_stop = 40
+        self.assertRaises(ValueError, setattr, session.config,
+                          "trace_reps", (2, 1))
+        session.config.trace_reps = (1, None)
+        flags = []
+        event = dp.fel.Event("Window_Event")
+
+        def event_callback(self):
+            flags.append(self.sim.results.trace.active)
+            if self.sim.now < 50:
+                self.sim.schedule(event, 10)
+
+        event.append_callback(event_callback)
+        session.model.setup = lambda cpt: cpt.sim.schedule(event, 0)
+        results = sim.irunf()
+
+        #   Rep 0 is outside the rep window; the flag only changes at
+        #   the trace start and stop times.
+        self.assertListEqual(flags, [False] * 6 +
+                             [False, False, True, True, False, False] * 2)
+        self.assertListEqual([results.trace[i]['rep']
+                              for i in range(len(results.trace))],
+                             [1, 1, 2, 2])
+
+    def test_console_verbosity(self):
+        print()
+        print("=====Console Verbosity Test=====")
+        config = dp.Config()
+        self.assertEqual(config.verbosity, dp.Verbosity.verbose)
+        self.assertRaises(TypeError, setattr, config, "verbosity", 3)
+        config.console_trace = True
+        self.assertEqual(config.verbosity, dp.Verbosity.trace)
+        config.console_trace = False
+        self.assertEqual(config.verbosity, dp.Verbosity.verbose)
+
+        def run(verbosity):
+            session = dp.Session.new()
+            session.model = dp.model.Component("Verbosity_Model")
+            session.sim = sim = dp.Simulation()
+            session.config.reps = 2
+            session.config.verbosity = verbosity
+            event = dp.fel.Event("Verbosity_Event")
+            session.model.setup = lambda cpt: cpt.sim.schedule(event, 5)
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                sim.irunf()
+                buffered = len(dp.output.console.buffer._lines)
+            return output.getvalue(), buffered
+
+        #   Quiet runs write nothing; summary runs skip the per-rep
+        #   headers; trace runs also write the trace records, which by
+        #   default are only kept for rep 0.
+        output, buffered = run(dp.Verbosity.quiet)
+        self.assertEqual(output, "")
+        output, buffered = run(dp.Verbosity.summary)
+        self.assertIn("Simulation Completed", output)
+        self.assertNotIn("Setup Rep", output)
+        self.assertNotIn("Verbosity_Event", output)
+        output, buffered = run(dp.Verbosity.trace)
+        self.assertIn("Setup Rep #1", output)
+        self.assertEqual(output.count("Verbosity_Event"), 1)
+        self.assertEqual(buffered, 0)
+
+        #   A crash dump follows the earlier console output, and quiet
+        #   runs do not write it.
+        def crash(verbosity):
+            session = dp.Session.new()
+            session.model = dp.model.Component("Crash_Model")
+            session.sim = sim = dp.Simulation()
+            session.config.trace_ring_length = 4
+            session.config.verbosity = verbosity
+
+            def fail():
+                raise RuntimeError("Failure")
+
+            sim.schedule(dp.fel.LightEvent("Crash_Event", fail), 1)
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                sim.initialize()
+                self.assertRaises(RuntimeError, sim.run)
+            return output.getvalue()
+
+        output = crash(dp.Verbosity.verbose)
+        self.assertLess(output.index("Running"), output.index("Crash_Event"))
+        self.assertIn("RuntimeError('Failure')", output)
+        self.assertEqual(crash(dp.Verbosity.quiet), "")
+
 if __name__ == '__main__':
     unittest.main()
 
@@ -58,6 +58,50 @@ class testQueue(unittest.TestCase):
         session.sim = sim = dp.Simulation()
         session.config.folder_basename = "C:/Projects/despy_output/queue_sim"
         sim.irunf(100).write_files()
+
+    def test_phase_plan(self):
+        print()
+        print("=====Testing Phase Plan=====")
+        session = dp.Session.new()
+        session.model = model = SubClassModel("Plan_Model")
+        session.sim = dp.Simulation()
+        child = dp.model.Component("child")
+        model.add_component(child)
+        setups = []
+        child.setup = lambda cpt: setups.append(cpt.name)
+        self.assertIs(child.model, model)
+        self.assertIsNone(child._results)
+        self.assertIsNotNone(dp.model.Queue("stat_q")._results)
+
+        #   Base class no-op phases are left out of the plan.
+        plan = model.dp_compile_phases()
+        self.assertEqual(len(plan['initialize']), 1)
+        self.assertEqual(len(plan['setup']), 1)
+        self.assertListEqual(plan['teardown'], [])
+        model.dp_setup()
+        self.assertListEqual(setups, ["child"])
+
+        #   Adding a component anywhere in the tree rebuilds the plan.
+        qu = dp.model.Queue("plan_q")
+        child.add_component(qu)
+        self.assertIsNone(model._phase_plan)
+        self.assertIs(qu.model, model)
+        model.dp_setup()
+        self.assertEqual(len(setups), 2)
+        self.assertGreater(len(model._phase_plan['teardown']), 0)
+
+        #   Creating results after the plan is compiled rebuilds it, and
+        #   statistics are found when the phase runs.
+        stat = dp.output.DiscreteStatistic("Late", 'u4')
+        child.results.stats["Late"] = stat
+        self.assertIsNone(model._phase_plan)
+        model.dp_teardown(0)
+        model.dp_compile_phases()
+        qu.results.stats["Later"] = late = \
+                dp.output.DiscreteStatistic("Later", 'u4')
+        model.dp_setup()
+        self.assertEqual(stat.reps, 1)
+        self.assertEqual(late.reps, 1)
         
         
 class QModel(dp.model.Component):
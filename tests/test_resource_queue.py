@@ -49,6 +49,408 @@ class testResource(unittest.TestCase):
         self.assertTrue(server[position].start_time is not None)
         self.assertTrue(server[1].entity is None)
          
+    def test_station_selection(self):
+        print()
+        print("TEST STATION SELECTION OUTPUT")
+        session = dp.Session.new()
+        session.model = model = dp.model.Component("Selection_Test")
+        session.sim = dp.Simulation()
+
+        #   Lowest index is the default policy.
+        server = dp.model.Resource("server", 500, stats.expon(scale=4))
+        model.add_component(server)
+        self.assertEqual(server.available, 500)
+        for index in range(3):
+            server.start_service(index, dp.model.Entity("Entity"))
+        self.assertEqual(server.available, 497)
+        self.assertEqual(server.get_available_station(), 3)
+        server.remove_entity(1)
+        self.assertEqual(server.get_available_station(), 1)
+        self.assertTrue(server[1].entity is None)
+
+        #   Random selection only returns free stations.
+        station = server.get_available_station(random = True)
+        self.assertTrue(server[station].entity is None)
+
+        #   Least recently used station is the one freed first.
+        lru = dp.model.Resource("lru", 4, stats.expon(scale=4),
+                                dp.model.Selection.least_recent)
+        model.add_component(lru)
+        for index in range(4):
+            lru.start_service(index, dp.model.Entity("Entity"))
+        self.assertIsNone(lru.get_available_station())
+        lru.remove_entity(2)
+        lru.remove_entity(0)
+        self.assertEqual(lru.get_available_station(), 2)
+        lru.start_service(2, dp.model.Entity("Entity"))
+        self.assertEqual(lru.get_available_station(), 0)
+
+        #   Free index supports lookups by position and wrap-around.
+        free = dp.model.FreeIndex(10, free = False)
+        for index in (2, 5, 7):
+            free.add(index)
+        self.assertEqual(len(free), 3)
+        self.assertEqual(free.kth(1), 5)
+        self.assertEqual(free.next_from(6), 7)
+        self.assertEqual(free.next_from(8), 2)
+        free.discard(2)
+        self.assertEqual(free.lowest(), 5)
+
+        #   Removing an entity cancels its finish event, so the stale
+        #   event does not end the next entity's service at the station.
+        session = dp.Session.new()
+        session.model = model = dp.model.Component("Remove_Test")
+        sim = session.sim = dp.Simulation()
+        single = dp.model.Resource("single", 1,
+                                   dp.stats.get_empirical_pmf([10], [1]))
+        model.add_component(single)
+        first, second = dp.model.Entity("First"), dp.model.Entity("Second")
+        held = []
+
+        def replace():
+            single.remove_entity(0)
+            single.request(second)
+
+        single.request(first)
+        sim.schedule(dp.fel.LightEvent("Replace", replace), 3)
+        sim.schedule(dp.fel.LightEvent("Check",
+                        lambda: held.append(single[0].entity)), 11)
+        sim.run()
+        self.assertListEqual(held, [second])
+        self.assertEqual(single.results.stats["Service Time"].total_length,
+                         1)
+
+    def test_resource_selection(self):
+        print()
+        print("TEST RESOURCE SELECTION OUTPUT")
+        session = dp.Session.new()
+        session.model = model = dp.model.Component("Res_Selection_Test")
+        session.sim = dp.Simulation()
+
+        def get_queue(name, selection):
+            res_q = dp.model.ResourceQueue(name, selection)
+            model.add_component(res_q)
+            res_q.assign_resource(dp.model.Resource("A", 2,
+                                                    stats.expon(scale=4)))
+            res_q.assign_resource(dp.model.Resource("B", 1,
+                                                    stats.expon(scale=4)))
+            res_q.assign_resource(dp.model.Resource("C", 4,
+                                                    stats.expon(scale=4)))
+            return res_q
+
+        #   Lowest index fills resource A before moving on.
+        res_q = get_queue("lowest_q", dp.model.Selection.lowest)
+        self.assertEqual(res_q.request(dp.model.Entity("E")), 0)
+        self.assertEqual(res_q.request(dp.model.Entity("E")), 0)
+        self.assertEqual(res_q.request(dp.model.Entity("E")), 1)
+        self.assertEqual(res_q.request(dp.model.Entity("E")), 2)
+        res_q[0].remove_entity(1)
+        self.assertEqual(res_q.get_available_resource(), 0)
+
+        #   Round robin cycles through the resources.
+        res_q = get_queue("rr_q", dp.model.Selection.round_robin)
+        chosen = [res_q.request(dp.model.Entity("E")) for _ in range(5)]
+        self.assertListEqual(chosen, [0, 1, 2, 0, 2])
+
+        #   Least utilized prefers resources with the most idle stations.
+        res_q = get_queue("lu_q", dp.model.Selection.least_utilized)
+        chosen = [res_q.request(dp.model.Entity("E")) for _ in range(4)]
+        self.assertListEqual(chosen, [0, 1, 2, 2])
+        self.assertEqual(res_q.get_available_resource(), 0)
+        res_q[1].remove_entity(0)
+        self.assertEqual(res_q.get_available_resource(), 1)
+
+        #   Busy resources are never chosen; entities wait in the queue.
+        for _ in range(4):
+            res_q.request(dp.model.Entity("E"))
+        self.assertIsNone(res_q.get_available_resource())
+        self.assertIs(res_q.request(dp.model.Entity("E")), False)
+        self.assertEqual(res_q.length, 1)
+
+    def test_counting_resource(self):
+        print()
+        print("TEST COUNTING RESOURCE OUTPUT")
+        session = dp.Session.new()
+        session.model = model = dp.model.Component("Counting_Test")
+        session.sim = dp.Simulation()
+
+        pool = dp.model.CountingResource("pool", 10 ** 5,
+                                         stats.expon(scale=4))
+        model.add_component(pool)
+        self.assertEqual(pool.available, 10 ** 5)
+        self.assertRaises(TypeError, lambda: pool.stations)
+
+        ents = [dp.model.Entity("Entity") for _ in range(3)]
+        for ent in ents:
+            self.assertTrue(pool.request(ent))
+        self.assertEqual(pool.busy, 3)
+        self.assertEqual(len(pool.in_service), 3)
+        self.assertIs(pool.remove_entity(ents[1]), ents[1])
+        self.assertEqual(pool.available, 10 ** 5 - 2)
+
+        #   A small pool feeds from its resource queue when it fills up.
+        res_q = dp.model.ResourceQueue("pool_q")
+        model.add_component(res_q)
+        res_q.assign_resource(dp.model.CountingResource("small", 2,
+                                                stats.expon(scale=4)))
+        self.assertEqual(res_q.request(dp.model.Entity("Entity")), 0)
+        self.assertEqual(res_q.request(dp.model.Entity("Entity")), 0)
+        self.assertIs(res_q.request(dp.model.Entity("Entity")), False)
+        self.assertEqual(res_q.length, 1)
+
+        #   Removing an entity cancels its finish event, so the stale
+        #   event does not end the entity's next service early.
+        const = dp.model.CountingResource("const", 1,
+                                dp.stats.get_empirical_pmf([10], [1]))
+        model.add_component(const)
+        ent = dp.model.Entity("Entity")
+        busy = []
+
+        def restart():
+            const.remove_entity(ent)
+            const.request(ent)
+
+        const.request(ent)
+        session.sim.schedule(dp.fel.LightEvent("Restart", restart), 3)
+        session.sim.schedule(dp.fel.LightEvent("Check",
+                                lambda: busy.append(const.busy)), 11)
+        session.sim.run()
+        self.assertEqual(res_q.length, 0)
+        self.assertEqual(res_q.small.busy, 0)
+        self.assertEqual(pool.busy, 0)
+        self.assertListEqual(busy, [1])
+        self.assertEqual(const.results.stats["Service Time"].total_length, 1)
+
+    def test_preemptive_resource(self):
+        print()
+        print("TEST PREEMPTIVE RESOURCE OUTPUT")
+        session = dp.Session.new()
+        session.model = model = dp.model.Component("Preemption_Test")
+        sim = session.sim = dp.Simulation()
+
+        res_q = dp.model.PreemptiveResourceQueue("res_q")
+        model.add_component(res_q)
+        res_q.assign_resource(dp.model.PreemptiveResource("server", 1,
+                                    dp.stats.get_empirical_pmf([10], [1])))
+        low = dp.model.Entity("Low")
+        high = dp.model.Entity("High")
+        mid = dp.model.Entity("Mid")
+
+        def arrive_low(event):
+            res_q.request(low, priority = 5)
+
+        def arrive_high(event):
+            res_q.request(high, priority = 1)
+            self.assertIs(res_q.server[0].entity, high)
+            self.assertEqual(res_q.server.remaining_times[low], 6)
+            #   Equal priority entities do not preempt each other.
+            self.assertIs(res_q.request(mid, priority = 1), False)
+
+        arrival_1 = dp.fel.Event("Low_Arrives")
+        arrival_1.append_callback(arrive_low)
+        arrival_2 = dp.fel.Event("High_Arrives")
+        arrival_2.append_callback(arrive_high)
+        sim.initialize()
+        sim.schedule(arrival_1, 0)
+        sim.schedule(arrival_2, 4)
+        results = sim.runf()
+
+        trace = results.trace
+        finishes = [(trace[i]['time'], str(trace[i]['Entity']))
+                    for i in range(trace.length)
+                    if trace[i]['name'] == "Finished_Service"]
+        self.assertListEqual(finishes, [(14, str(high)), (24, str(mid)),
+                                        (30, str(low))])
+        self.assertEqual(len(res_q.server.remaining_times), 0)
+        #   The low priority entity's service time includes the time
+        #   it was served before it was preempted.
+        self.assertListEqual(res_q.server.results.stats["Service Time"]
+                             .values.tolist(), [10, 10, 10])
+        self.assertRaises(TypeError,
+                          dp.model.ResourceQueue("plain_q").assign_resource,
+                          dp.model.PreemptiveResource("plain", 1))
+
+        #   Clearing one resource keeps the other resources' preemptions.
+        session = dp.Session.new()
+        session.model = model = dp.model.Component("Shared_Preemption")
+        sim = session.sim = dp.Simulation()
+        res_q = dp.model.PreemptiveResourceQueue("res_q")
+        model.add_component(res_q)
+        pmf = dp.stats.get_empirical_pmf([10], [1])
+        first = dp.model.PreemptiveResource("first", 1, pmf)
+        second = dp.model.PreemptiveResource("second", 1, pmf)
+        res_q.assign_resource(first)
+        res_q.assign_resource(second)
+        sim.initialize()
+        res_q.request(low, priority = 5)
+        res_q.request(mid, priority = 3)
+        res_q.request(high, priority = 1)
+        self.assertIs(first[0].entity, high)
+        second.capacity = 2
+        self.assertIn(low, first.remaining_times)
+        self.assertTupleEqual(first.get_preemption_candidate(),
+                              (first, 0, 1))
+        first.capacity = 1
+        self.assertNotIn(low, first.remaining_times)
+        self.assertIsNone(first.get_preemption_candidate())
+
+        #   Ended services leave the preemption heap even if the resource
+        #   never fills up and never looks for a preemption candidate.
+        session = dp.Session.new()
+        session.model = model = dp.model.Component("Heap_Test")
+        sim = session.sim = dp.Simulation()
+        res_q = dp.model.PreemptiveResourceQueue("res_q")
+        model.add_component(res_q)
+        res_q.assign_resource(dp.model.PreemptiveResource("server", 5,
+                                    dp.stats.get_empirical_pmf([2], [1])))
+        sizes = []
+
+        def arrive():
+            res_q.request(dp.model.LightEntity("Customer"))
+            sizes.append(len(res_q._in_service))
+            if sim.now < 2000:
+                sim.schedule(arrival, 1)
+
+        arrival = dp.fel.LightEvent("Arrival", arrive)
+        sim.initialize()
+        sim.schedule(arrival, 0)
+        sim.runf()
+        self.assertEqual(len(sizes), 2001)
+        self.assertLessEqual(max(sizes), 2 * 5 + 16 + 1)
+
+        #   Without a resource queue, a preempted entity's service is
+        #   abandoned and its waiting process resumes with None.
+        session = dp.Session.new()
+        session.model = model = dp.model.Component("No_Queue_Test")
+        sim = session.sim = dp.Simulation()
+        server = dp.model.PreemptiveResource("server", 1,
+                                    dp.stats.get_empirical_pmf([10], [1]))
+        model.add_component(server)
+        log = []
+
+        def customer(self):
+            entity = dp.model.Entity(self.name)
+            if self.name == "High":
+                yield 4
+            served = yield server.serve(entity, priority = self.priority)
+            log.append((self.name, self.sim.now, served is entity))
+
+        for name, priority in (("Low", 5), ("High", 1)):
+            process = dp.model.Process(name, customer)
+            process.priority = priority
+            model.add_component(process)
+            process.start()
+        sim.initialize()
+        sim.runf()
+        self.assertListEqual(log, [("Low", 4, False), ("High", 14, True)])
+        self.assertEqual(len(server.remaining_times), 0)
+        self.assertEqual(len(server._preempted), 0)
+        self.assertEqual(len(server._service_waiters), 0)
+
+        #   Cancelled events are skipped without being executed.
+        session = dp.Session.new()
+        session.model = dp.model.Component("Cancel_Test")
+        sim = session.sim = dp.Simulation()
+        event = dp.fel.Event("Cancelled_Event")
+        sim.cancel(sim.schedule(event, 5))
+        sim.schedule(dp.fel.Event("Kept_Event"), 8)
+        self.assertEqual(sim.peek(), 8)
+        sim.initialize()
+        results = sim.runf()
+        self.assertEqual(results.trace.length, 1)
+        self.assertEqual(results.trace[0]['name'], "Kept_Event")
+
+    def test_journey_log(self):
+        print()
+        print("TEST JOURNEY LOG OUTPUT")
+        for enabled in (False, True):
+            session = dp.Session.new()
+            session.config.journey_log = enabled
+            session.model = model = dp.model.Component("Journey_Test")
+            sim = session.sim = dp.Simulation()
+            res_q = dp.model.ResourceQueue("res_q")
+            model.add_component(res_q)
+            res_q.assign_resource(dp.model.Resource("server", 1,
+                                    dp.stats.get_empirical_pmf([4], [1])))
+            table = dp.model.EntityTable("customers", [("cls", "u1")])
+            model.add_component(table)
+            customers = [table.new(cls = 1) for _ in range(3)]
+            arrivals = dp.fel.LightEvent("Arrivals", callback = lambda:
+                                [res_q.request(c) for c in customers])
+            sim.initialize()
+            sim.schedule(arrivals, 0)
+            results = sim.runf()
+            if not enabled:
+                self.assertEqual(len(results.journey), 0)
+
+        journey = results.journey
+        self.assertEqual(len(journey), 10)
+        self.assertListEqual(journey.components, ["server", "res_q"])
+        stage = dp.output.Stage
+        entities, waits = journey.intervals("res_q", stage.queue_enter,
+                                            stage.queue_exit)
+        self.assertListEqual(entities.tolist(), customers[1:])
+        self.assertListEqual(waits.tolist(), [4, 8])
+        _, entities, times = journey.time_in_system()
+        self.assertListEqual(entities.tolist(), customers)
+        self.assertListEqual(times.tolist(), [4, 8, 12])
+
+        #   Entity classes with separate number sequences are kept apart.
+        class Car(dp.model.LightEntity):
+            pass
+
+        class Truck(dp.model.LightEntity):
+            pass
+
+        Car.set_counter()
+        Truck.set_counter()
+        car, truck = Car("Car"), Truck("Truck")
+        self.assertEqual(car.number, truck.number)
+        journey.record("lane", stage.queue_enter, car)
+        journey.record("lane", stage.queue_enter, truck)
+        journey.record("lane", stage.queue_exit, truck)
+        entities, _ = journey.intervals("lane", stage.queue_enter,
+                                        stage.queue_exit)
+        self.assertEqual(len(entities), 1)
+        self.assertEqual(journey.labels[entities[0]], str(truck))
+
+    def test_trace_queries(self):
+        print()
+        print("TEST TRACE QUERIES")
+        session = dp.Session.new()
+        session.model = model = dp.model.Component("Query_Test")
+        sim = session.sim = dp.Simulation()
+        res_q = dp.model.ResourceQueue("res_q")
+        model.add_component(res_q)
+        res_q.assign_resource(dp.model.Resource("server", 1,
+                                dp.stats.get_empirical_pmf([4], [1])))
+        customers = [dp.model.LightEntity("Customer") for _ in range(3)]
+        arrivals = dp.fel.LightEvent("Arrivals", callback = lambda:
+                            [res_q.request(c) for c in customers])
+        sim.initialize()
+        sim.schedule(arrivals, 0)
+        trace = sim.runf().trace
+
+        #   Every record for the second customer, by object or string.
+        indexes = trace.for_entity(customers[1])
+        self.assertListEqual([trace[i]['name'] for i in indexes],
+                             ["Entering Queue", "Leaving Queue",
+                              "Starting Service", "Finished_Service"])
+        self.assertListEqual(indexes.tolist(),
+                             trace.for_entity(str(customers[1])).tolist())
+        self.assertListEqual(trace['time'][indexes].tolist(), [0, 4, 4, 8])
+        self.assertEqual(len(trace.for_entity("Nobody")), 0)
+
+        finished = trace.by_name("Finished_Service")
+        self.assertListEqual(trace['time'][finished].tolist(), [4, 8, 12])
+        self.assertEqual(len(trace.by_name("Missing")), 0)
+        span = trace.between(4, 12, rep = 0)
+        self.assertTrue((trace['time'][span] >= 4).all())
+        self.assertTrue((trace['time'][span] < 12).all())
+        self.assertEqual(span.stop - span.start,
+                         int(((trace['time'] >= 4) &
+                              (trace['time'] < 12)).sum()))
+
     class ResModel(dp.model.Component):
         class Customer(dp.model.Entity):
             def __init__(self):
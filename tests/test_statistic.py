@@ -78,6 +78,25 @@ class testStatistic(unittest.TestCase):
         print("rep_means: {}".format(stat1.rep_means))
         self.assertListEqual(stat1.rep_means.tolist(), rep_means)
 
+    def test_stat_storage(self):
+        print()
+        print("=====Statistic Storage Test=====")
+        stat = DiscreteStatistic('stat', 'u4')
+        for rep_len in (100, 3):
+            stat.setup()
+            for value in range(rep_len):
+                stat.append(value, value)
+            stat.teardown()
+        self.assertEqual(stat.values.dtype, 'u4')
+        self.assertEqual(stat.total_length, 103)
+        self.assertListEqual(stat.rep_values(1).tolist(), [0, 1, 2])
+        self.assertEqual(stat.rep_values(0)[99], 99)
+        #   Values are views of the statistic's storage, not copies.
+        self.assertIs(stat.rep_values(0).base, stat.values.base)
+        stat.finalize()
+        self.assertEqual(len(stat._values), 103)
+        self.assertListEqual(stat.rep_means.tolist(), [49.5, 1.0])
+
     def test_time_weighted_mean(self):
         print()
         print("============================")